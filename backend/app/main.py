@@ -1,11 +1,46 @@
 from dotenv import load_dotenv
 load_dotenv()
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.app.routes import generate, critique, projects, prompts, planner, supplementals, assistant, settings as settings_route
+from backend.app.routes import generate, critique, projects, prompts, planner, supplementals, assistant, settings as settings_route, cache, jobs, models, metrics as metrics_route, search, audit, keywords, links, duplicates
+from backend.app.utils import ai_tools, listing, metrics, token_budget
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Share one pooled OpenAI client across all requests in this worker
+    ai_tools.init_client()
+    # Count stored prompts/supplementals up front so requests only hit the memo
+    await asyncio.to_thread(token_budget.warm_stored_prompts)
+    yield
+    await ai_tools.close_client()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(token_budget.ContextBudgetError)
+async def context_budget_error(request: Request, exc: token_budget.ContextBudgetError):
+    # Caught locally instead of after a slow round trip to OpenAI
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, to keep cardinality bounded.
+        # For streamed responses this is time to headers, i.e. time to first byte.
+        route = request.scope.get("route")
+        metrics.observe_request(request.method, getattr(route, "path", "unmatched"), status, time.perf_counter() - start)
 
 # Add CORS middleware
 app.add_middleware(
@@ -14,6 +49,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[listing.NEXT_CURSOR_HEADER],
 )
 
 app.include_router(generate.router)
@@ -23,4 +59,13 @@ app.include_router(prompts.router)
 app.include_router(planner.router)
 app.include_router(supplementals.router)
 app.include_router(assistant.router)
-app.include_router(settings_route.router) 
\ No newline at end of file
+app.include_router(settings_route.router)
+app.include_router(cache.router)
+app.include_router(jobs.router)
+app.include_router(models.router)
+app.include_router(metrics_route.router)
+app.include_router(search.router)
+app.include_router(audit.router)
+app.include_router(keywords.router)
+app.include_router(links.router)
+app.include_router(duplicates.router) 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from backend.app.utils import ai_tools
+from backend.app.utils.sse import sse_response
 
 router = APIRouter(prefix="/assistant", tags=["assistant"])
 
@@ -11,8 +12,10 @@ class RefineRequest(BaseModel):
     system_prompt: str | None = None
 
 @router.post("/refine")
-def refine(req: RefineRequest):
+async def refine(req: RefineRequest, stream: bool = False):
     if req.mode not in {"prompt", "supplement"}:
         raise HTTPException(400, "mode must be 'prompt' or 'supplement'")
-    refined = ai_tools.refine_text(req.text, req.mode, req.instruction, req.system_prompt)
+    if stream:
+        return sse_response(ai_tools.stream_refine_text(req.text, req.mode, req.instruction, req.system_prompt))
+    refined = await ai_tools.refine_text(req.text, req.mode, req.instruction, req.system_prompt)
     return {"refined": refined} 
\ No newline at end of file
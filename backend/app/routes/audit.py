@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from pydantic import BaseModel
+from utils import audit
+
+router = APIRouter(tags=["audit"])
+
+class AuditRequest(BaseModel):
+    markdown: str
+    # Content-pyramid type (pillar, collection, blog, guide, faq); front matter `type` otherwise
+    page_type: str | None = None
+    keyword: str | None = None
+
+@router.post("/audit")
+def audit_page(request: AuditRequest):
+    report = audit.audit_markdown(request.markdown, request.page_type, request.keyword)
+    return {**report, "needs_critique": audit.needs_critique(report)}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from backend.app.utils import llm_cache
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+@router.get("/stats")
+def cache_stats():
+    return llm_cache.cache.snapshot()
+
+@router.delete("/")
+def clear_cache():
+    removed = llm_cache.cache.clear()
+    return {"status": "cleared", "removed": removed}
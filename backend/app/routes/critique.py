@@ -1,7 +1,10 @@
 from fastapi import APIRouter
+from typing import AsyncIterator, List, Literal
 from pydantic import BaseModel
-from backend.app.utils import ai_tools
-from backend.app.utils import prompt_store
+from backend.app.utils import ai_tools, critique_engine, history, retrieval
+from backend.app.utils import project_store, prompt_store
+from backend.app.utils.sse import sse_response
+from utils import audit
 from fastapi import HTTPException
 
 router = APIRouter()
@@ -10,14 +13,71 @@ class CritiqueRequest(BaseModel):
     markdown: str
     prompt_id: str | None = None
     supplemental: str | None = None
+    cache: Literal["bypass", "refresh"] | None = None
+    # None = chunk automatically once the document is long enough
+    chunked: bool | None = None
+    # Inject only the top_k chunks most relevant to the request: taken from
+    # `supplemental` when given, else from the indexed supplementals/knowledge files
+    top_k: int | None = None
+    supplemental_ids: List[str] | None = None
+    # Run the local SEO audit first: passing pages skip the LLM critique,
+    # the rest hand it their findings
+    audit: bool = False
+    page_type: str | None = None
+    keyword: str | None = None
+    # Re-critique only sections changed since an earlier critique; unchanged ones reuse their findings
+    incremental: bool = False
+    # Record the critique (with the markdown it covers) in this project's history
+    project_id: str | None = None
+
+async def _once(text: str) -> AsyncIterator[str]:
+    yield text
 
 @router.post("/critique")
-def critique(request: CritiqueRequest):
+async def critique(request: CritiqueRequest, stream: bool = False):
+    if stream and request.incremental:
+        # The merged report mixes reused and fresh findings; there is nothing to stream incrementally
+        raise HTTPException(status_code=400, detail="incremental critiques can't be streamed")
     custom_prompt = None
     if request.prompt_id:
         p = prompt_store.get_prompt(request.prompt_id)
         if not p:
             raise HTTPException(status_code=404, detail="Prompt not found")
         custom_prompt = p["content"]
-    critique = ai_tools.critique_content(request.markdown, custom_prompt, request.supplemental)
-    return {"critique": critique} 
\ No newline at end of file
+    if request.project_id and not project_store.get_project(request.project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    audit_report = findings = None
+    if request.audit:
+        audit_report = audit.audit_markdown(request.markdown, request.page_type, request.keyword)
+        findings = audit.render_findings(audit_report)
+        if not audit.needs_critique(audit_report):
+            if stream:
+                return sse_response(_logged(request, _once(findings)))
+            return {"critique": _record(request, findings), "audit": audit_report}
+    supplemental = retrieval.supplemental_context(
+        retrieval.document_query(request.markdown), request.supplemental, request.top_k, request.supplemental_ids,
+    )
+    if request.incremental:
+        report = await critique_engine.critique_incremental(request.markdown, custom_prompt, supplemental, request.cache, audit_findings=findings)
+        return {"critique": _record(request, critique_engine.render_report(report)), "report": report, "audit": audit_report}
+    chunked = request.chunked if request.chunked is not None else critique_engine.should_chunk(request.markdown)
+    if chunked and stream:
+        # Findings go out chunk by chunk as they finish, then the summary
+        return sse_response(_logged(request, critique_engine.stream_document(request.markdown, custom_prompt, supplemental, request.cache, audit_findings=findings)))
+    if chunked:
+        report = await critique_engine.critique_document(request.markdown, custom_prompt, supplemental, request.cache, audit_findings=findings)
+        return {"critique": _record(request, critique_engine.render_report(report)), "report": report, "audit": audit_report}
+    if stream:
+        return sse_response(_logged(request, ai_tools.stream_critique(request.markdown, custom_prompt, supplemental, request.cache, findings)))
+    critique = await ai_tools.critique_content(request.markdown, custom_prompt, supplemental, request.cache, findings)
+    return {"critique": _record(request, critique), "audit": audit_report}
+
+def _logged(request: CritiqueRequest, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    if not request.project_id:
+        return chunks
+    return history.logged(chunks, request.project_id, "critique", content=request.markdown)
+
+def _record(request: CritiqueRequest, critique: str) -> str:
+    if request.project_id:
+        history.append(request.project_id, "critique", request.markdown, note=critique)
+    return critique 
\ No newline at end of file
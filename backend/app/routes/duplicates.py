@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException
+from typing import Literal
+from pydantic import BaseModel
+from backend.app.utils import dedup
+
+router = APIRouter(prefix="/duplicates", tags=["duplicates"])
+
+class DuplicateCheck(BaseModel):
+    # A full article or a planner outline
+    text: str
+    kind: Literal["article", "outline"] = "article"
+    # Leave this document out, e.g. "content:<file>.md" or "topic:<topic>" when re-checking it
+    exclude_id: str | None = None
+    threshold: float | None = None
+    # Index the text too (under exclude_id) so later checks see it
+    add: bool = False
+    title: str | None = None
+
+@router.post("/check")
+def check_duplicates(request: DuplicateCheck):
+    if request.add and not request.exclude_id:
+        raise HTTPException(status_code=400, detail="exclude_id is required to add a document")
+    if request.kind == "article":
+        dedup.sync_articles()
+    idx = dedup.index(request.kind)
+    matches = idx.query(request.text, request.exclude_id, request.threshold or dedup.DEDUP_THRESHOLD)
+    if request.add:
+        idx.add(request.exclude_id, request.text, request.title)
+    return {"duplicates": matches}
+
+@router.get("")
+def list_duplicates(kind: Literal["article", "outline"] = "article", threshold: float | None = None):
+    """Cannibalization report: every near-duplicate pair of that kind."""
+    if kind == "article":
+        dedup.sync_articles()
+    return {"pairs": dedup.index(kind).pairs(threshold or dedup.DEDUP_THRESHOLD)}
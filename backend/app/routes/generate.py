@@ -1,7 +1,12 @@
+import asyncio
+import os
+from uuid import uuid4
+from typing import AsyncIterator, List, Literal
 from fastapi import APIRouter
-from pydantic import BaseModel
-from backend.app.utils import ai_tools
-from backend.app.utils import prompt_store
+from pydantic import BaseModel, Field
+from backend.app.utils import ai_tools, batch, dedup, history, retrieval, token_budget
+from backend.app.utils import project_store, prompt_store
+from backend.app.utils.sse import sse_response
 from fastapi import HTTPException
 
 router = APIRouter()
@@ -11,14 +16,119 @@ class GenerateRequest(BaseModel):
     instructions: str | None = None
     prompt_id: str | None = None
     supplemental: str | None = None
+    cache: Literal["bypass", "refresh"] | None = None
+    # Planner outline: when given, its H2/H3 sections are written in parallel and stitched
+    outline: str | None = None
+    target_words: int | None = None
+    # Inject only the top_k chunks most relevant to the request: taken from
+    # `supplemental` when given, else from the indexed supplementals/knowledge files
+    top_k: int | None = None
+    supplemental_ids: List[str] | None = None
+    # Refuse (409) before any LLM call when `outline` nearly duplicates another planned topic's outline
+    block_duplicates: bool = False
+    # Record the article as a new revision in this project's history
+    project_id: str | None = None
+
+class BatchGenerateRequest(BaseModel):
+    topics: List[str]
+    instructions: str | None = None
+    prompt_id: str | None = None
+    supplemental: str | None = None
+    cache: Literal["bypass", "refresh"] | None = None
+    concurrency: int = Field(batch.BATCH_CONCURRENCY, ge=1, le=batch.MAX_BATCH_CONCURRENCY)
+    # Inject only the top_k chunks most relevant to the request: taken from
+    # `supplemental` when given, else from the indexed supplementals/knowledge files
+    top_k: int | None = None
+    supplemental_ids: List[str] | None = None
+    batch_id: str | None = None  # pass an existing id to resume that batch
+
+# Running batch tasks by id; holding the reference keeps them from being garbage collected
+_batches: dict[str, asyncio.Task] = {}
+
+def _custom_prompt(prompt_id: str | None) -> str | None:
+    if not prompt_id:
+        return None
+    p = prompt_store.get_prompt(prompt_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return p["content"]
 
 @router.post("/generate")
-def generate(request: GenerateRequest):
-    custom_prompt = None
-    if request.prompt_id:
-        p = prompt_store.get_prompt(request.prompt_id)
-        if not p:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        custom_prompt = p["content"]
-    article = ai_tools.generate_article(request.topic, request.instructions, custom_prompt, request.supplemental)
-    return {"article": article} 
\ No newline at end of file
+async def generate(request: GenerateRequest, stream: bool = False):
+    custom_prompt = _custom_prompt(request.prompt_id)
+    if request.project_id and not project_store.get_project(request.project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if request.block_duplicates and request.outline:
+        duplicates = dedup.outline_duplicates(request.topic, request.outline)
+        if duplicates:
+            raise HTTPException(status_code=409, detail={"message": "Outline nearly duplicates planned topics", "duplicates": duplicates})
+    query = f"{request.topic}\n{request.outline or ''}"
+    supplemental = retrieval.supplemental_context(query, request.supplemental, request.top_k, request.supplemental_ids)
+    if request.outline:
+        args = (request.topic, request.outline, request.instructions, custom_prompt, supplemental, request.cache, request.target_words)
+        if stream:
+            return sse_response(_logged(request, ai_tools.stream_article_from_outline(*args)))
+        try:
+            article = await ai_tools.generate_article_from_outline(*args)
+        except token_budget.ContextBudgetError:
+            raise  # answered with 413 by the app-level handler
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return _result(request, article)
+    if stream:
+        return sse_response(_logged(request, ai_tools.stream_article(request.topic, request.instructions, custom_prompt, supplemental, request.cache)))
+    article = await ai_tools.generate_article(request.topic, request.instructions, custom_prompt, supplemental, request.cache)
+    return _result(request, article)
+
+def _logged(request: GenerateRequest, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    return history.logged(chunks, request.project_id, "generation") if request.project_id else chunks
+
+def _result(request: GenerateRequest, article: str) -> dict:
+    if not request.project_id:
+        return {"article": article}
+    return {"article": article, "revision": history.append(request.project_id, "generation", article)["revision"]}
+
+@router.post("/generate/batch")
+async def generate_batch(request: BatchGenerateRequest):
+    custom_prompt = _custom_prompt(request.prompt_id)
+    batch_id = request.batch_id or str(uuid4())
+    manifest = _manifest(batch_id)
+    if not batch.claim_manifest(manifest, request.topics):
+        raise HTTPException(status_code=409, detail="Batch is already running")
+    pending = batch.pending_topics(request.topics, manifest)
+    task = asyncio.create_task(batch.run_claimed(
+        manifest, request.topics, request.concurrency,
+        request.instructions, custom_prompt, request.supplemental, request.cache,
+        top_k=request.top_k, supplemental_ids=request.supplemental_ids,
+    ))
+    _batches[batch_id] = task
+    task.add_done_callback(lambda _: _batches.pop(batch_id, None))
+    return {"batch_id": batch_id, "total": len(set(request.topics)), "pending": len(pending)}
+
+def _manifest(batch_id: str) -> str:
+    try:
+        return batch.manifest_path(batch_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/generate/batch/{batch_id}")
+def batch_status(batch_id: str, include_articles: bool = False):
+    # Answered from the manifest files, so any worker can report on any batch
+    manifest = _manifest(batch_id)
+    if not os.path.exists(manifest):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    entries = batch.read_manifest(manifest)
+    state = batch.manifest_state(manifest)
+    pending = sum(1 for t in state.get("topics", ()) if t not in entries)
+    results = list(entries.values())
+    if not include_articles:
+        results = [{k: v for k, v in e.items() if k != "article"} for e in results]
+    return {
+        "batch_id": batch_id,
+        "status": state.get("status"),
+        "running": state.get("status") == "running",
+        "pending": pending,
+        "done": sum(1 for e in results if e["status"] == "done"),
+        "failed": sum(1 for e in results if e["status"] == "failed"),
+        "results": results,
+    }
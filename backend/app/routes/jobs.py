@@ -0,0 +1,38 @@
+from typing import Any, Dict, Literal
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, ValidationError
+from backend.app.utils import job_queue, project_store
+from backend.app.routes.generate import GenerateRequest
+from backend.app.routes.critique import CritiqueRequest
+from backend.app.routes.planner import PlanRequest
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+_PAYLOADS = {
+    "generate": GenerateRequest,
+    "critique": CritiqueRequest,
+    "plan": PlanRequest,
+}
+
+class JobRequest(BaseModel):
+    kind: Literal["generate", "critique", "plan"]
+    payload: Dict[str, Any]
+
+@router.post("/", status_code=202)
+def create_job(req: JobRequest):
+    try:
+        payload = _PAYLOADS[req.kind].model_validate(req.payload)
+    except ValidationError as e:
+        raise HTTPException(422, e.errors())
+    project_id = getattr(payload, "project_id", None)
+    if project_id and not project_store.get_project(project_id):
+        raise HTTPException(404, "Project not found")
+    job = job_queue.enqueue(req.kind, payload.model_dump(exclude_none=True))
+    return {"id": job["id"], "status": job["status"]}
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job_queue.job_result(job)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from typing import Literal
+from pydantic import BaseModel, Field
+from backend.app.utils import ai_tools, keywords
+
+router = APIRouter(tags=["keywords"])
+
+class KeywordRequest(BaseModel):
+    # An article title, or a full article
+    text: str
+    k: int = Field(20, ge=1, le=100)
+    # Pull in related phrases from the corpus; defaults to on for short inputs
+    related: bool | None = None
+    # Let the LLM reorder the local suggestions (costs a call; off by default)
+    rerank: bool = False
+    cache: Literal["bypass", "refresh"] | None = None
+
+@router.post("/keywords")
+async def suggest_keywords(request: KeywordRequest):
+    results = keywords.extract(request.text, request.k, request.related)
+    if request.rerank and results:
+        order = await ai_tools.rerank_keywords(request.text[:200], [r["keyword"] for r in results], request.cache)
+        by_keyword = {r["keyword"]: r for r in results}
+        results = [by_keyword[k] for k in order]
+    return {"keywords": results}
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from typing import List
+from pydantic import BaseModel, Field
+from backend.app.utils import link_index
+
+router = APIRouter(tags=["links"])
+
+class LinkRequest(BaseModel):
+    markdown: str
+    # pillar, collection, blog, guide or faq; front matter `type` otherwise
+    page_type: str | None = None
+    n: int = Field(5, ge=1, le=50)
+    # content/ file names to leave out, e.g. the page being edited
+    exclude: List[str] = []
+    # Explicit target page types instead of the one-tier-up/down/sideways rule
+    target_types: List[str] | None = None
+
+@router.post("/links")
+def suggest_links(request: LinkRequest):
+    return link_index.suggest_links(request.markdown, request.page_type, request.n, request.exclude, request.target_types)
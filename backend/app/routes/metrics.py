@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from backend.app.utils import llm_cache, metrics, model_router
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Refresh metrics that mirror state owned by other modules
+    stats = llm_cache.cache.snapshot()
+    for event in ("memory_hits", "disk_hits", "misses", "writes", "evictions"):
+        metrics.CACHE_EVENTS.set_total(stats[event], event=event)
+    for model, health in model_router.router.snapshot().items():
+        metrics.BREAKER_OPEN.set(0 if health["state"] == "closed" else 1, model=model)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from backend.app.utils import model_router
+
+router = APIRouter(prefix="/models", tags=["models"])
+
+@router.get("/health")
+def model_health():
+    return {
+        "fallbacks": model_router.router.fallbacks,
+        "models": model_router.router.snapshot(),
+    }
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-from backend.app.utils import ai_tools, prompt_store
+from typing import List, Dict, Literal, Optional
+from backend.app.utils import ai_tools, dedup, planner_sessions, prompt_store, retrieval
+from backend.app.utils.sse import sse_response
 
 router = APIRouter(prefix="/planner", tags=["planner"])
 
@@ -9,6 +10,11 @@ class PlanRequest(BaseModel):
     topic: str
     prompt_id: Optional[str] = None
     supplemental: Optional[str] = None
+    cache: Optional[Literal["bypass", "refresh"]] = None
+    # Inject only the top_k chunks most relevant to the request: taken from
+    # `supplemental` when given, else from the indexed supplementals/knowledge files
+    top_k: Optional[int] = None
+    supplemental_ids: Optional[List[str]] = None
 
 class PlanContinueRequest(BaseModel):
     topic: str
@@ -16,25 +22,92 @@ class PlanContinueRequest(BaseModel):
     messages: List[Dict[str, str]]
     user_message: str
     supplemental: Optional[str] = None
+    cache: Optional[Literal["bypass", "refresh"]] = None
+    # Inject only the top_k chunks most relevant to the request: taken from
+    # `supplemental` when given, else from the indexed supplementals/knowledge files
+    top_k: Optional[int] = None
+    supplemental_ids: Optional[List[str]] = None
 
 @router.post("/initial")
-def initial_plan(req: PlanRequest):
+async def initial_plan(req: PlanRequest, stream: bool = False):
     custom_prompt = None
     if req.prompt_id:
         p = prompt_store.get_prompt(req.prompt_id)
         if not p:
             raise HTTPException(404, "Prompt not found")
         custom_prompt = p['content']
-    outline = ai_tools.generate_plan(req.topic, custom_prompt, req.supplemental)
-    return {"outline": outline}
+    supplemental = retrieval.supplemental_context(req.topic, req.supplemental, req.top_k, req.supplemental_ids)
+    if stream:
+        return sse_response(dedup.indexed_outline(req.topic, ai_tools.stream_plan(req.topic, custom_prompt, supplemental, req.cache)))
+    outline = await ai_tools.generate_plan(req.topic, custom_prompt, supplemental, req.cache)
+    # Other planned topics this outline would cannibalize
+    return {"outline": outline, "duplicates": dedup.add_outline(req.topic, outline)}
 
 @router.post("/continue")
-def continue_plan(req: PlanContinueRequest):
+async def continue_plan(req: PlanContinueRequest, stream: bool = False):
     custom_prompt = None
     if req.prompt_id:
         p = prompt_store.get_prompt(req.prompt_id)
         if not p:
             raise HTTPException(404, "Prompt not found")
         custom_prompt = p['content']
-    outline = ai_tools.continue_plan(req.topic, custom_prompt, req.messages, req.user_message, req.supplemental)
-    return {"outline": outline} 
\ No newline at end of file
+    query = f"{req.topic}\n{req.user_message}"
+    supplemental = retrieval.supplemental_context(query, req.supplemental, req.top_k, req.supplemental_ids)
+    if stream:
+        return sse_response(dedup.indexed_outline(req.topic, ai_tools.stream_continue_plan(req.topic, custom_prompt, req.messages, req.user_message, supplemental, req.cache)))
+    outline = await ai_tools.continue_plan(req.topic, custom_prompt, req.messages, req.user_message, supplemental, req.cache)
+    return {"outline": outline, "duplicates": dedup.add_outline(req.topic, outline)}
+
+# ----------------------------- SESSIONS --------------------------------
+# The server keeps the conversation; clients send only the new message.
+
+class SessionMessage(BaseModel):
+    user_message: str
+    cache: Optional[Literal["bypass", "refresh"]] = None
+
+def _custom_prompt(prompt_id: Optional[str]) -> Optional[str]:
+    if not prompt_id:
+        return None
+    p = prompt_store.get_prompt(prompt_id)
+    if not p:
+        raise HTTPException(404, "Prompt not found")
+    return p['content']
+
+@router.post("/sessions")
+async def create_session(req: PlanRequest):
+    custom_prompt = _custom_prompt(req.prompt_id)
+    # Sessions keep the retrieved chunks for their lifetime
+    supplemental = retrieval.supplemental_context(req.topic, req.supplemental, req.top_k, req.supplemental_ids)
+    session = planner_sessions.create_session(req.topic, req.prompt_id, supplemental)
+    try:
+        outline = await planner_sessions.start(session, custom_prompt, req.cache)
+    except planner_sessions.SessionNotFound:
+        raise HTTPException(404, "Session not found")
+    return {"session_id": session["id"], "outline": outline, "duplicates": dedup.add_outline(req.topic, outline)}
+
+@router.post("/sessions/{session_id}/messages")
+async def session_message(session_id: str, req: SessionMessage, stream: bool = False):
+    session = planner_sessions.get_session(session_id)
+    if not session:
+        raise HTTPException(404, "Session not found")
+    custom_prompt = _custom_prompt(session["prompt_id"])
+    if stream:
+        return sse_response(dedup.indexed_outline(session["topic"], planner_sessions.stream_turn(session_id, req.user_message, custom_prompt, req.cache)))
+    try:
+        outline = await planner_sessions.take_turn(session_id, req.user_message, custom_prompt, req.cache)
+    except planner_sessions.SessionNotFound:
+        raise HTTPException(404, "Session not found")
+    return {"session_id": session_id, "outline": outline, "duplicates": dedup.add_outline(session["topic"], outline)}
+
+@router.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    session = planner_sessions.get_session(session_id)
+    if not session:
+        raise HTTPException(404, "Session not found")
+    return session
+
+@router.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    if not planner_sessions.delete_session(session_id):
+        raise HTTPException(404, "Session not found")
+    return {"status": "deleted"}
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional
-from backend.app.utils import project_store
+from typing import List, Literal, Optional
+from backend.app.utils import history, listing, project_store
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
@@ -24,9 +24,15 @@ class ProjectUpdate(BaseModel):
     custom_instructions: Optional[str] = None
     planning: Optional[str] = None
 
-@router.get("/", response_model=List[Project])
-def list_projects():
-    return project_store.list_projects()
+# Each item is shaped like Project (or just the requested `fields`), serialized by listing
+@router.get("/", response_model=None, responses={200: {"model": List[Project]}})
+def list_projects(
+    fields: Optional[str] = None,  # comma-separated projection, e.g. "title" for sidebars
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+):
+    # Next page cursor, if any, is in the X-Next-Cursor header
+    return listing.list_response(project_store.list_projects_page, Project, cursor, limit, fields)
 
 @router.post("/", response_model=Project)
 def create_project(project: ProjectCreate):
@@ -51,4 +57,43 @@ def delete_project(project_id: str):
     success = project_store.delete_project(project_id)
     if not success:
         raise HTTPException(status_code=404, detail="Project not found")
-    return {"status": "deleted"} 
\ No newline at end of file
+    return {"status": "deleted"}
+
+# ----------------------------- HISTORY ---------------------------------
+# Append-only log of the project's content: generations, critiques and edits
+
+class RevisionCreate(BaseModel):
+    kind: Literal["generation", "critique", "edit"] = "edit"
+    content: str
+    # Text about the content rather than the content itself, e.g. a critique
+    note: Optional[str] = None
+
+def _require_project(project_id: str) -> None:
+    if not project_store.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+@router.get("/{project_id}/history")
+def list_revisions(project_id: str):
+    _require_project(project_id)
+    return history.revisions(project_id)
+
+@router.post("/{project_id}/history")
+def add_revision(project_id: str, revision: RevisionCreate):
+    _require_project(project_id)
+    return history.append(project_id, revision.kind, revision.content, revision.note)
+
+@router.get("/{project_id}/history/{revision}")
+def get_revision(project_id: str, revision: int):
+    _require_project(project_id)
+    try:
+        return history.get_revision(project_id, revision)
+    except history.HistoryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{project_id}/history/{start}/diff/{end}")
+def diff_revisions(project_id: str, start: int, end: int, context: int = Query(3, ge=0, le=50)):
+    _require_project(project_id)
+    try:
+        return history.diff(project_id, start, end, context)
+    except history.HistoryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
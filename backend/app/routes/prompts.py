@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Optional
-from backend.app.utils import prompt_store
+from backend.app.utils import listing, prompt_store
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
@@ -24,9 +24,20 @@ class PromptUpdate(BaseModel):
     type: Optional[str] = None
     tags: Optional[List[str]] = None
 
-@router.get("/", response_model=List[Prompt])
-def list_prompts():
-    return prompt_store.list_prompts()
+# Each item is shaped like Prompt (or just the requested `fields`), serialized by listing
+@router.get("/", response_model=None, responses={200: {"model": List[Prompt]}})
+def list_prompts(
+    type: Optional[str] = None,
+    tags: Optional[str] = None,  # comma-separated; records must carry all of them
+    fields: Optional[str] = None,  # comma-separated projection, e.g. "title" for sidebars
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+):
+    tag_list = listing.parse_list(tags)
+    def fetch(after_id, n):
+        return prompt_store.list_prompts_page(after_id, n, type, tag_list)
+    # Next page cursor, if any, is in the X-Next-Cursor header
+    return listing.list_response(fetch, Prompt, cursor, limit, fields)
 
 @router.post("/", response_model=Prompt)
 def create_prompt(prompt: PromptCreate):
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+from typing import Literal, Optional
+from backend.app.utils import search_index
+
+router = APIRouter(tags=["search"])
+
+@router.get("/search")
+def search(
+    q: str,
+    kind: Optional[Literal["prompt", "supplemental", "project"]] = None,
+    tags: Optional[str] = None,  # comma-separated; results must carry all of them
+    limit: int = Query(20, ge=1, le=100),
+):
+    wanted = [t.strip() for t in tags.split(",") if t.strip()] if tags else []
+    return {"query": q, "results": search_index.search(q, kind, wanted, limit)}
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import List
-from backend.app.utils import supp_store
+from typing import List, Optional
+from backend.app.utils import listing, supp_store
 
 router = APIRouter(prefix="/supplementals", tags=["supplementals"])
 
@@ -13,9 +13,19 @@ class SuppIn(BaseModel):
 class SuppOut(SuppIn):
     id: str
 
-@router.get("/", response_model=List[SuppOut])
-def list_supplementals():
-    return supp_store.list_items()
+# Each item is shaped like SuppOut (or just the requested `fields`), serialized by listing
+@router.get("/", response_model=None, responses={200: {"model": List[SuppOut]}})
+def list_supplementals(
+    tags: Optional[str] = None,  # comma-separated; records must carry all of them
+    fields: Optional[str] = None,  # comma-separated projection, e.g. "title" for sidebars
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+):
+    tag_list = listing.parse_list(tags)
+    def fetch(after_id, n):
+        return supp_store.list_items_page(after_id, n, tag_list)
+    # Next page cursor, if any, is in the X-Next-Cursor header
+    return listing.list_response(fetch, SuppOut, cursor, limit, fields)
 
 @router.post("/", response_model=SuppOut)
 def create_supplemental(data: SuppIn):
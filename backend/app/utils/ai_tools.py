@@ -1,43 +1,368 @@
 # ai_tools.py
 # This module will wrap generation and critique logic for FastAPI routes.
 
-from utils.prompt_loader import load_prompt
-import openai
+import asyncio
+import os
+import time
+from typing import AsyncIterator
 
+import httpx
+from openai import AsyncOpenAI
 
-def generate_article(topic: str, instructions: str | None = None, custom_prompt: str | None = None, supplemental: str | None = None) -> str:
-    system_prompt = custom_prompt or load_prompt('system_prompt')
+from backend.app.utils import llm_cache, metrics, model_router, single_flight, token_budget, outline as outline_tools
+
+from utils.prompt_loader import compile_template, render_prompt
+
+
+# ----------------------------- CLIENT ----------------------------------
+
+# One long-lived client per worker process. The HTTP pool is bounded so a
+# burst of generations can't open an unbounded number of sockets, and
+# connections are kept alive between calls to skip the TLS handshake.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "300"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+_client: AsyncOpenAI | None = None
+
+
+def init_client() -> AsyncOpenAI:
+    """Create the shared AsyncOpenAI client. Called from the app lifespan."""
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+        )
+        _client = AsyncOpenAI(http_client=http_client, max_retries=LLM_MAX_RETRIES)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and its connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_client() -> AsyncOpenAI:
+    # Lazily create the client when used outside the app (CLI, scripts).
+    return _client or init_client()
+
+
+def _coalesced(key: str, cache: str | None, produce) -> single_flight.Flight:
+    """Share one upstream call between identical concurrent requests.
+
+    Other workers' in-flight calls are only waited on when this request may
+    read the cache, since that is where their answer arrives.
+    """
+    async def guarded() -> AsyncIterator[str]:
+        if cache is not None:
+            async for delta in produce():
+                yield delta
+            return
+        async with single_flight.across_workers(key, lambda: llm_cache.cache.get(key)) as cached:
+            if cached is not None:
+                yield cached
+                return
+            async for delta in produce():
+                yield delta
+
+    return single_flight.join(key, guarded)
+
+
+async def _chat(model: str, messages: list[dict[str, str]], cache: str | None = None, **params) -> str:
+    """One completion for `model`, served from cache or routed to the healthiest model of its chain."""
+    key = llm_cache.make_key(model, messages, params)
+    if cache is None:
+        cached = llm_cache.cache.get(key)
+        if cached is not None:
+            return cached
+
+    async def call(model_name: str) -> str:
+        # Budgeted per model: a fallback may have a different context window
+        fitted, max_tokens = token_budget.fit(model_name, messages, params.get("max_tokens"))
+        start = time.perf_counter()
+        try:
+            response = await get_client().chat.completions.create(
+                model=model_name,
+                messages=fitted,
+                **{**params, "max_tokens": max_tokens},
+            )
+        except Exception as e:
+            metrics.observe_llm_error(model_name, e, time.perf_counter() - start)
+            raise
+        metrics.observe_llm_call(model_name, time.perf_counter() - start, response.usage)
+        return response.choices[0].message.content.strip()
+
+    async def produce() -> AsyncIterator[str]:
+        content = await model_router.router.call(model, call)
+        if cache != "bypass":
+            llm_cache.cache.set(key, content)
+        yield content
+
+    return await _coalesced(key, cache, produce).result()
+
+
+async def _open_stream(model_name: str, messages: list[dict[str, str]], params: dict) -> AsyncIterator[str]:
+    fitted, max_tokens = token_budget.fit(model_name, messages, params.get("max_tokens"))
+    start = time.perf_counter()
+    ttft = usage = None
+    try:
+        stream = await get_client().chat.completions.create(
+            model=model_name,
+            messages=fitted,
+            stream=True,
+            # The final chunk then carries token usage
+            stream_options={"include_usage": True},
+            **{**params, "max_tokens": max_tokens},
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Release the pooled connection even if the client disconnected mid-stream
+            await stream.close()
+    except Exception as e:
+        metrics.observe_llm_error(model_name, e, time.perf_counter() - start)
+        raise
+    metrics.observe_llm_call(model_name, time.perf_counter() - start, usage, ttft, stream=True)
+
+
+async def _chat_stream(model: str, messages: list[dict[str, str]], cache: str | None = None, **params) -> AsyncIterator[str]:
+    """Yield content deltas as they arrive instead of waiting for the full completion."""
+    key = llm_cache.make_key(model, messages, params)
+    if cache is None:
+        cached = llm_cache.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    async def produce() -> AsyncIterator[str]:
+        # Deltas are only collected when the finished text is going into the cache
+        parts: list[str] | None = [] if cache != "bypass" else None
+        async for delta in model_router.router.stream(model, lambda m: _open_stream(m, messages, params)):
+            if parts is not None:
+                parts.append(delta)
+            yield delta
+        if parts is not None:
+            llm_cache.cache.set(key, "".join(parts).strip())
+
+    async for delta in _coalesced(key, cache, produce).follow():
+        yield delta
+
+
+# ----------------------------- GENERATE / CRITIQUE ---------------------
+
+
+def _system_prompt(custom_prompt: str | None, name: str, **values) -> str:
+    """Custom prompt or prompts/<name>.txt, with {topic}/{supplemental}/{instructions} filled in."""
+    if custom_prompt:
+        return compile_template(custom_prompt).render(**values)
+    return render_prompt(name, **values)
+
+
+def _article_messages(topic: str, instructions: str | None, custom_prompt: str | None, supplemental: str | None) -> list[dict[str, str]]:
+    system_prompt = _system_prompt(custom_prompt, 'system_prompt', topic=topic, instructions=instructions, supplemental=supplemental)
     user_prompt = f"Write an in-depth article about: {topic}"
     if supplemental:
         user_prompt = f"Supplemental information:\n{supplemental}\n\n" + user_prompt
     if instructions:
         user_prompt += f"\nInstructions: {instructions}"
-    response = openai.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+async def generate_article(topic: str, instructions: str | None = None, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None) -> str:
+    return await _chat("gpt-4", _article_messages(topic, instructions, custom_prompt, supplemental), cache=cache)
+
+
+def stream_article(topic: str, instructions: str | None = None, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None) -> AsyncIterator[str]:
+    return _chat_stream("gpt-4", _article_messages(topic, instructions, custom_prompt, supplemental), cache=cache)
+
+
+# Sections of an outline-driven article written at once; each is its own completion.
+SECTION_CONCURRENCY = int(os.getenv("SECTION_CONCURRENCY", "8"))
+
+
+def _section_messages(topic: str, outline: str, unit: dict, instructions: str | None, custom_prompt: str | None, supplemental: str | None) -> list[dict[str, str]]:
+    system_prompt = _system_prompt(custom_prompt, 'system_prompt', topic=topic, instructions=instructions, supplemental=supplemental)
+    # Shared context goes first and is identical across sections of one article
+    context = f"You are writing one section of an in-depth article about: {topic}\n\nFull outline:\n{outline}\n\n"
+    if supplemental:
+        context = f"Supplemental information:\n{supplemental}\n\n" + context
+    if instructions:
+        context += f"Instructions: {instructions}\n\n"
+    where = f"'{unit['parent']} > {unit['heading']}'" if unit['parent'] else f"'{unit['heading']}'"
+    task = (
+        f"Write ONLY the body of the section {where}, about {unit['words']} words. "
+        "Do not repeat the heading, do not write other sections, and do not add an article-level introduction or conclusion."
     )
-    article = response.choices[0].message.content.strip()
-    return article
+    if unit.get('intro'):
+        task += " This is the short lead-in before the section's sub-sections."
+    if unit['notes'].strip():
+        task += f"\nCover these points:\n{unit['notes']}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": context + task},
+    ]
+
+
+def _section_tasks(topic: str, outline: str, instructions: str | None, custom_prompt: str | None, supplemental: str | None, cache: str | None, target_words: int | None):
+    title, units = outline_tools.plan_sections(outline, target_words)
+    if not units:
+        raise ValueError("Outline has no H2/H3 sections to generate")
+    semaphore = asyncio.Semaphore(SECTION_CONCURRENCY)
+
+    async def write(unit: dict) -> str:
+        if not unit['words']:
+            return ""
+        async with semaphore:
+            return await _chat(
+                "gpt-4",
+                _section_messages(topic, outline, unit, instructions, custom_prompt, supplemental),
+                cache=cache,
+                max_tokens=min(4096, unit['words'] * 2),
+            )
+
+    return title or topic, units, [asyncio.ensure_future(write(u)) for u in units]
+
+
+async def generate_article_from_outline(topic: str, outline: str, instructions: str | None = None, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None, target_words: int | None = None) -> str:
+    """Write every H2/H3 section of `outline` concurrently and stitch them in outline order."""
+    title, units, tasks = _section_tasks(topic, outline, instructions, custom_prompt, supplemental, cache, target_words)
+    try:
+        bodies = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return outline_tools.stitch(title, units, bodies)
+
+
+async def stream_article_from_outline(topic: str, outline: str, instructions: str | None = None, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None, target_words: int | None = None) -> AsyncIterator[str]:
+    """Sections still run concurrently; each is emitted as soon as it and all earlier ones are done."""
+    title, units, tasks = _section_tasks(topic, outline, instructions, custom_prompt, supplemental, cache, target_words)
+    try:
+        yield f"# {title}\n\n"
+        for unit, task in zip(units, tasks):
+            yield outline_tools.render_unit(unit, await task)
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
-def critique_content(markdown: str, custom_prompt: str | None = None, supplemental: str | None = None) -> str:
-    system_prompt = custom_prompt or load_prompt('critique')
+def _critique_messages(markdown: str, custom_prompt: str | None, supplemental: str | None, audit_findings: str | None = None) -> list[dict[str, str]]:
+    system_prompt = _system_prompt(custom_prompt, 'critique', supplemental=supplemental)
     user_prompt = ""
     if supplemental:
         user_prompt += f"Supplemental information:\n{supplemental}\n\n"
+    if audit_findings:
+        # Mechanical checks are already done; spend the critique on judgement calls
+        user_prompt += (
+            f"{audit_findings}\n\nThese automated findings are already verified. Include them in your fixes "
+            "without re-deriving them, and focus on what an automated check cannot judge.\n\n"
+        )
     user_prompt += f"Please critique the following markdown content for SEO, clarity, and quality.\n\n{markdown}"
-    response = openai.chat.completions.create(
-        model="gpt-4",
-        messages=[
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+async def critique_content(markdown: str, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None, audit_findings: str | None = None) -> str:
+    return await _chat("gpt-4", _critique_messages(markdown, custom_prompt, supplemental, audit_findings), cache=cache)
+
+
+def stream_critique(markdown: str, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None, audit_findings: str | None = None) -> AsyncIterator[str]:
+    return _chat_stream("gpt-4", _critique_messages(markdown, custom_prompt, supplemental, audit_findings), cache=cache)
+
+
+async def critique_chunk(chunk: str, part: int, parts: int, doc_outline: str, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None) -> str:
+    """Critique one heading-aligned chunk of a longer document."""
+    system_prompt = _system_prompt(custom_prompt, 'critique', supplemental=supplemental)
+    user_prompt = ""
+    if supplemental:
+        user_prompt += f"Supplemental information:\n{supplemental}\n\n"
+    user_prompt += (
+        f"This is part {part} of {parts} of a longer markdown document. Its full heading outline is:\n{doc_outline}\n\n"
+        "Critique ONLY this part for SEO, clarity, and quality. Give concrete, actionable findings per heading; "
+        "do not score the whole document.\n\n"
+        f"{chunk}"
+    )
+    return await _chat(
+        "gpt-4",
+        [
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+            {"role": "user", "content": user_prompt},
+        ],
+        cache=cache,
     )
-    critique = response.choices[0].message.content.strip()
-    return critique
+
+
+async def summarize_critique(section_findings: str, doc_outline: str, custom_prompt: str | None = None, cache: str | None = None, audit_findings: str | None = None) -> str:
+    """Turn per-section findings (and any document-level audit findings) into a document-level verdict."""
+    system_prompt = _system_prompt(custom_prompt, 'critique')
+    user_prompt = (
+        f"A long markdown document with this heading outline was critiqued section by section:\n{doc_outline}\n\n"
+        f"Section findings:\n{section_findings}\n\n"
+    )
+    if audit_findings:
+        # Whole-document checks (length, keyword use, structure) that no single section sees
+        user_prompt += (
+            f"{audit_findings}\n\nThese automated findings are already verified. Include them in the priority "
+            "list without re-deriving them.\n\n"
+        )
+    user_prompt += (
+        "Write the document-level summary: overall score, the most important fixes in priority order, and any "
+        "cross-section issues (heading hierarchy, repetition, internal linking, missing topics). Do not repeat every finding."
+    )
+    return await _chat(
+        "gpt-4",
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        cache=cache,
+    )
+
+
+# ----------------------------- KEYWORDS --------------------------------
+
+
+async def rerank_keywords(topic: str, keywords: list[str], cache: str | None = None) -> list[str]:
+    """Reorder locally extracted keywords by search value. Only ever reorders: the model can't add terms."""
+    user_prompt = (
+        f"Article topic: {topic}\n\nCandidate keywords:\n" + "\n".join(keywords) + "\n\n"
+        "Reorder these candidates from most to least valuable as SEO keywords for the article. "
+        "Return only the keywords, one per line, exactly as written."
+    )
+    ranked = await _chat(
+        "gpt-4o",
+        [
+            {"role": "system", "content": "You are an SEO keyword strategist."},
+            {"role": "user", "content": user_prompt},
+        ],
+        cache=cache,
+        temperature=0,
+    )
+    known = set(keywords)
+    order = [k for k in dict.fromkeys(line.strip(" -*\t").lower() for line in ranked.splitlines()) if k in known]
+    return order + [k for k in keywords if k not in order]
 
 
 # ----------------------------- PLANNER ---------------------------------
@@ -53,48 +378,83 @@ def _default_planner_system_prompt() -> str:
     )
 
 
-def generate_plan(topic: str, custom_prompt: str | None = None, supplemental: str | None = None) -> str:
-    """Generate an initial content outline for the provided topic."""
-    system_prompt = custom_prompt or _default_planner_system_prompt()
+def _plan_messages(topic: str, custom_prompt: str | None, supplemental: str | None) -> list[dict[str, str]]:
+    system_prompt = compile_template(custom_prompt).render(topic=topic, supplemental=supplemental) if custom_prompt else _default_planner_system_prompt()
     user_prompt = ""
     if supplemental:
         user_prompt += f"Supplemental information:\n{supplemental}\n\n"
     user_prompt += f"Create an outline for an article about: {topic}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
-    response = openai.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
-    outline = response.choices[0].message.content.strip()
-    return outline
+
+async def generate_plan(topic: str, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None) -> str:
+    """Generate an initial content outline for the provided topic."""
+    return await _chat("gpt-4", _plan_messages(topic, custom_prompt, supplemental), cache=cache)
+
+
+def stream_plan(topic: str, custom_prompt: str | None = None, supplemental: str | None = None, cache: str | None = None) -> AsyncIterator[str]:
+    return _chat_stream("gpt-4", _plan_messages(topic, custom_prompt, supplemental), cache=cache)
+
+
+def _continue_plan_messages(
+    custom_prompt: str | None,
+    conversation: list[dict[str, str]],
+    supplemental: str | None,
+) -> list[dict[str, str]]:
+    system_prompt = compile_template(custom_prompt).render(supplemental=supplemental) if custom_prompt else _default_planner_system_prompt()
+
+    # Ensure the system prompt is the first message for OpenAI
+    if supplemental:
+        conversation = conversation + [{"role":"system","content":f"Supplemental information:\n{supplemental}"}]
+    return [{"role": "system", "content": system_prompt}] + conversation
 
 
-def continue_plan(
+async def continue_plan(
     topic: str,
     custom_prompt: str | None,
     conversation: list[dict[str, str]],
     user_message: str,
     supplemental: str | None = None,
+    cache: str | None = None,
 ) -> str:
     """Continue refining the outline based on the ongoing conversation."""
+    return await _chat("gpt-4", _continue_plan_messages(custom_prompt, conversation, supplemental), cache=cache)
 
-    system_prompt = custom_prompt or _default_planner_system_prompt()
 
-    # Ensure the system prompt is the first message for OpenAI
-    if supplemental:
-        conversation = conversation + [{"role":"system","content":f"Supplemental information:\n{supplemental}"}]
-    messages_for_openai: list[dict[str, str]] = [{"role": "system", "content": system_prompt}] + conversation
+def stream_continue_plan(
+    topic: str,
+    custom_prompt: str | None,
+    conversation: list[dict[str, str]],
+    user_message: str,
+    supplemental: str | None = None,
+    cache: str | None = None,
+) -> AsyncIterator[str]:
+    return _chat_stream("gpt-4", _continue_plan_messages(custom_prompt, conversation, supplemental), cache=cache)
 
-    response = openai.chat.completions.create(
-        model="gpt-4",
-        messages=messages_for_openai,
+async def summarize_planner_turns(previous_summary: str | None, turns: list[dict[str, str]], cache: str | None = None) -> str:
+    """Fold older planner turns into a running summary of decisions made so far."""
+    transcript = "\n\n".join(f"{t['role'].upper()}: {t['content']}" for t in turns)
+    user_prompt = ""
+    if previous_summary:
+        user_prompt += f"Summary so far:\n{previous_summary}\n\n"
+    user_prompt += (
+        f"Newer conversation turns:\n{transcript}\n\n"
+        "Update the summary of this content-planning conversation. Keep the topic, the current outline structure, "
+        "every decision and constraint the user stated, and open questions. Drop pleasantries and superseded drafts. "
+        "Return only the summary."
+    )
+    return await _chat(
+        "gpt-4",
+        [
+            {"role": "system", "content": "You maintain concise running summaries of planning conversations."},
+            {"role": "user", "content": user_prompt},
+        ],
+        cache=cache,
+        max_tokens=1024,
     )
-
-    outline = response.choices[0].message.content.strip()
-    return outline 
 
 # --- Refinement System Prompts ---
 _default_prompt_system = (
@@ -106,8 +466,7 @@ _default_supplement_system = (
 )
 
 
-def refine_text(text: str, mode: str, instruction: str | None = None, custom_system_prompt: str | None = None) -> str:
-    """Refine a prompt or supplemental text based on mode. instruction is the user request."""
+def _refine_messages(text: str, mode: str, instruction: str | None, custom_system_prompt: str | None) -> list[dict[str, str]]:
     system_prompt = custom_system_prompt or (
         _default_prompt_system if mode == "prompt" else _default_supplement_system
     )
@@ -118,44 +477,26 @@ def refine_text(text: str, mode: str, instruction: str | None = None, custom_sys
         + "\nReturn ONLY the refined version, no commentary."
     )
 
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_content},
     ]
 
+
+async def refine_text(text: str, mode: str, instruction: str | None = None, custom_system_prompt: str | None = None) -> str:
+    """Refine a prompt or supplemental text based on mode. instruction is the user request."""
+    messages = _refine_messages(text, mode, instruction, custom_system_prompt)
+
     try:
-        import openai
-
-        # Prefer GPT-4; fall back to GPT-3.5 if not available
-        def chat_completion(model_name:str):
-            # Prefer new SDK interface; fallback to legacy
-            try:
-                return openai.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    max_tokens=2048,
-                    temperature=0.7,
-                )
-            except AttributeError:
-                # Older SDK (<1.0)
-                return openai.ChatCompletion.create(
-                    model=model_name,
-                    messages=messages,
-                    max_tokens=2048,
-                    temperature=0.7,
-                )
-
-        try_model = "gpt-4o"
-        try:
-            completion = chat_completion(try_model)
-        except Exception:
-            completion = chat_completion("gpt-3.5-turbo")
-        # Handle response structure difference
-        if hasattr(completion, "choices"):
-            return completion.choices[0].message.content.strip()
-        else:  # openai>=1 returns object with choices list as attribute
-            return completion.choices[0].message.content.strip()
+        # GPT-4o, with GPT-3.5 as the router's fallback when 4o is failing
+        return await _chat("gpt-4o", messages, max_tokens=2048, temperature=0.7)
     except Exception as e:
         # Fallback – return original text if OpenAI fails
-        print("OpenAI refine_text error", e)
-        return text 
\ No newline at end of file
+        metrics.logger.warning("refine_text failed, returning original text: %s", e)
+        return text
+
+
+def stream_refine_text(text: str, mode: str, instruction: str | None = None, custom_system_prompt: str | None = None) -> AsyncIterator[str]:
+    """Streaming variant of refine_text."""
+    messages = _refine_messages(text, mode, instruction, custom_system_prompt)
+    return _chat_stream("gpt-4o", messages, max_tokens=2048, temperature=0.7)
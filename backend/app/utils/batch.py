@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from backend.app.utils import ai_tools, retrieval
+from backend.app.utils.json_store import JsonFile, Unchanged
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+BATCH_DIR = os.path.join(DATA_DIR, 'batches')
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Upper bound a request may ask for; each slot holds an LLM call open
+MAX_BATCH_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+# A running batch rewrites its heartbeat this often; one silent for BATCH_STALE_AFTER is treated as dead
+BATCH_HEARTBEAT_INTERVAL = float(os.getenv("BATCH_HEARTBEAT_INTERVAL", "10"))
+BATCH_STALE_AFTER = float(os.getenv("BATCH_STALE_AFTER", "60"))
+
+_BATCH_ID = re.compile(r'^[\w\-]{1,64}$')
+
+
+def manifest_path(batch_id: str) -> str:
+    if not _BATCH_ID.match(batch_id):
+        raise ValueError(f"Invalid batch id: {batch_id!r}")
+    return os.path.join(BATCH_DIR, f"{batch_id}.jsonl")
+
+
+def _state_file(path: str) -> JsonFile:
+    return JsonFile(f"{path}.state.json", {})
+
+
+def claim_manifest(path: str, topics: List[str]) -> bool:
+    """Create the manifest and mark the batch running here; False if a live run (in any worker) owns it.
+
+    The state file next to the manifest records the batch's topics, its status
+    and a heartbeat, so any worker can report on the batch.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    open(path, 'a', encoding='utf-8').close()
+    claimed = False
+    with _state_file(path).transaction() as state:
+        if state.get("status") == "running" and time.time() - state.get("heartbeat_at", 0) < BATCH_STALE_AFTER:
+            raise Unchanged
+        state.clear()
+        state.update({
+            "topics": list(dict.fromkeys(topics)),
+            "status": "running",
+            "started_at": datetime.utcnow().isoformat(),
+            "heartbeat_at": time.time(),
+        })
+        claimed = True
+    return claimed
+
+
+def _set_state(path: str, **changes) -> None:
+    with _state_file(path).transaction() as state:
+        state.update(changes)
+
+
+def manifest_state(path: str) -> Dict:
+    """The batch's recorded state; a run whose heartbeat stopped (e.g. its process died) reads as "interrupted"."""
+    if not os.path.exists(f"{path}.state.json"):
+        return {}  # e.g. a manifest written by the CLI
+    state = dict(_state_file(path).read())
+    if state.get("status") == "running" and time.time() - state.get("heartbeat_at", 0) >= BATCH_STALE_AFTER:
+        state["status"] = "interrupted"
+    return state
+
+
+async def run_claimed(manifest: str, topics: List[str], *args, **kwargs) -> Dict[str, int]:
+    """`run_batch` for a batch claimed with `claim_manifest`: heartbeats while it runs, then records how it ended."""
+    async def beat() -> None:
+        while True:
+            await asyncio.sleep(BATCH_HEARTBEAT_INTERVAL)
+            await asyncio.to_thread(_set_state, manifest, heartbeat_at=time.time())
+
+    beater = asyncio.create_task(beat())
+    status, error = "failed", None
+    try:
+        summary = await run_batch(topics, manifest, *args, **kwargs)
+        status = "done"
+        return summary
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        beater.cancel()
+        _set_state(manifest, status=status, error=error, finished_at=datetime.utcnow().isoformat())
+
+
+def read_manifest(path: str) -> Dict[str, Dict]:
+    """Latest manifest entry per topic. A torn last line from a crash is ignored."""
+    entries: Dict[str, Dict] = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry['topic']] = entry
+    return entries
+
+
+def pending_topics(topics: List[str], path: str) -> List[str]:
+    """Topics (deduplicated, in order) that don't yet have a successful result in the manifest."""
+    done = {t for t, e in read_manifest(path).items() if e.get('status') == 'done'}
+    return [t for t in dict.fromkeys(topics) if t not in done]
+
+
+async def run_batch(
+    topics: List[str],
+    manifest: str,
+    concurrency: int = BATCH_CONCURRENCY,
+    instructions: Optional[str] = None,
+    custom_prompt: Optional[str] = None,
+    supplemental: Optional[str] = None,
+    cache: Optional[str] = None,
+    on_result: Optional[Callable[[Dict], Dict]] = None,
+    top_k: Optional[int] = None,
+    supplemental_ids: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """Generate an article per topic, at most `concurrency` at a time.
+
+    Every finished topic is appended to the JSONL `manifest` immediately, so
+    re-running with the same manifest skips topics that already succeeded.
+    `on_result` may rewrite a successful entry before it is written (e.g. to
+    save the article to disk and record its path instead). With `top_k`, each
+    topic gets its own retrieved supplemental chunks.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(manifest)), exist_ok=True)
+    todo = pending_topics(topics, manifest)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    write_lock = asyncio.Lock()
+    summary = {"total": len(dict.fromkeys(topics)), "skipped": 0, "done": 0, "failed": 0}
+    summary["skipped"] = summary["total"] - len(todo)
+
+    with open(manifest, 'a', encoding='utf-8') as out:
+        async def run_one(topic: str) -> None:
+            async with semaphore:
+                try:
+                    context = retrieval.supplemental_context(topic, supplemental, top_k, supplemental_ids)
+                    article = await ai_tools.generate_article(topic, instructions, custom_prompt, context, cache)
+                    entry = {"topic": topic, "status": "done", "article": article}
+                    if on_result:
+                        entry = on_result(entry)
+                except Exception as e:
+                    entry = {"topic": topic, "status": "failed", "error": str(e)}
+            entry["finished_at"] = datetime.utcnow().isoformat()
+            async with write_lock:
+                out.write(json.dumps(entry) + "\n")
+                out.flush()
+                summary[entry["status"]] += 1
+
+        await asyncio.gather(*(run_one(t) for t in todo))
+    return summary
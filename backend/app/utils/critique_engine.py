@@ -0,0 +1,239 @@
+"""Critique long markdown documents in heading-aligned chunks, concurrently."""
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from backend.app.utils import ai_tools, llm_cache, token_budget
+
+# Chunks are packed up to this many (estimated) tokens of markdown each
+CRITIQUE_CHUNK_TOKENS = int(os.getenv("CRITIQUE_CHUNK_TOKENS", "2500"))
+# Documents above this size are chunked automatically unless the caller says otherwise
+CRITIQUE_CHUNK_THRESHOLD = int(os.getenv("CRITIQUE_CHUNK_THRESHOLD", "4000"))
+CRITIQUE_CONCURRENCY = int(os.getenv("CRITIQUE_CONCURRENCY", "6"))
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+
+
+def estimate_tokens(text: str) -> int:
+    return token_budget.count_tokens(text)
+
+
+def split_sections(markdown: str) -> List[Dict]:
+    """Split on markdown headings. Text before the first heading becomes an untitled section."""
+    sections: List[Dict] = []
+    current = {"heading": None, "level": 0, "text": ""}
+    in_code = False
+    for line in markdown.splitlines(keepends=True):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        m = None if in_code else _HEADING.match(line.rstrip("\n"))
+        if m:
+            if current["text"].strip():
+                sections.append(current)
+            current = {"heading": m.group(2), "level": len(m.group(1)), "text": line}
+        else:
+            current["text"] += line
+    if current["text"].strip():
+        sections.append(current)
+    return sections
+
+
+def _split_oversize(section: Dict, max_tokens: int) -> List[Dict]:
+    """Break a single section that is bigger than a chunk on paragraph boundaries."""
+    pieces, buf = [], ""
+    for para in re.split(r'(\n\s*\n)', section["text"]):
+        if buf and estimate_tokens(buf + para) > max_tokens:
+            pieces.append(buf)
+            buf = ""
+        buf += para
+    if buf.strip():
+        pieces.append(buf)
+    return [
+        {"heading": section["heading"] if i == 0 else f"{section['heading']} (cont.)",
+         "level": section["level"], "text": text}
+        for i, text in enumerate(pieces)
+    ]
+
+
+def chunk_sections(sections: List[Dict], max_tokens: int = CRITIQUE_CHUNK_TOKENS) -> List[Dict]:
+    """Greedily pack consecutive sections into chunks of at most `max_tokens`."""
+    chunks: List[Dict] = []
+    current = {"headings": [], "text": ""}
+    for section in sections:
+        parts = _split_oversize(section, max_tokens) if estimate_tokens(section["text"]) > max_tokens else [section]
+        for part in parts:
+            if current["text"] and estimate_tokens(current["text"] + part["text"]) > max_tokens:
+                chunks.append(current)
+                current = {"headings": [], "text": ""}
+            current["headings"].append(part["heading"] or "(Introduction)")
+            current["text"] += part["text"]
+    if current["text"].strip():
+        chunks.append(current)
+    return chunks
+
+
+def heading_outline(sections: List[Dict]) -> str:
+    return "\n".join(f"{'  ' * (s['level'] - 1)}- {s['heading']}" for s in sections if s["heading"])
+
+
+def should_chunk(markdown: str) -> bool:
+    return estimate_tokens(markdown) > CRITIQUE_CHUNK_THRESHOLD
+
+
+async def critique_document(
+    markdown: str,
+    custom_prompt: Optional[str] = None,
+    supplemental: Optional[str] = None,
+    cache: Optional[str] = None,
+    max_chunk_tokens: int = CRITIQUE_CHUNK_TOKENS,
+    audit_findings: Optional[str] = None,
+) -> Dict:
+    """Critique every chunk concurrently, then summarize the findings.
+
+    Returns `{"sections": [{"headings": [...], "findings": str}, ...], "summary": str}`
+    with sections in document order.
+    """
+    chunks, outline, tasks = _start_chunks(markdown, custom_prompt, supplemental, cache, max_chunk_tokens)
+    try:
+        findings = await asyncio.gather(*tasks)
+    except BaseException:
+        # One chunk failed (or we were cancelled): don't keep paying for the rest
+        for task in tasks:
+            task.cancel()
+        raise
+    report_sections = [{"headings": c["headings"], "findings": f} for c, f in zip(chunks, findings)]
+    summary = await ai_tools.summarize_critique(_render_sections(report_sections), outline, custom_prompt, cache, audit_findings)
+    return {"sections": report_sections, "summary": summary}
+
+
+async def stream_document(
+    markdown: str,
+    custom_prompt: Optional[str] = None,
+    supplemental: Optional[str] = None,
+    cache: Optional[str] = None,
+    max_chunk_tokens: int = CRITIQUE_CHUNK_TOKENS,
+    audit_findings: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """`critique_document` as text deltas: each chunk's findings in document order, then the summary.
+
+    Chunks still run concurrently; a chunk's findings are sent once it and
+    every chunk before it have finished.
+    """
+    chunks, outline, tasks = _start_chunks(markdown, custom_prompt, supplemental, cache, max_chunk_tokens)
+    try:
+        report_sections = []
+        yield "## Section findings\n\n"
+        for chunk, task in zip(chunks, tasks):
+            section = {"headings": chunk["headings"], "findings": await task}
+            report_sections.append(section)
+            yield _render_sections([section]) + "\n\n"
+        summary = await ai_tools.summarize_critique(_render_sections(report_sections), outline, custom_prompt, cache, audit_findings)
+        yield f"## Summary\n\n{summary}"
+    finally:
+        # Client went away: don't keep paying for the remaining chunks
+        for task in tasks:
+            task.cancel()
+
+
+def _start_chunks(
+    markdown: str, custom_prompt: Optional[str], supplemental: Optional[str], cache: Optional[str], max_chunk_tokens: int,
+) -> Tuple[List[Dict], str, List[asyncio.Task]]:
+    """Chunk the document and start critiquing every chunk, at most CRITIQUE_CONCURRENCY at a time."""
+    sections = split_sections(markdown)
+    chunks = chunk_sections(sections, max_chunk_tokens)
+    outline = heading_outline(sections) or "(no headings)"
+    semaphore = asyncio.Semaphore(CRITIQUE_CONCURRENCY)
+
+    async def run(i: int, chunk: Dict) -> str:
+        async with semaphore:
+            return await ai_tools.critique_chunk(chunk["text"], i + 1, len(chunks), outline, custom_prompt, supplemental, cache)
+
+    return chunks, outline, [asyncio.create_task(run(i, c)) for i, c in enumerate(chunks)]
+
+
+def critique_sections(markdown: str, max_tokens: int = CRITIQUE_CHUNK_TOKENS) -> List[Dict]:
+    """H2-level sections (deeper headings stay inside their H2), oversize ones split by paragraph."""
+    grouped: List[Dict] = []
+    for s in split_sections(markdown):
+        if grouped and s["level"] > 2:
+            grouped[-1]["text"] += s["text"]
+        else:
+            grouped.append(dict(s))
+    sections: List[Dict] = []
+    for s in grouped:
+        sections.extend(_split_oversize(s, max_tokens) if estimate_tokens(s["text"]) > max_tokens else [s])
+    return sections
+
+
+def section_hash(text: str) -> str:
+    """Hash of a section's text, ignoring trailing whitespace and blank-line runs."""
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    normalized = re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _findings_key(digest: str, custom_prompt: Optional[str], supplemental: Optional[str]) -> str:
+    # Position and the rest of the outline are left out so that edits elsewhere don't invalidate a section
+    payload = json.dumps({"critique_section": digest, "prompt": custom_prompt, "supplemental": supplemental})
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+async def critique_incremental(
+    markdown: str,
+    custom_prompt: Optional[str] = None,
+    supplemental: Optional[str] = None,
+    cache: Optional[str] = None,
+    max_section_tokens: int = CRITIQUE_CHUNK_TOKENS,
+    audit_findings: Optional[str] = None,
+) -> Dict:
+    """Critique section by section, reusing stored findings for sections unchanged since a previous run.
+
+    Findings are kept in the LLM cache under a hash of the section text (plus the
+    prompt and supplemental text), so only new or edited sections go to the model.
+    Returns the `critique_document` report shape; each section also carries its
+    `hash` and `fresh` (critiqued in this run), and the report counts both kinds.
+    """
+    sections = critique_sections(markdown, max_section_tokens)
+    outline = heading_outline(sections) or "(no headings)"
+    semaphore = asyncio.Semaphore(CRITIQUE_CONCURRENCY)
+
+    async def run(i: int, section: Dict) -> Dict:
+        digest = section_hash(section["text"])
+        key = _findings_key(digest, custom_prompt, supplemental)
+        findings = llm_cache.cache.get(key) if cache is None else None
+        fresh = findings is None
+        if fresh:
+            async with semaphore:
+                findings = await ai_tools.critique_chunk(section["text"], i + 1, len(sections), outline, custom_prompt, supplemental, cache)
+            if cache != "bypass":
+                llm_cache.cache.set(key, findings)
+        return {"headings": [section["heading"] or "(Introduction)"], "hash": digest[:16], "findings": findings, "fresh": fresh}
+
+    tasks = [asyncio.create_task(run(i, s)) for i, s in enumerate(sections)]
+    try:
+        report_sections = list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    # Unchanged findings give an identical summary prompt, which the LLM cache answers
+    summary = await ai_tools.summarize_critique(_render_sections(report_sections), outline, custom_prompt, cache, audit_findings)
+    fresh = sum(1 for s in report_sections if s["fresh"])
+    return {"sections": report_sections, "summary": summary, "fresh_sections": fresh, "reused_sections": len(report_sections) - fresh}
+
+
+def _render_sections(sections: List[Dict], mark_fresh: bool = False) -> str:
+    return "\n\n".join(
+        f"### {' / '.join(s['headings'])}{' (new)' if mark_fresh and s.get('fresh') else ''}\n\n{s['findings']}"
+        for s in sections
+    )
+
+
+def render_report(report: Dict) -> str:
+    """Flatten a report into markdown for clients that expect a single critique string."""
+    # Incremental reports flag the sections critiqued in this run, once some were reused
+    mark_fresh = bool(report.get("reused_sections"))
+    return f"## Summary\n\n{report['summary']}\n\n## Section findings\n\n{_render_sections(report['sections'], mark_fresh)}"
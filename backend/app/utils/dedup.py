@@ -0,0 +1,221 @@
+"""Near-duplicate detection for articles and planner outlines with MinHash + LSH.
+
+Every document is reduced to a fixed-size MinHash signature of its word
+shingles; signatures are split into bands and hashed into buckets, so a
+lookup only compares against documents sharing a bucket instead of the
+whole corpus. Signatures live in data/dedup/<kind>.json (one file per kind)
+and the buckets are rebuilt in memory whenever that file changes.
+"""
+import glob
+import os
+import re
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.app.utils.json_store import JsonFile, Unchanged
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+DEDUP_DIR = os.path.join(DATA_DIR, 'dedup')
+# Same relative directory scripts/generate.py saves articles to
+CONTENT_DIR = os.getenv("RUGS_CONTENT_DIR", "content")
+
+NUM_PERM = 128
+# 32 bands x 4 rows: pairs above ~0.42 Jaccard almost always share a bucket
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+# Estimated Jaccard similarity at which two documents are reported
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+# Outlines are short, so they use shorter shingles than full articles
+SHINGLE_WORDS = {"article": 5, "outline": 3}
+KINDS = tuple(SHINGLE_WORDS)
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_rng = np.random.default_rng(20240501)  # fixed: signatures must match across processes
+_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, size: int) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def signature(text: str, kind: str) -> Optional[np.ndarray]:
+    """MinHash signature: per permutation, the minimum hash over the text's shingles.
+
+    None for text without any words: a constant signature would match every
+    other empty document, so such text is never indexed or matched.
+    """
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles(text, SHINGLE_WORDS[kind])), dtype=np.uint64)
+    if not hashes.size:
+        return None
+    # (a*x + b) mod p stays below 2**64 because a, x and b are all under 2**32
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def _bands(sig: np.ndarray) -> List[str]:
+    return [f"{b}:{sig[b * LSH_ROWS:(b + 1) * LSH_ROWS].tobytes().hex()}" for b in range(LSH_BANDS)]
+
+
+class MinHashIndex(JsonFile):
+    """doc id -> {title, signature, source}; LSH buckets are derived on load."""
+
+    def __init__(self, path: str, kind: str):
+        self.kind = kind
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[str, List[str]] = {}
+        super().__init__(path, {})
+
+    def _on_load(self, docs: Dict[str, Dict]) -> None:
+        signatures, buckets = {}, {}
+        for doc_id, doc in docs.items():
+            sig = np.array(doc["signature"], dtype=np.uint64)
+            signatures[doc_id] = sig
+            for band in _bands(sig):
+                buckets.setdefault(band, []).append(doc_id)
+        self._signatures, self._buckets = signatures, buckets
+
+    def add(self, doc_id: str, text: str, title: Optional[str] = None, source: Optional[str] = None) -> None:
+        sig = signature(text, self.kind)
+        if sig is None:
+            # Emptied: drop whatever was indexed for it before
+            self.remove(doc_id)
+            return
+        with self.transaction() as docs:
+            docs[doc_id] = {"title": title or doc_id, "signature": sig.tolist(), "source": source}
+
+    def remove(self, doc_id: str) -> bool:
+        removed = False
+        with self.transaction() as docs:
+            if doc_id not in docs:
+                raise Unchanged
+            del docs[doc_id]
+            removed = True
+        return removed
+
+    def query(self, text: str, exclude: Optional[str] = None, threshold: float = DEDUP_THRESHOLD) -> List[Dict]:
+        """Indexed documents whose estimated Jaccard similarity to `text` is at least `threshold`."""
+        sig = signature(text, self.kind)
+        if sig is None:
+            return []
+        with self._mutex:
+            self._refresh()
+            docs = self._data
+            candidates = {d for band in _bands(sig) for d in self._buckets.get(band, ())}
+            candidates.discard(exclude)
+            matches = [
+                {"id": d, "title": docs[d]["title"], "similarity": round(float(np.mean(self._signatures[d] == sig)), 3)}
+                for d in candidates
+            ]
+        return sorted((m for m in matches if m["similarity"] >= threshold), key=lambda m: m["similarity"], reverse=True)
+
+    def pairs(self, threshold: float = DEDUP_THRESHOLD) -> List[Dict]:
+        """Every near-duplicate pair in the index, checked only within shared buckets."""
+        with self._mutex:
+            self._refresh()
+            docs = self._data
+            seen = set()
+            found = []
+            for members in self._buckets.values():
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        pair = (a, b) if a < b else (b, a)
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        similarity = float(np.mean(self._signatures[a] == self._signatures[b]))
+                        if similarity >= threshold:
+                            found.append({
+                                "a": {"id": pair[0], "title": docs[pair[0]]["title"]},
+                                "b": {"id": pair[1], "title": docs[pair[1]]["title"]},
+                                "similarity": round(similarity, 3),
+                            })
+        return sorted(found, key=lambda p: p["similarity"], reverse=True)
+
+
+_indexes: Dict[str, MinHashIndex] = {}
+
+
+def index(kind: str) -> MinHashIndex:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind: {kind!r}")
+    if kind not in _indexes:
+        _indexes[kind] = MinHashIndex(os.path.join(DEDUP_DIR, f"{kind}s.json"), kind)
+    return _indexes[kind]
+
+
+def topic_id(topic: str) -> str:
+    """Outlines are keyed by topic, so re-planning a topic replaces its own entry."""
+    return "topic:" + " ".join(_WORD.findall(topic.lower()))
+
+
+def article_id(path: str) -> str:
+    return f"content:{os.path.basename(path)}"
+
+
+def check_and_add(kind: str, doc_id: str, text: str, title: Optional[str] = None, source: Optional[str] = None) -> List[Dict]:
+    """Near-duplicates of `text` among other documents, then index it under `doc_id`."""
+    idx = index(kind)
+    matches = idx.query(text, exclude=doc_id)
+    idx.add(doc_id, text, title, source)
+    return matches
+
+
+def add_article(path: str, article: str) -> List[Dict]:
+    """Index a just-saved article; returns the existing articles it nearly duplicates."""
+    st = os.stat(path)
+    return check_and_add("article", article_id(path), article, os.path.basename(path), f"{st.st_mtime_ns}:{st.st_size}")
+
+
+def add_outline(topic: str, outline: str) -> List[Dict]:
+    """Index a planner outline under its topic; returns the other topics it nearly duplicates."""
+    return check_and_add("outline", topic_id(topic), outline, topic)
+
+
+async def indexed_outline(topic: str, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Pass a streamed outline through, then index it under its topic."""
+    parts = []
+    async for delta in chunks:
+        parts.append(delta)
+        yield delta
+    add_outline(topic, "".join(parts))
+
+
+def outline_duplicates(topic: str, outline: str) -> List[Dict]:
+    """Other topics' outlines that `outline` nearly duplicates, without indexing it."""
+    return index("outline").query(outline, exclude=topic_id(topic))
+
+
+def sync_articles(content_dir: str = CONTENT_DIR) -> Tuple[int, int]:
+    """Index content/*.md files added or changed outside save_article; returns (indexed, removed)."""
+    idx = index("article")
+    docs = idx.read()
+    changed: Dict[str, Dict] = {}
+    present = set()
+    for path in glob.glob(os.path.join(content_dir, '*.md')):
+        doc_id = article_id(path)
+        present.add(doc_id)
+        st = os.stat(path)
+        source = f"{st.st_mtime_ns}:{st.st_size}"
+        if docs.get(doc_id, {}).get("source") == source:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            sig = signature(f.read(), "article")
+        if sig is None:
+            present.discard(doc_id)  # nothing to compare; drop any earlier entry
+            continue
+        changed[doc_id] = {"title": os.path.basename(path), "signature": sig.tolist(), "source": source}
+    stale = [d for d in docs if d.startswith("content:") and d not in present]
+    if not changed and not stale:
+        return 0, 0
+    # One write for the whole directory rather than one per file
+    with idx.transaction() as docs:
+        docs.update(changed)
+        for doc_id in stale:
+            docs.pop(doc_id, None)
+    return len(changed), len(stale)
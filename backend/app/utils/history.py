@@ -0,0 +1,326 @@
+"""Append-only content history per project: generations, critiques and edits.
+
+Each project has two files in data/history/:
+
+* `<project_id>.log`: zlib-compressed revision records, appended and never
+  rewritten (except by `compact`). A record is either a full snapshot of the
+  content or a line delta against the previous revision; a snapshot is written
+  every `HISTORY_SNAPSHOT_EVERY` revisions, or when a delta would not be much
+  smaller than the content itself.
+* `<project_id>.idx`: one fixed-size entry per revision (offset, length, the
+  snapshot it chains from, kind, timestamp), so revision N is found without
+  scanning the log.
+
+Both files are read through `mmap`. Rebuilding revision N decompresses its
+snapshot and at most `HISTORY_SNAPSHOT_EVERY - 1` deltas.
+
+The index entry is written after its log record, so a crash leaves at worst
+unreferenced log bytes or a partial index entry; readers ignore a partial
+entry and the next append truncates it away.
+"""
+import difflib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows – fall back to the in-process lock only
+    fcntl = None
+
+from backend.app.utils import project_store
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+HISTORY_DIR = os.path.join(DATA_DIR, 'history')
+SNAPSHOT_EVERY = int(os.getenv("HISTORY_SNAPSHOT_EVERY", "20"))
+# A delta whose encoded size exceeds this share of the content is stored as a snapshot instead
+DELTA_MAX_RATIO = 0.5
+
+KINDS = ("generation", "critique", "edit")
+# offset, length, snapshot revision, kind, created_at
+_ENTRY = struct.Struct("<QIIB3xd")
+_VALID_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_mutex = threading.RLock()
+# project id -> (revision count, latest content); saves rebuilding the base on every append.
+# Keyed by count only, so another process's `compact` goes unnoticed; that is safe
+# because compaction re-encodes the same revisions and never changes their content.
+_latest: Dict[str, Tuple[int, str]] = {}
+
+
+class HistoryError(ValueError):
+    """Unknown revision or malformed request."""
+
+
+def _paths(project_id: str) -> Tuple[str, str]:
+    if not _VALID_ID.match(project_id):
+        raise HistoryError("Invalid project id")
+    base = os.path.join(HISTORY_DIR, project_id)
+    return f"{base}.log", f"{base}.idx"
+
+
+@contextmanager
+def _file_lock(project_id: str, shared: bool = False) -> Iterator[None]:
+    """Exclusive for appends and compaction; readers share it so compaction can't swap files under them."""
+    if fcntl is None:
+        with _mutex:
+            yield
+        return
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with open(os.path.join(HISTORY_DIR, f"{project_id}.lock"), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _mapped(path: str) -> Iterator[bytes]:
+    """Read-only mmap of `path`; empty bytes for a missing or empty file."""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        yield b""
+        return
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+# ------------------------------------------------------------------ deltas
+
+def _delta(old: str, new: str) -> List:
+    """Line ops turning `old` into `new`: [start, end] copies old lines, a string inserts text."""
+    a, b = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    ops: List = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(b[j1:j2]))
+    return ops
+
+
+def _patch(old: str, ops: List) -> str:
+    lines = old.splitlines(keepends=True)
+    return "".join("".join(lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+def _store_content(record: Dict, previous: str, content: str, revision: int, snapshot: int) -> int:
+    """Put `content` into `record` as a delta against `previous` or as a full snapshot.
+
+    `snapshot` is the revision the previous one chains from (0 for none); returns the new one's.
+    """
+    if snapshot and revision - snapshot < SNAPSHOT_EVERY:
+        ops = _delta(previous, content)
+        if not content or len(json.dumps(ops)) < DELTA_MAX_RATIO * len(content):
+            record["delta"] = ops
+            return snapshot
+    record["content"] = content
+    return revision
+
+
+def _encode(record: Dict) -> bytes:
+    return zlib.compress(json.dumps(record, separators=(",", ":")).encode('utf-8'))
+
+
+# ------------------------------------------------------------------ reading
+
+def _entries(idx: bytes) -> List[Tuple[int, int, int, int, float]]:
+    return [_ENTRY.unpack_from(idx, i) for i in range(0, len(idx) - len(idx) % _ENTRY.size, _ENTRY.size)]
+
+
+def _record(log: bytes, entry: Tuple) -> Dict:
+    offset, length = entry[0], entry[1]
+    return json.loads(zlib.decompress(log[offset:offset + length]))
+
+
+def _rebuild(log: bytes, entries: List[Tuple], revision: int) -> Tuple[str, Dict]:
+    """Content at `revision` (1-based) and that revision's record."""
+    snapshot = entries[revision - 1][2]
+    content = ""
+    for rev in range(snapshot, revision + 1):
+        record = _record(log, entries[rev - 1])
+        content = record["content"] if "content" in record else _patch(content, record["delta"])
+    return content, record
+
+
+def _summary(revision: int, entry: Tuple) -> Dict:
+    return {
+        "revision": revision,
+        "kind": KINDS[entry[3]],
+        "created_at": entry[4],
+        "snapshot": entry[2] == revision,
+        "stored_bytes": entry[1],
+    }
+
+
+def revisions(project_id: str) -> List[Dict]:
+    """Every revision's metadata, oldest first, from the index alone."""
+    _, idx_path = _paths(project_id)
+    with _file_lock(project_id, shared=True), _mapped(idx_path) as idx:
+        return [_summary(i, e) for i, e in enumerate(_entries(idx), 1)]
+
+
+def _read(project_id: str, revision: Optional[int]) -> Dict:
+    log_path, idx_path = _paths(project_id)
+    with _mapped(idx_path) as idx, _mapped(log_path) as log:
+        entries = _entries(idx)
+        revision = len(entries) if revision is None else revision
+        if not 1 <= revision <= len(entries):
+            raise HistoryError(f"Revision {revision} not found")
+        content, record = _rebuild(log, entries, revision)
+    return {**_summary(revision, entries[revision - 1]), "content": content, "note": record.get("note"), "meta": record.get("meta")}
+
+
+def get_revision(project_id: str, revision: Optional[int] = None) -> Dict:
+    """Revision `revision` (default: latest) with its full content."""
+    with _file_lock(project_id, shared=True):
+        return _read(project_id, revision)
+
+
+def diff(project_id: str, start: int, end: int, context: int = 3) -> Dict:
+    """Unified diff of the content between two revisions."""
+    with _file_lock(project_id, shared=True):
+        old, new = _read(project_id, start)["content"], _read(project_id, end)["content"]
+    lines = list(difflib.unified_diff(
+        old.splitlines(keepends=True), new.splitlines(keepends=True),
+        fromfile=f"r{start}", tofile=f"r{end}", n=context,
+    ))
+    return {
+        "from": start,
+        "to": end,
+        "added": sum(1 for l in lines if l.startswith("+") and not l.startswith("+++")),
+        "removed": sum(1 for l in lines if l.startswith("-") and not l.startswith("---")),
+        "diff": "".join(lines),
+    }
+
+
+# ------------------------------------------------------------------ writing
+
+def _latest_content(project_id: str, count: int) -> str:
+    cached = _latest.get(project_id)
+    if cached and cached[0] == count:
+        return cached[1]
+    if count == 0:
+        return ""
+    return _read(project_id, count)["content"]  # caller holds the lock
+
+
+def append(project_id: str, kind: str, content: str, note: Optional[str] = None, meta: Optional[Dict] = None) -> Dict:
+    """Record a new revision of the project's content; returns its metadata.
+
+    `note` carries text that isn't the content itself, e.g. the critique of it.
+    """
+    if kind not in KINDS:
+        raise HistoryError(f"Unknown kind: {kind!r}")
+    log_path, idx_path = _paths(project_id)
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    with _file_lock(project_id):
+        size = os.path.getsize(idx_path) if os.path.exists(idx_path) else 0
+        count = size // _ENTRY.size
+        if size != count * _ENTRY.size:
+            # A crash mid-entry left a partial record; appending after it would misalign every later entry
+            os.truncate(idx_path, count * _ENTRY.size)
+        with _mapped(idx_path) as idx:
+            last = _ENTRY.unpack_from(idx, (count - 1) * _ENTRY.size) if count else None
+        revision = count + 1
+        record: Dict = {"kind": kind}
+        previous = _latest_content(project_id, count) if last and revision - last[2] < SNAPSHOT_EVERY else ""
+        snapshot = _store_content(record, previous, content, revision, last[2] if last else 0)
+        if note is not None:
+            record["note"] = note
+        if meta:
+            record["meta"] = meta
+        payload = _encode(record)
+        with open(log_path, 'ab') as log:
+            offset = log.tell()
+            log.write(payload)
+            log.flush()
+            os.fsync(log.fileno())
+        # The index entry goes last: a crash before it leaves only unreferenced log bytes
+        entry = (offset, len(payload), snapshot, KINDS.index(kind), time.time())
+        with open(idx_path, 'ab') as idx_file:
+            idx_file.write(_ENTRY.pack(*entry))
+            idx_file.flush()
+            os.fsync(idx_file.fileno())
+        _latest[project_id] = (revision, content)
+    return _summary(revision, entry)
+
+
+async def logged(chunks: AsyncIterator[str], project_id: str, kind: str, content: Optional[str] = None) -> AsyncIterator[str]:
+    """Pass a stream through, then record it: as the content, or as the note on `content`."""
+    parts = []
+    async for delta in chunks:
+        parts.append(delta)
+        yield delta
+    text = "".join(parts).strip()
+    if content is None:
+        append(project_id, kind, text)
+    else:
+        append(project_id, kind, content, note=text)
+
+
+def compact(project_id: str) -> Dict[str, int]:
+    """Rewrite a project's log: drop unreferenced bytes and re-chain deltas from fresh snapshots."""
+    log_path, idx_path = _paths(project_id)
+    with _file_lock(project_id):
+        before = sum(os.path.getsize(p) for p in (log_path, idx_path) if os.path.exists(p))
+        with _mapped(idx_path) as idx, _mapped(log_path) as log:
+            entries = _entries(idx)
+            records, content = [], ""
+            for entry in entries:
+                record = _record(log, entry)
+                content = record["content"] if "content" in record else _patch(content, record["delta"])
+                records.append((entry, record, content))
+        tmp_log, tmp_idx = f"{log_path}.tmp", f"{idx_path}.tmp"
+        with open(tmp_log, 'wb') as log, open(tmp_idx, 'wb') as idx:
+            snapshot, previous = 0, ""
+            for rev, (entry, record, content) in enumerate(records, 1):
+                out = {k: v for k, v in record.items() if k not in ("content", "delta")}
+                snapshot = _store_content(out, previous, content, rev, snapshot)
+                payload = _encode(out)
+                idx.write(_ENTRY.pack(log.tell(), len(payload), snapshot, entry[3], entry[4]))
+                log.write(payload)
+                previous = content
+            for f in (log, idx):
+                f.flush()
+                os.fsync(f.fileno())
+        # Readers hold the lock shared, so none sees the new log with the old index
+        os.replace(tmp_log, log_path)
+        os.replace(tmp_idx, idx_path)
+        _latest.pop(project_id, None)
+        after = sum(os.path.getsize(p) for p in (log_path, idx_path))
+    return {"revisions": len(records), "bytes_before": before, "bytes_after": after}
+
+
+def compact_all() -> Dict[str, Dict[str, int]]:
+    """Compact every project's history; logs of deleted projects are removed."""
+    if not os.path.isdir(HISTORY_DIR):
+        return {}
+    results = {}
+    for name in sorted(os.listdir(HISTORY_DIR)):
+        if not name.endswith(".idx"):
+            continue
+        project_id = name[:-len(".idx")]
+        if project_store.get_project(project_id) is None:
+            for ext in (".log", ".idx", ".lock"):
+                try:
+                    os.unlink(os.path.join(HISTORY_DIR, project_id + ext))
+                except FileNotFoundError:
+                    pass
+            results[project_id] = {"revisions": 0, "removed": 1}
+            continue
+        results[project_id] = compact(project_id)
+    return results
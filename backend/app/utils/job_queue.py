@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from uuid import uuid4
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+JOBS_DB = os.path.join(DATA_DIR, 'jobs.db')
+
+JOB_KINDS = ("generate", "critique", "plan")
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job whose worker hasn't heartbeated for this long is assumed dead
+STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "120"))
+
+os.makedirs(DATA_DIR, exist_ok=True)
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _tx() -> Iterator[sqlite3.Connection]:
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def init_db() -> None:
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs(status, created_at);
+        """)
+
+
+def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['progress'] = json.loads(job['progress']) if job['progress'] else None
+    return job
+
+
+def enqueue(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = str(uuid4())
+    with _tx() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, payload, status, progress, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload), json.dumps({"chars": 0}), time.time()),
+        )
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _to_dict(row) if row else None
+
+
+def claim_next(worker: str) -> Optional[Dict[str, Any]]:
+    """Atomically move the oldest queued job to running and return it."""
+    now = time.time()
+    with _tx() as conn:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+            "started_at = ?, heartbeat_at = ? WHERE id = ?",
+            (worker, now, now, row['id']),
+        )
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+    return _to_dict(job)
+
+
+# Updates from a worker only apply while it still owns the job: once a job is
+# requeued as stale, the late result of its old worker must not overwrite the new owner's.
+
+def heartbeat(job_id: str, worker: str, progress: Dict[str, Any]) -> None:
+    with _tx() as conn:
+        conn.execute(
+            "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (json.dumps(progress), time.time(), job_id, worker),
+        )
+
+
+def finish(job_id: str, worker: str, result: Any, progress: Optional[Dict[str, Any]] = None) -> bool:
+    """Record the result; False if the job is no longer this worker's."""
+    with _tx() as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, progress = COALESCE(?, progress), "
+            "error = NULL, finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (json.dumps(result), json.dumps(progress) if progress else None, time.time(), job_id, worker),
+        )
+    return cur.rowcount > 0
+
+
+def fail(job_id: str, worker: str, error: str) -> bool:
+    """Requeue the job if it has attempts left, otherwise mark it failed."""
+    with _tx() as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET error = ?, worker = NULL, "
+            "status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+            "finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END "
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (error, MAX_ATTEMPTS, MAX_ATTEMPTS, time.time(), job_id, worker),
+        )
+    return cur.rowcount > 0
+
+
+def release(worker: str) -> int:
+    """Put a stopping worker's in-flight jobs back on the queue."""
+    with _tx() as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, attempts = attempts - 1 "
+            "WHERE status = 'running' AND worker = ?",
+            (worker,),
+        )
+    return cur.rowcount
+
+
+def requeue_stale(stale_after: float = STALE_AFTER) -> int:
+    """Recover jobs left running by a worker that crashed or was killed.
+
+    A job that has used up its attempts is failed instead, so one that keeps
+    killing its worker (OOM, segfault) isn't retried forever.
+    """
+    now = time.time()
+    with _tx() as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET worker = NULL, "
+            "status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+            "error = CASE WHEN attempts < ? THEN error ELSE 'Worker stopped responding' END, "
+            "finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (MAX_ATTEMPTS, MAX_ATTEMPTS, MAX_ATTEMPTS, now, now - stale_after),
+        )
+    return cur.rowcount
+
+
+def job_result(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job for the API."""
+    return {
+        "id": job['id'],
+        "kind": job['kind'],
+        "status": job['status'],
+        "progress": job['progress'],
+        "attempts": job['attempts'],
+        "result": json.loads(job['result']) if job['result'] else None,
+        "error": job['error'],
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at'],
+    }
+
+
+init_db()
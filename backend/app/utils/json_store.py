@@ -0,0 +1,242 @@
+import bisect
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from backend.app.utils.metrics import timed_store
+
+try:
+    import fcntl
+except ImportError:  # Windows – fall back to the in-process lock only
+    fcntl = None
+
+
+class Unchanged(Exception):
+    """Raise inside `transaction()` to leave the file untouched."""
+
+
+class JsonFile:
+    """A JSON document kept parsed in memory.
+
+    The file is re-read only when its mtime or size changes, so another
+    worker's write is picked up on the next call. Writes go to a temp file
+    that is renamed over the original while holding an exclusive `fcntl`
+    lock, so concurrent uvicorn workers can't interleave read-modify-write
+    cycles and lose updates.
+    """
+
+    def __init__(self, path: str, default: Any, reset_if_corrupt: bool = False):
+        self.path = path
+        self.store_name = os.path.splitext(os.path.basename(path))[0]
+        self.lock_path = f"{path}.lock"
+        self._default = default
+        self._reset_if_corrupt = reset_if_corrupt
+        self._mutex = threading.RLock()
+        self._signature: Optional[tuple] = None
+        self._data: Any = None
+        # (signature before, signature after) of this process's latest write
+        self.last_write: Optional[tuple] = None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # default=None: the file is only ever created by `write`; a missing file reads as None
+        if default is not None and not os.path.exists(path):
+            with self._file_lock():
+                if not os.path.exists(path):
+                    self._write_file(default)
+
+    # ---------------------------------------------------------------- loading
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self) -> None:
+        signature = self._stat()
+        if signature is not None and signature == self._signature:
+            return
+        self._load(signature)
+
+    @timed_store
+    def _load(self, signature: Optional[tuple]) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = self._copy_default()
+        except json.JSONDecodeError:
+            if not self._reset_if_corrupt:
+                raise
+            data = self._copy_default()
+            self._write_file(data)
+            signature = self._stat()
+        self._data = data
+        self._signature = signature
+        self._on_load(data)
+
+    def _on_load(self, data: Any) -> None:
+        """Hook for subclasses to rebuild derived state after a (re)load."""
+
+    def _copy_default(self) -> Any:
+        return json.loads(json.dumps(self._default))
+
+    def signature(self) -> Optional[tuple]:
+        """Changes whenever any process writes the file; lets derived indexes detect stale data."""
+        return self._stat()
+
+    @timed_store
+    def read(self) -> Any:
+        with self._mutex:
+            self._refresh()
+            return self._data
+
+    # ---------------------------------------------------------------- writing
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @timed_store
+    def _write_file(self, data: Any) -> None:
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def write(self, data: Any) -> None:
+        """Replace the whole document."""
+        with self._mutex, self._file_lock():
+            self._write_file(data)
+            self._data = data
+            self._signature = self._stat()
+            self._on_load(data)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        """Yield the freshest data for mutation; it is written back atomically on exit."""
+        with self._mutex, self._file_lock():
+            self._refresh()
+            before = self._signature
+            try:
+                yield self._data
+                self._write_file(self._data)
+            except Unchanged:
+                return
+            except BaseException:
+                # The in-memory copy may hold changes that never reached disk: reload on next read
+                self._signature = None
+                raise
+            self._signature = self._stat()
+            self.last_write = (before, self._signature)
+            self._on_load(self._data)
+
+
+class JsonStore(JsonFile):
+    """A JSON list of records with an id index and secondary `type` / `tags` indexes."""
+
+    def __init__(self, path: str, reset_if_corrupt: bool = False):
+        self._by_id: Dict[str, Dict] = {}
+        self._by_type: Dict[str, List[Dict]] = {}
+        self._by_tag: Dict[str, List[Dict]] = {}
+        self._ids: List[str] = []
+        super().__init__(path, [], reset_if_corrupt)
+
+    def _on_load(self, records: List[Dict]) -> None:
+        by_id: Dict[str, Dict] = {}
+        by_type: Dict[str, List[Dict]] = {}
+        by_tag: Dict[str, List[Dict]] = {}
+        for record in records:
+            by_id[record['id']] = record
+            if 'type' in record:
+                by_type.setdefault(record['type'], []).append(record)
+            for tag in record.get('tags') or []:
+                by_tag.setdefault(tag, []).append(record)
+        self._by_id, self._by_type, self._by_tag = by_id, by_type, by_tag
+        self._ids = sorted(by_id)
+
+    # Records are handed out as shallow copies so callers can't corrupt the cache.
+
+    @timed_store
+    def all(self) -> List[Dict]:
+        return [dict(r) for r in self.read()]
+
+    @timed_store
+    def get(self, record_id: str) -> Optional[Dict]:
+        with self._mutex:
+            self._refresh()
+            record = self._by_id.get(record_id)
+            return dict(record) if record else None
+
+    @timed_store
+    def by_type(self, type_: str) -> List[Dict]:
+        with self._mutex:
+            self._refresh()
+            return [dict(r) for r in self._by_type.get(type_, [])]
+
+    @timed_store
+    def by_tag(self, tag: str) -> List[Dict]:
+        with self._mutex:
+            self._refresh()
+            return [dict(r) for r in self._by_tag.get(tag, [])]
+
+    @timed_store
+    def page(self, after_id: Optional[str] = None, limit: Optional[int] = None,
+             type_: Optional[str] = None, tags: Iterable[str] = ()) -> List[Dict]:
+        """Up to `limit` records with id > `after_id`, in id order, optionally of one type and carrying every tag."""
+        wanted = set(tags)
+        with self._mutex:
+            self._refresh()
+            start = bisect.bisect_right(self._ids, after_id) if after_id is not None else 0
+            records: List[Dict] = []
+            for i in range(start, len(self._ids)):
+                if limit is not None and len(records) >= limit:
+                    break
+                record = self._by_id[self._ids[i]]
+                if type_ is not None and record.get('type') != type_:
+                    continue
+                if wanted and not wanted <= set(record.get('tags') or ()):
+                    continue
+                records.append(dict(record))
+            return records
+
+    @timed_store
+    def insert(self, record: Dict) -> Dict:
+        with self.transaction() as records:
+            records.append(record)
+        return dict(record)
+
+    @timed_store
+    def update(self, record_id: str, changes: Dict) -> Optional[Dict]:
+        updated = None
+        with self.transaction():
+            record = self._by_id.get(record_id)
+            if record is None:
+                raise Unchanged
+            record.update(changes)
+            updated = dict(record)
+        return updated
+
+    @timed_store
+    def delete(self, record_id: str) -> bool:
+        deleted = False
+        with self.transaction() as records:
+            record = self._by_id.get(record_id)
+            if record is None:
+                raise Unchanged
+            del records[next(i for i, r in enumerate(records) if r is record)]
+            deleted = True
+        return deleted
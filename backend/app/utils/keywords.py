@@ -0,0 +1,247 @@
+"""Local keyword suggestions: TF-IDF over single words and key phrases.
+
+Document frequencies come from a corpus model of generated articles
+(content/*.md), stored prompts and supplementals. The model is kept in
+data/keywords.db: each document's hash and term set, plus a running df per
+term, so adding, changing or removing one document only touches that
+document's rows. `scripts/generate.py` adds each article to it as the
+article is saved, and prompt and supplemental writes update it through store
+listeners.
+"""
+import glob
+import hashlib
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from backend.app.utils import prompt_store, storage, supp_store
+from backend.app.utils.text import STOPWORDS
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+KEYWORDS_DB = os.path.join(DATA_DIR, 'keywords.db')
+# Same relative directory scripts/generate.py saves articles to
+CONTENT_DIR = os.getenv("RUGS_CONTENT_DIR", "content")
+
+MAX_PHRASE_WORDS = 3
+# Multi-word phrases are better keywords than the words they contain
+PHRASE_BOOST = 0.5
+# Inputs shorter than this (e.g. a title) also get related terms from the corpus
+RELATED_BELOW_WORDS = 50
+# Terms per `IN (...)` query, well under SQLite's bound-parameter limit
+_BATCH = 500
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_BREAK = re.compile(r"[.,;:!?()\[\]{}\"“”|\n]+")
+
+_schema_ready = False
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    global _schema_ready
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(KEYWORDS_DB, timeout=30, isolation_level=None)
+    try:
+        if not _schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, hash TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS terms_doc_idx ON terms(doc_id);
+                CREATE TABLE IF NOT EXISTS df (term TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID;
+            """)
+            _schema_ready = True
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _tx() -> Iterator[sqlite3.Connection]:
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+def _batched(conn: sqlite3.Connection, sql: str, values: List[str]) -> Iterator[tuple]:
+    """Run `sql`, whose `{}` is an `IN (...)` placeholder list, over `values` in batches."""
+    for i in range(0, len(values), _BATCH):
+        chunk = values[i:i + _BATCH]
+        yield from conn.execute(sql.format(",".join("?" * len(chunk))), chunk)
+
+
+def candidates(text: str) -> Counter:
+    """Counts of words and 2-3 word phrases; phrases never span stopwords or punctuation."""
+    counts: Counter = Counter()
+    for segment in _BREAK.split(text.lower()):
+        run: List[str] = []
+        for word in _WORD.findall(segment) + [""]:
+            if word and word not in STOPWORDS and len(word) > 1 and not word.isdigit():
+                run.append(word)
+                continue
+            for n in range(1, MAX_PHRASE_WORDS + 1):
+                for i in range(len(run) - n + 1):
+                    counts[" ".join(run[i:i + n])] += 1
+            run = []
+    return counts
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _apply(conn: sqlite3.Connection, doc_id: str, text: Optional[str]) -> bool:
+    """Add, replace or (text=None) remove one document's terms. False if nothing changed."""
+    row = conn.execute("SELECT hash FROM docs WHERE id = ?", (doc_id,)).fetchone()
+    digest = _digest(text) if text is not None else None
+    if row and row[0] == digest:
+        return False
+    if row is None and text is None:
+        return False
+    if row:
+        old = [(t,) for (t,) in conn.execute("SELECT term FROM terms WHERE doc_id = ?", (doc_id,))]
+        conn.executemany("UPDATE df SET n = n - 1 WHERE term = ?", old)
+        conn.executemany("DELETE FROM df WHERE term = ? AND n <= 0", old)
+        conn.execute("DELETE FROM terms WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+    if text is not None:
+        terms = [(t,) for t in candidates(text)]
+        conn.execute("INSERT INTO docs (id, hash) VALUES (?, ?)", (doc_id, digest))
+        conn.executemany("INSERT INTO terms (term, doc_id) VALUES (?, ?)", [(t, doc_id) for (t,) in terms])
+        conn.executemany("INSERT INTO df (term, n) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET n = n + 1", terms)
+    return True
+
+
+def _corpus() -> Dict[str, str]:
+    docs = {}
+    for path in glob.glob(os.path.join(CONTENT_DIR, '*.md')):
+        with open(path, 'r', encoding='utf-8') as f:
+            docs[f"content:{os.path.basename(path)}"] = f.read()
+    for p in prompt_store.list_prompts():
+        docs[f"prompt:{p['id']}"] = f"{p.get('title', '')}\n{p.get('content', '')}"
+    for s in supp_store.list_items():
+        docs[f"supplemental:{s['id']}"] = f"{s.get('title', '')}\n{s.get('content', '')}"
+    return docs
+
+
+def _built(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM meta WHERE key = 'built'").fetchone() is not None
+
+
+def rebuild() -> int:
+    """Re-sync the model with every corpus source. Only changed documents are re-counted."""
+    docs = _corpus()
+    with _tx() as conn:
+        for (doc_id,) in conn.execute("SELECT id FROM docs").fetchall():
+            if doc_id not in docs:
+                _apply(conn, doc_id, None)
+        for doc_id, text in docs.items():
+            _apply(conn, doc_id, text)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built', '1')")
+        return conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+def _ensure_built() -> None:
+    with _connect() as conn:
+        built = _built(conn)
+    if not built:
+        rebuild()
+
+
+def update_document(doc_id: str, text: Optional[str]) -> None:
+    """Count a new or changed document (text=None removes it)."""
+    with _tx() as conn:
+        _apply(conn, doc_id, text)
+
+
+def add_article(path: str, article: str) -> None:
+    update_document(f"content:{os.path.basename(path)}", article)
+
+
+def _listener(prefix: str):
+    def on_change(event: str, record: Dict) -> None:
+        with _connect() as conn:
+            if not _built(conn):
+                return  # picked up by the first build
+        text = None if event == "delete" else f"{record.get('title', '')}\n{record.get('content', '')}"
+        update_document(f"{prefix}:{record['id']}", text)
+    return on_change
+
+
+storage.subscribe('prompts', _listener('prompt'))
+storage.subscribe('supplementals', _listener('supplemental'))
+
+
+def _idf(n: int, df: Dict[str, int], term: str) -> float:
+    return math.log((n + 1) / (df.get(term, 0) + 1)) + 1
+
+
+def _df(conn: sqlite3.Connection, terms: Iterable[str]) -> Dict[str, int]:
+    return dict(_batched(conn, "SELECT term, n FROM df WHERE term IN ({})", list(terms)))
+
+
+def _weight(term: str) -> float:
+    return 1 + PHRASE_BOOST * term.count(" ")
+
+
+def extract(text: str, k: int = 20, related: Optional[bool] = None) -> List[Dict]:
+    """Top `k` keywords for `text`, best first.
+
+    Terms found in the text are ranked by TF-IDF. For short inputs such as a
+    title, `related` (on by default) adds phrases that often appear in corpus
+    documents sharing the input's words.
+    """
+    _ensure_built()
+    counts = candidates(text)
+    if related is None:
+        related = len(_WORD.findall(text.lower())) < RELATED_BELOW_WORDS
+    with _connect() as conn:
+        n = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        df = _df(conn, counts)
+        scored = {term: tf * _idf(n, df, term) * _weight(term) for term, tf in counts.items()}
+        results = [{"keyword": t, "score": round(s, 4), "source": "text"} for t, s in scored.items()]
+
+        if related:
+            words = [t for t in counts if " " not in t]
+            overlap: Counter = Counter()
+            for doc_id, shared in _batched(conn, "SELECT doc_id, COUNT(*) FROM terms WHERE term IN ({}) GROUP BY doc_id", words):
+                overlap[doc_id] += shared
+            cooccur: Counter = Counter()
+            for doc_id, term in _batched(conn, "SELECT doc_id, term FROM terms WHERE doc_id IN ({}) AND term LIKE '% %'", list(overlap)):
+                if term not in counts:
+                    cooccur[term] += overlap[doc_id]
+            df = _df(conn, cooccur)
+            raw = {term: c * _idf(n, df, term) * _weight(term) for term, c in cooccur.items()}
+            # Scaled below the input's own terms, which are the stronger signal
+            top_text = max(scored.values(), default=1.0)
+            top_raw = max(raw.values(), default=1.0)
+            for term, r in sorted(raw.items(), key=lambda kv: kv[1], reverse=True)[:k * 3]:
+                results.append({"keyword": term, "score": round(0.5 * top_text * r / top_raw, 4), "source": "corpus"})
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return _drop_fragments(results)[:k]
+
+
+def _drop_fragments(results: List[Dict]) -> List[Dict]:
+    """Skip a keyword already contained in a better-ranked phrase ("persian" after "persian rugs")."""
+    kept: List[Dict] = []
+    for r in results:
+        padded = f" {r['keyword']} "
+        if any(padded in f" {k['keyword']} " for k in kept):
+            continue
+        kept.append(r)
+    return kept
@@ -0,0 +1,233 @@
+"""Internal-link suggestions from TF-IDF similarity over the content/ corpus.
+
+Pages are re-read only when their mtime or size changes, so articles saved
+by `scripts/generate.py` (in any process) are picked up on the next query.
+Pages are sparse rows of a `scipy.sparse` CSR matrix: adding or editing one
+re-weights only that row and updates document frequencies incrementally.
+The other rows keep their IDF weights until enough of the corpus has changed
+(`LINK_IDF_REFRESH`), then all rows are re-weighted in one vectorised pass.
+Every section of a draft is scored against every page in one sparse product.
+"""
+import glob
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from backend.app.utils import critique_engine
+from backend.app.utils.text import tokenize
+from utils.audit import split_front_matter
+
+# Same relative directory scripts/generate.py saves articles to
+CONTENT_DIR = os.getenv("RUGS_CONTENT_DIR", "content")
+# How often queries re-scan the content directory for changes (seconds)
+REFRESH_INTERVAL = float(os.getenv("LINK_REFRESH_INTERVAL", "1.0"))
+# Fraction of pages that may change before every row is re-weighted with fresh IDF
+IDF_REFRESH = float(os.getenv("LINK_IDF_REFRESH", "0.1"))
+
+# Content pyramid from prompts/system_prompt.txt: links go one tier up or down, or sideways
+TIER_LEVELS = {"pillar": 0, "collection": 1, "blog": 2, "guide": 2, "faq": 2}
+DEFAULT_PAGE_TYPE = "blog"
+MIN_SCORE = 0.05
+
+
+def _direction(source: int, target: int) -> str:
+    return "up" if target < source else "down" if target > source else "sideways"
+
+
+def _page_meta(path: str, markdown: str) -> Dict:
+    meta, body = split_front_matter(markdown)
+    meta = meta or {}
+    title = meta.get("title")
+    if not title:
+        h1 = next((s["heading"] for s in critique_engine.split_sections(body) if s["level"] == 1), None)
+        title = h1 or os.path.splitext(os.path.basename(path))[0].replace("-", " ")
+    page_type = str(meta.get("type") or meta.get("page_type") or DEFAULT_PAGE_TYPE).lower()
+    return {"title": title, "page_type": page_type if page_type in TIER_LEVELS else DEFAULT_PAGE_TYPE, "body": body}
+
+
+def _normalise(weights: np.ndarray) -> np.ndarray:
+    return weights / (np.linalg.norm(weights) or 1.0)
+
+
+class LinkIndex:
+    def __init__(self, content_dir: str):
+        self.content_dir = content_dir
+        self._pages: Dict[str, Dict] = {}  # basename -> meta, file signature, term columns and tf
+        self._rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # basename -> (columns, weights)
+        self._vocab: Dict[str, int] = {}  # term -> column; only grows
+        self._df = np.zeros(0, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._changes = 0  # pages added, edited or removed since IDF was last applied to every row
+        self._matrix: Optional[sp.csr_matrix] = None  # assembled from _rows on demand
+        self._targets: List[Dict] = []  # one per matrix row; replaced, never mutated
+
+    def _idf(self, columns: np.ndarray) -> np.ndarray:
+        return np.log((len(self._pages) + 1) / (self._df[columns] + 1)) + 1
+
+    def _weigh(self, name: str) -> None:
+        page = self._pages[name]
+        self._rows[name] = (page["columns"], _normalise(page["tf"] * self._idf(page["columns"])))
+
+    def _forget(self, name: str) -> None:
+        page = self._pages.pop(name, None)
+        if page is not None:
+            self._df[page["columns"]] -= 1
+            del self._rows[name]
+
+    def add_page(self, name: str, markdown: str, signature: Optional[tuple] = None) -> None:
+        page = _page_meta(name, markdown)
+        counts = Counter(tokenize(f"{page['title']}\n{page.pop('body')}"))
+        page["signature"] = signature
+        with self._lock:
+            for term in counts:
+                self._vocab.setdefault(term, len(self._vocab))
+            if len(self._vocab) > len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self._vocab) - len(self._df))])
+            self._forget(name)
+            columns = np.fromiter((self._vocab[t] for t in counts), dtype=np.int32, count=len(counts))
+            page["columns"] = columns
+            page["tf"] = 1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+            self._pages[name] = page
+            self._df[columns] += 1
+            self._weigh(name)
+            self._changes += 1
+            self._matrix = None
+
+    def remove_page(self, name: str) -> None:
+        with self._lock:
+            if name in self._pages:
+                self._forget(name)
+                self._changes += 1
+                self._matrix = None
+
+    def refresh(self) -> None:
+        """Index new or changed files in the content directory and drop deleted ones."""
+        if time.monotonic() - self._checked < REFRESH_INTERVAL:
+            return
+        self._checked = time.monotonic()
+        seen = set()
+        for path in glob.glob(os.path.join(self.content_dir, '*.md')):
+            name = os.path.basename(path)
+            try:
+                st = os.stat(path)
+                signature = (st.st_mtime_ns, st.st_size)
+                page = self._pages.get(name)
+                if page and page["signature"] == signature:
+                    seen.add(name)
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    markdown = f.read()
+            except FileNotFoundError:
+                continue  # deleted since the glob; dropped below
+            seen.add(name)
+            self.add_page(name, markdown, signature)
+        for name in set(self._pages) - seen:
+            self.remove_page(name)
+
+    def _assemble(self) -> None:
+        if self._changes > IDF_REFRESH * len(self._pages):
+            # Enough of the corpus moved that the older rows' IDF is stale: re-weight them all
+            for name in self._pages:
+                self._weigh(name)
+            self._changes = 0
+        names = sorted(self._rows)
+        rows = [self._rows[name] for name in names]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c, _ in rows], out=indptr[1:])
+        columns = np.concatenate([c for c, _ in rows]) if rows else np.zeros(0, dtype=np.int32)
+        weights = np.concatenate([w for _, w in rows]) if rows else np.zeros(0)
+        self._matrix = sp.csr_matrix((weights.astype(np.float32), columns, indptr), shape=(len(rows), len(self._vocab)))
+        self._targets = [
+            {"page": m, "title": self._pages[m]["title"], "page_type": self._pages[m]["page_type"]}
+            for m in names
+        ]
+
+    def similar(self, texts: List[str]) -> Tuple[np.ndarray, List[Dict]]:
+        """Cosine similarity of each text against every page (texts x pages) and the pages."""
+        with self._lock:
+            if self._matrix is None:
+                self._assemble()
+            data, columns, indptr = [], [], [0]
+            for text in texts:
+                counts = {self._vocab[t]: c for t, c in Counter(tokenize(text)).items() if t in self._vocab}
+                cols = np.fromiter(counts, dtype=np.int32, count=len(counts))
+                tf = 1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+                data.append(_normalise(tf * self._idf(cols)))
+                columns.append(cols)
+                indptr.append(indptr[-1] + len(cols))
+            queries = sp.csr_matrix(
+                (np.concatenate(data).astype(np.float32), np.concatenate(columns), indptr),
+                shape=(len(texts), len(self._vocab)),
+            )
+            return (queries @ self._matrix.T).toarray(), self._targets
+
+
+_index = LinkIndex(CONTENT_DIR)
+
+
+def _sections(body: str) -> List[Dict]:
+    """H2-level sections; deeper headings stay inside their H2."""
+    sections: List[Dict] = []
+    for s in critique_engine.split_sections(body):
+        if sections and s["level"] > 2:
+            sections[-1]["text"] += s["text"]
+        else:
+            sections.append({"heading": s["heading"], "text": s["text"]})
+    return sections
+
+
+def suggest_links(
+    markdown: str,
+    page_type: Optional[str] = None,
+    n: int = 5,
+    exclude: Iterable[str] = (),
+    target_types: Optional[List[str]] = None,
+) -> Dict:
+    """Top-`n` link targets per section of a draft, restricted to neighbouring pyramid tiers.
+
+    `target_types` overrides the tier rule with an explicit list of page types.
+    Pages named in `exclude`, or with the draft's own title, are skipped.
+    """
+    _index.refresh()
+    meta = _page_meta("", markdown)
+    page_type = (page_type or meta["page_type"]).lower()
+    level = TIER_LEVELS.get(page_type, TIER_LEVELS[DEFAULT_PAGE_TYPE])
+    sections = _sections(meta["body"]) or [{"heading": None, "text": meta["body"]}]
+
+    scores, targets = _index.similar([f"{s['heading'] or ''}\n{s['text']}" for s in sections])
+    if not targets:
+        return {"page_type": page_type, "sections": [{"heading": s["heading"], "links": []} for s in sections]}
+    levels = np.array([TIER_LEVELS[t["page_type"]] for t in targets])
+    if target_types:
+        allowed = np.array([t["page_type"] in target_types for t in targets])
+    else:
+        allowed = np.abs(levels - level) <= 1
+    skip = set(exclude)
+    own_title = meta["title"].strip().lower()
+    for i, t in enumerate(targets):
+        if t["page"] in skip or t["title"].strip().lower() == own_title:
+            allowed[i] = False
+    scores = np.where(allowed, scores, -1.0)
+
+    k = min(n, len(targets))
+    results = []
+    for s, row in zip(sections, scores):
+        top = np.argpartition(-row, k - 1)[:k]
+        top = top[np.argsort(-row[top])]
+        links = []
+        for i in top:
+            if row[i] < MIN_SCORE:
+                break
+            links.append({
+                **targets[i],
+                "direction": _direction(level, int(levels[i])),
+                "score": round(float(row[i]), 4),
+            })
+        results.append({"heading": s["heading"], "links": links})
+    return {"page_type": page_type, "sections": results}
@@ -0,0 +1,81 @@
+"""Shared plumbing for list endpoints: filters, cursor pages, field projection and fast JSON."""
+import base64
+import binascii
+import json
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # stdlib json is slower but equivalent
+    orjson = None
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# (after_id, limit) -> records with id > after_id in id order, at most limit of them
+Fetch = Callable[[Optional[str], Optional[int]], List[Dict]]
+
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter."""
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+def encode_cursor(record_id: str) -> str:
+    return base64.urlsafe_b64encode(record_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(fetch: Fetch, cursor: Optional[str], limit: Optional[int]) -> Tuple[List[Dict], Optional[str]]:
+    """One page after `cursor` and the cursor for the next page (None on the last).
+
+    `fetch(after_id, limit)` returns records with id > `after_id` in id order,
+    so the store seeks straight to the page. Cursors name the last record
+    returned, so records added or removed elsewhere (even that one) don't
+    shift later pages. One extra record is fetched to tell if more follow.
+    """
+    after_id = decode_cursor(cursor) if cursor else None
+    if limit is None:
+        return fetch(after_id, None), None
+    records = fetch(after_id, limit + 1)
+    page = records[:limit]
+    return page, encode_cursor(page[-1]['id']) if len(records) > limit else None
+
+
+def project(records: List[Dict], model: Type[BaseModel], fields: Optional[str]) -> List[Dict]:
+    """Shape records like `model` would, keeping only `fields` (plus id) when given.
+
+    Missing fields get the model's default and unknown keys are dropped,
+    which matches what response_model validation would produce, without it.
+    """
+    shape = model.model_fields
+    names = list(shape)
+    if fields:
+        requested = parse_list(fields)
+        unknown = [f for f in requested if f not in shape]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        names = ['id'] + [f for f in requested if f != 'id']
+    defaults = {n: (None if shape[n].is_required() else shape[n].get_default(call_default_factory=True)) for n in names}
+    return [{n: r.get(n, defaults[n]) for n in names} for r in records]
+
+
+def json_response(content, next_cursor: Optional[str] = None) -> Response:
+    """Serialize directly to bytes, skipping per-item model validation."""
+    body = orjson.dumps(content) if orjson else json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def list_response(fetch: Fetch, model: Type[BaseModel], cursor: Optional[str], limit: Optional[int], fields: Optional[str]) -> Response:
+    page, next_cursor = paginate(fetch, cursor, limit)
+    return json_response(project(page, model, fields), next_cursor)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+CACHE_DIR = os.path.join(DATA_DIR, 'llm_cache')
+
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "256"))
+CACHE_DISK_BYTES = int(os.getenv("LLM_CACHE_DISK_MB", "256")) * 1024 * 1024
+
+# Per-request cache control: None reads and writes the cache, "refresh" skips
+# the read but stores the new answer, "bypass" neither reads nor writes.
+CACHE_MODES = ("bypass", "refresh")
+
+
+def make_key(model: str, messages: List[Dict[str, str]], params: Dict) -> str:
+    """Content address of a completion request: model + messages + sampling params."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """Two-tier completion cache: an in-process LRU in front of one file per key on disk."""
+
+    def __init__(self, cache_dir: str, ttl: float, memory_items: int, disk_bytes: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage: Optional[int] = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    # ------------------------------------------------------------------ read
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+        self._remember(key, value, now + self.ttl)
+        return value
+
+    def _read_disk(self, key: str, now: float) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if entry.get('expires_at', 0) <= now:
+            freed = self._remove(path)
+            with self._lock:
+                if self._disk_usage is not None:
+                    self._disk_usage -= freed
+            return None
+        # Touch the file so disk eviction is least-recently-used, not oldest-written
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get('value')
+
+    # ----------------------------------------------------------------- write
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'expires_at': expires_at, 'value': value}, f)
+        size = os.path.getsize(tmp)
+        try:
+            replaced = os.path.getsize(path)  # overwriting an entry only adds the difference
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats["writes"] += 1
+            if self._disk_usage is not None:
+                self._disk_usage += size - replaced
+        if self._usage() > self.disk_bytes:
+            self._evict_disk()
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> int:
+        with self._lock:
+            self._memory.clear()
+        removed = 0
+        for path, _, _ in self._disk_entries():
+            self._remove(path)
+            removed += 1
+        self._disk_usage = 0
+        return removed
+
+    # -------------------------------------------------------------- disk tier
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _disk_entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    st = entry.stat()
+                    yield entry.path, st.st_mtime, st.st_size
+
+    def _usage(self) -> int:
+        if self._disk_usage is None:
+            self._disk_usage = sum(size for _, _, size in self._disk_entries())
+        return self._disk_usage
+
+    @staticmethod
+    def _expires_at(path: str) -> float:
+        # mtime can't stand in for the write time: reads touch it for LRU order
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('expires_at', 0)
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return 0
+
+    def _evict_disk(self) -> None:
+        """Drop expired entries, then least-recently-used ones until 90% of the budget."""
+        entries = sorted(self._disk_entries(), key=lambda e: e[1])
+        usage = sum(size for _, _, size in entries)
+        target = int(self.disk_bytes * 0.9)
+        now = time.time()
+        for path, _, size in entries:
+            # Past the budget the entry goes regardless, so only entries we'd keep are opened
+            if usage <= target and self._expires_at(path) > now:
+                continue
+            self._remove(path)
+            usage -= size
+            with self._lock:
+                self.stats["evictions"] += 1
+        self._disk_usage = usage
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        """Delete a disk entry; returns the bytes freed."""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        return size
+
+    # ------------------------------------------------------------------ stats
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["disk_bytes"] = self._usage()
+        return stats
+
+
+cache = LLMCache(CACHE_DIR, CACHE_TTL, CACHE_MEMORY_ITEMS, CACHE_DISK_BYTES)
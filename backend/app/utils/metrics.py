@@ -0,0 +1,207 @@
+"""In-process Prometheus metrics and structured log lines.
+
+Metrics are per worker process; scrape each worker (or run one) to get
+totals. Everything is rendered in the Prometheus text format by /metrics.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger("rugs")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log_event(event: str, **fields) -> None:
+    """Emit one JSON log line."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = ['%s="%s"' % (n, str(v).replace('\\', '\\\\').replace('"', '\\"')) for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, total: float, **labels) -> None:
+        """Mirror a running count kept by another module; a counter never goes down."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, 0.0), float(total))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_label_str(self.labels, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_label_str(self.labels, k)} {v}" for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Iterable[float] = ()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._values.items():
+                for bound, count in zip(self.buckets, series):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+
+registry = Registry()
+
+_HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 90, 120, 180, 300)
+_STORE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Time until response headers, by route.", ("method", "route", "status"), _HTTP_BUCKETS))
+LLM_LATENCY = registry.register(Histogram(
+    "llm_request_duration_seconds", "Full LLM call duration.", ("model", "stream"), _LLM_BUCKETS))
+LLM_TTFT = registry.register(Histogram(
+    "llm_time_to_first_token_seconds", "Time to first streamed token.", ("model",), _LLM_BUCKETS))
+LLM_TOKENS = registry.register(Counter(
+    "llm_tokens_total", "Tokens reported by the API.", ("model", "type")))
+LLM_REQUESTS = registry.register(Counter(
+    "llm_requests_total", "LLM calls by outcome.", ("model", "outcome")))
+LLM_ERRORS = registry.register(Counter(
+    "llm_errors_total", "LLM call failures by exception type.", ("model", "error")))
+STORE_LATENCY = registry.register(Histogram(
+    "store_operation_duration_seconds", "Store reads and writes.", ("store", "op"), _STORE_BUCKETS))
+CACHE_EVENTS = registry.register(Counter(
+    "llm_cache_events_total", "LLM response cache counters (hits, misses, writes, evictions).", ("event",)))
+LLM_COALESCED = registry.register(Counter(
+    "llm_coalesced_total", "Requests served by another caller's in-flight LLM call.", ("scope",)))
+BREAKER_OPEN = registry.register(Gauge(
+    "llm_circuit_open", "1 if the model's circuit breaker is not closed.", ("model",)))
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_LATENCY.observe(seconds, method=method, route=route, status=status)
+    log_event("http_request", method=method, route=route, status=status, ms=round(seconds * 1000, 1))
+
+
+def observe_llm_call(model: str, seconds: float, usage=None, ttft: float | None = None, stream: bool = False) -> None:
+    LLM_LATENCY.observe(seconds, model=model, stream=str(stream).lower())
+    LLM_REQUESTS.inc(model=model, outcome="ok")
+    if ttft is not None:
+        LLM_TTFT.observe(ttft, model=model)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, model=model, type="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, model=model, type="completion")
+    log_event("llm_call", model=model, stream=stream, ms=round(seconds * 1000, 1),
+              ttft_ms=round(ttft * 1000, 1) if ttft is not None else None,
+              prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def observe_llm_error(model: str, error: BaseException, seconds: float) -> None:
+    LLM_REQUESTS.inc(model=model, outcome="error")
+    LLM_ERRORS.inc(model=model, error=type(error).__name__)
+    logger.warning(json.dumps({"ts": round(time.time(), 3), "event": "llm_error", "model": model,
+                               "error": type(error).__name__, "detail": str(error)[:500],
+                               "ms": round(seconds * 1000, 1)}))
+
+
+def timed_store(fn):
+    """Method decorator recording the call as `store_operation_duration_seconds{store, op}`."""
+    op = fn.__name__.lstrip('_')
+
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            STORE_LATENCY.observe(time.perf_counter() - start, store=self.store_name, op=op)
+    return wrapper
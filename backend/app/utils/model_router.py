@@ -0,0 +1,215 @@
+"""Pick which model serves a request, based on recent health.
+
+Every model tracks a rolling window of outcomes and latencies. A model that
+keeps failing trips its circuit breaker and is skipped for LLM_BREAKER_COOLDOWN
+seconds (after which one probe request is let through), so a degraded primary
+no longer costs every request a full timeout before the fallback is tried.
+With LLM_HEDGE=1, a request still running past the primary's p95 latency
+gets a second, hedged request on the fallback and the first answer wins.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from backend.app.utils.token_budget import ContextBudgetError
+
+T = TypeVar("T")
+
+
+def _parse_fallbacks(spec: str) -> Dict[str, List[str]]:
+    # "gpt-4=gpt-4o;gpt-4o=gpt-3.5-turbo,gpt-4o-mini"
+    fallbacks: Dict[str, List[str]] = {}
+    for rule in filter(None, (r.strip() for r in spec.split(';'))):
+        model, _, rest = rule.partition('=')
+        fallbacks[model.strip()] = [m.strip() for m in rest.split(',') if m.strip()]
+    return fallbacks
+
+
+LLM_FALLBACKS = _parse_fallbacks(os.getenv("LLM_FALLBACKS", "gpt-4=gpt-4o;gpt-4o=gpt-3.5-turbo"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))        # consecutive failures that trip
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))  # ...or this rate over the window
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+WINDOW = 50
+
+
+class ModelHealth:
+    """Rolling error rate / latency for one model plus its circuit breaker."""
+
+    def __init__(self):
+        self.outcomes: deque = deque(maxlen=WINDOW)
+        self.latencies: deque = deque(maxlen=WINDOW)
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        with self._lock:
+            self.outcomes.append(ok)
+            self.probing = False
+            if ok:
+                self.consecutive_failures = 0
+                if latency is not None:
+                    self.latencies.append(latency)
+                self.state = "closed"
+                return
+            self.consecutive_failures += 1
+            calls = len(self.outcomes)
+            error_rate = self.outcomes.count(False) / calls
+            if (
+                self.state == "half_open"
+                or self.consecutive_failures >= BREAKER_FAILURES
+                or (calls >= BREAKER_MIN_CALLS and error_rate >= BREAKER_ERROR_RATE)
+            ):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self.probing = False
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            calls = len(self.outcomes)
+            ordered = sorted(self.latencies)
+            return {
+                "state": self.state,
+                "calls": calls,
+                "error_rate": round(self.outcomes.count(False) / calls, 4) if calls else 0.0,
+                "consecutive_failures": self.consecutive_failures,
+                "p50_latency": ordered[len(ordered) // 2] if ordered else None,
+                "p95_latency": ordered[int(0.95 * (len(ordered) - 1))] if ordered else None,
+            }
+
+
+class ModelRouter:
+    def __init__(self, fallbacks: Dict[str, List[str]]):
+        self.fallbacks = fallbacks
+        self.health: Dict[str, ModelHealth] = {}
+
+    def _health(self, model: str) -> ModelHealth:
+        if model not in self.health:
+            self.health[model] = ModelHealth()
+        return self.health[model]
+
+    def chain(self, model: str) -> List[str]:
+        return [model] + [m for m in self.fallbacks.get(model, []) if m != model]
+
+    def candidates(self, model: str) -> List[str]:
+        """Models to try in order, skipping open breakers. If all are open, try the chain anyway."""
+        chain = self.chain(model)
+        return [m for m in chain if self._health(m).available()] or chain
+
+    async def _timed(self, model: str, fn: Callable[[str], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        try:
+            result = await fn(model)
+        except asyncio.CancelledError:
+            # Lost a hedge race or the client went away: says nothing about model health
+            self._health(model).release_probe()
+            raise
+        except ContextBudgetError:
+            self._health(model).release_probe()
+            raise
+        except Exception:
+            self._health(model).record(False)
+            raise
+        self._health(model).record(True, time.monotonic() - start)
+        return result
+
+    async def _attempt(self, model: str, backups: List[str], fn: Callable[[str], Awaitable[T]]) -> T:
+        threshold = self._health(model).p95() if HEDGE_ENABLED else None
+        if threshold is None:
+            return await self._timed(model, fn)
+        tasks = [asyncio.ensure_future(self._timed(model, fn))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if not done:
+                # Primary is slower than its p95: race a second request against it
+                tasks.append(asyncio.ensure_future(self._timed(backups[0] if backups else model, fn)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call(self, model: str, fn: Callable[[str], Awaitable[T]]) -> T:
+        """Run `fn(model_name)` on the healthiest model of `model`'s chain, falling back on errors."""
+        candidates = self.candidates(model)
+        error: Optional[BaseException] = None
+        for i, candidate in enumerate(candidates):
+            try:
+                return await self._attempt(candidate, candidates[i + 1:], fn)
+            except Exception as e:
+                # A prompt too large for this model's context may still fit the next one
+                error = e
+        raise error
+
+    async def stream(self, model: str, open_stream: Callable[[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Streaming variant: fall back only while nothing has been yielded yet."""
+        candidates = self.candidates(model)
+        error: Optional[BaseException] = None
+        for candidate in candidates:
+            health = self._health(candidate)
+            start = time.monotonic()
+            started = False
+            try:
+                async for delta in open_stream(candidate):
+                    started = True
+                    yield delta
+            except ContextBudgetError as e:
+                health.release_probe()
+                error = e
+                continue
+            except Exception as e:
+                health.record(False)
+                if started:
+                    raise
+                error = e
+                continue
+            except BaseException:
+                # Client disconnected mid-stream
+                health.release_probe()
+                raise
+            health.record(True, time.monotonic() - start)
+            return
+        raise error
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {model: h.snapshot() for model, h in self.health.items()}
+
+
+router = ModelRouter(LLM_FALLBACKS)
@@ -0,0 +1,129 @@
+"""Split a planner outline into independently writable sections and stitch them back."""
+import re
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_SECTION_WORDS = 400
+MIN_SECTION_WORDS = 150
+
+_HEADING = re.compile(r'^\s*(#{1,3})\s+(.*?)\s*#*\s*$')
+# Only explicit budgets count: "(~800 words)" anywhere, or "500–700 words" /
+# "1,200 words" ending the line, or "Word count: 600". Other numbers in a
+# heading ("Top 10 Rugs", "2024 Guide") are not budgets.
+_NUMBER = r'(\d{1,3}(?:,\d{3})+|\d+)'
+_RANGE = _NUMBER + r'(?:\s*[-–]\s*' + _NUMBER + r')?\s*\+?\s*words?'
+_WORDS_INLINE = re.compile(r'[\(\[]\s*(?:about\s+|approx\.?\s+)?~?\s*' + _RANGE + r'\s*[\)\]]', re.I)
+_WORDS_AT_END = re.compile(r'(?<![\w,.])~?\s*' + _RANGE + r'[\s.*_]*$', re.I)
+_WORD_COUNT = re.compile(r'word\s*count\s*[:\-]?\s*~?\s*' + _NUMBER, re.I)
+
+
+def _word_budget(text: str) -> Optional[int]:
+    m = _WORD_COUNT.search(text)
+    if m:
+        return int(m.group(1).replace(',', ''))
+    m = _WORDS_INLINE.search(text) or _WORDS_AT_END.search(text)
+    if not m:
+        return None
+    low = int(m.group(1).replace(',', ''))
+    high = int(m.group(2).replace(',', '')) if m.group(2) else low
+    return (low + high) // 2
+
+
+def _clean_heading(text: str) -> str:
+    # Drop inline budgets like "History (~500 words)" from the heading itself
+    text = re.sub(r'\s*[\(\[][^\)\]]*words?[^\)\]]*[\)\]]', '', text, flags=re.I)
+    return text.strip().strip('*').strip()
+
+
+def parse_outline(outline: str) -> Tuple[Optional[str], List[Dict]]:
+    """Return the H1 title (if any) and the H2 sections, each with its H3 children.
+
+    Each section dict has `heading`, `notes` (the bullets under it), `words`
+    (explicit budget or None) and `children` (H3 sections of the same shape).
+    """
+    title = None
+    sections: List[Dict] = []
+    current: Optional[Dict] = None
+    for line in outline.splitlines():
+        m = _HEADING.match(line)
+        if m:
+            level, text = len(m.group(1)), m.group(2)
+            if level == 1:
+                title = _clean_heading(text)
+                current = None
+                continue
+            node = {"heading": _clean_heading(text), "notes": "", "words": _word_budget(text), "children": []}
+            if level == 2 or not sections:
+                sections.append(node)
+            else:
+                sections[-1]["children"].append(node)
+            current = node
+        elif current is not None and line.strip():
+            current["notes"] += line.rstrip() + "\n"
+            if current["words"] is None:
+                current["words"] = _word_budget(line)
+    return title, sections
+
+
+def plan_sections(outline: str, target_words: Optional[int] = None) -> Tuple[Optional[str], List[Dict]]:
+    """Flatten the outline into generation units in document order.
+
+    An H2 without H3s is one unit. An H2 with H3s becomes a short intro unit
+    (only if it has notes of its own) plus one unit per H3; a budget on such
+    an H2 is split across its H3s that have none. Units without an explicit
+    budget share whatever is left of `target_words`.
+    """
+    title, sections = parse_outline(outline)
+    units: List[Dict] = []
+    for section in sections:
+        if not section["children"]:
+            units.append({"heading": section["heading"], "level": 2, "parent": None,
+                          "notes": section["notes"], "words": section["words"]})
+            continue
+        child_words = sum(c["words"] or 0 for c in section["children"])
+        open_children = [c for c in section["children"] if c["words"] is None]
+        has_notes = bool(section["notes"].strip())
+        child_share = None
+        if section["words"]:
+            # The H2's budget covers its H3s too: the lead-in stays short and the rest
+            # is split across the H3s that have no budget of their own
+            left = max(section["words"] - child_words, 0)
+            intro_words = min(MIN_SECTION_WORDS, left) if has_notes or not open_children else 0
+            if open_children:
+                child_share = max(MIN_SECTION_WORDS, (left - intro_words) // len(open_children))
+        else:
+            intro_words = MIN_SECTION_WORDS if has_notes else 0
+        units.append({"heading": section["heading"], "level": 2, "parent": None, "intro": True,
+                      "notes": section["notes"], "words": intro_words})
+        for child in section["children"]:
+            units.append({"heading": child["heading"], "level": 3, "parent": section["heading"],
+                          "notes": child["notes"], "words": child["words"] or child_share})
+
+    unbudgeted = [u for u in units if u["words"] is None]
+    if unbudgeted:
+        if target_words:
+            left = target_words - sum(u["words"] or 0 for u in units)
+            share = max(MIN_SECTION_WORDS, left // len(unbudgeted))
+        else:
+            share = DEFAULT_SECTION_WORDS
+        for unit in unbudgeted:
+            unit["words"] = share
+    return title, units
+
+
+def _strip_heading(body: str, heading: str) -> str:
+    """Models often repeat the heading they were given; drop it so it isn't doubled."""
+    lines = body.strip().splitlines()
+    if lines:
+        first = lines[0].lstrip('#').strip().strip('*').strip()
+        if first.lower() == heading.lower():
+            lines = lines[1:]
+    return "\n".join(lines).strip()
+
+
+def render_unit(unit: Dict, body: str) -> str:
+    return f"{'#' * unit['level']} {unit['heading']}\n\n{_strip_heading(body, unit['heading'])}".rstrip() + "\n\n"
+
+
+def stitch(title: str, units: List[Dict], bodies: List[str]) -> str:
+    """Assemble the finished sections into one markdown document in outline order."""
+    return (f"# {title}\n\n" + "".join(render_unit(u, b) for u, b in zip(units, bodies))).strip()
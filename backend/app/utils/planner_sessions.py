@@ -0,0 +1,214 @@
+"""Server-side planner conversations.
+
+Clients send only the new user message each turn. The history lives in
+data/planner_sessions/<id>.json; once the unsummarized turns grow past
+SUMMARY_THRESHOLD tokens, all but the last KEEP_RECENT_TURNS are folded into a
+running summary that is sent in their place, so per-turn prompt size stays
+roughly constant however long the session runs.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from uuid import uuid4
+
+from backend.app.utils import ai_tools, token_budget
+from backend.app.utils.json_store import JsonFile, Unchanged
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+SESSIONS_DIR = os.path.join(DATA_DIR, 'planner_sessions')
+
+SUMMARY_THRESHOLD = int(os.getenv("PLANNER_SUMMARY_THRESHOLD", "3000"))
+KEEP_RECENT_TURNS = int(os.getenv("PLANNER_KEEP_RECENT_TURNS", "4"))
+
+_ID = re.compile(r'^[0-9a-f\-]{36}$')
+# One lock per session so overlapping turns (or a background summary) don't interleave
+_locks: Dict[str, asyncio.Lock] = {}
+# Parsed session files, reloaded only when they change on disk
+_files: Dict[str, JsonFile] = {}
+# Summaries running in the background; the reference keeps the tasks alive
+_summaries: Dict[str, asyncio.Task] = {}
+
+
+class SessionNotFound(LookupError):
+    """The session doesn't exist, or was deleted while a turn was running."""
+
+
+def _path(session_id: str) -> Optional[str]:
+    if not _ID.match(session_id):
+        return None
+    return os.path.join(SESSIONS_DIR, f"{session_id}.json")
+
+
+def _file(session_id: str) -> JsonFile:
+    """The session's file. It has no default, so a session deleted by any worker reads as None and is never recreated."""
+    if session_id not in _files:
+        path = _path(session_id)
+        if not path or not os.path.exists(path):
+            raise SessionNotFound(session_id)
+        _files[session_id] = JsonFile(path, None)
+    return _files[session_id]
+
+
+def _forget(session_id: str) -> None:
+    """Drop the in-process state kept for a session that no longer exists."""
+    _files.pop(session_id, None)
+    _locks.pop(session_id, None)
+
+
+def _lock(session_id: str) -> asyncio.Lock:
+    return _locks.setdefault(session_id, asyncio.Lock())
+
+
+def get_session(session_id: str) -> Optional[Dict]:
+    path = _path(session_id)
+    if not path or not os.path.exists(path):
+        _forget(session_id)
+        return None
+    try:
+        return _file(session_id).read()
+    except SessionNotFound:
+        return None
+
+
+def create_session(topic: str, prompt_id: Optional[str], supplemental: Optional[str]) -> Dict:
+    session_id = str(uuid4())
+    now = datetime.utcnow().isoformat()
+    session = {
+        "id": session_id,
+        "topic": topic,
+        "prompt_id": prompt_id,
+        "supplemental": supplemental,
+        "summary": None,
+        "summarized_upto": 0,  # history[:summarized_upto] is covered by summary
+        "history": [],
+        "created_at": now,
+        "updated_at": now,
+    }
+    os.makedirs(SESSIONS_DIR, exist_ok=True)
+    session_file = JsonFile(_path(session_id), None)
+    session_file.write(session)
+    _files[session_id] = session_file
+    return session
+
+
+def delete_session(session_id: str) -> bool:
+    path = _path(session_id)
+    if not path or not os.path.exists(path):
+        return False
+    os.remove(path)
+    try:
+        os.remove(f"{path}.lock")
+    except FileNotFoundError:
+        pass
+    _forget(session_id)
+    task = _summaries.pop(session_id, None)
+    if task:
+        task.cancel()
+    return True
+
+
+def _append(session_id: str, turns: List[Dict[str, str]]) -> Dict:
+    try:
+        with _file(session_id).transaction() as session:
+            if not session:  # deleted, possibly by another worker, while the turn ran
+                raise SessionNotFound(session_id)
+            session["history"].extend(turns)
+            session["updated_at"] = datetime.utcnow().isoformat()
+            return dict(session)
+    except SessionNotFound:
+        _forget(session_id)
+        raise
+
+
+def conversation_for(session: Dict, user_message: str) -> List[Dict[str, str]]:
+    """The messages sent for a turn: summary of old turns, recent turns verbatim, new message."""
+    conversation: List[Dict[str, str]] = []
+    if session["summary"]:
+        conversation.append({"role": "system", "content": f"Summary of the planning conversation so far:\n{session['summary']}"})
+    conversation += session["history"][session["summarized_upto"]:]
+    conversation.append({"role": "user", "content": user_message})
+    return conversation
+
+
+def _needs_summary(session: Dict) -> bool:
+    recent = session["history"][session["summarized_upto"]:]
+    if len(recent) <= KEEP_RECENT_TURNS:
+        return False
+    return token_budget.message_tokens(recent) > SUMMARY_THRESHOLD
+
+
+async def _summarize(session_id: str) -> None:
+    # Snapshot under the lock, but don't hold it across the LLM call: the next turn must not wait on it
+    async with _lock(session_id):
+        session = get_session(session_id)
+        if not session or not _needs_summary(session):
+            return
+        start, upto = session["summarized_upto"], len(session["history"]) - KEEP_RECENT_TURNS
+        previous, turns = session["summary"], session["history"][start:upto]
+    summary = await ai_tools.summarize_planner_turns(previous, turns)
+    async with _lock(session_id):
+        if get_session(session_id) is None:
+            return  # deleted while the summary ran
+        with _file(session_id).transaction() as stored:
+            # Deleted meanwhile, or another summary already moved on: drop this one
+            if not stored or stored["summarized_upto"] != start:
+                raise Unchanged
+            stored["summary"] = summary
+            stored["summarized_upto"] = upto
+
+
+def _schedule_summary(session: Dict) -> None:
+    # Runs after the turn has been answered, and without holding the session lock
+    # during the LLM call, so it never adds to any turn's latency
+    if _needs_summary(session) and session["id"] not in _summaries:
+        task = asyncio.create_task(_summarize(session["id"]))
+        _summaries[session["id"]] = task
+        task.add_done_callback(lambda _: _summaries.pop(session["id"], None))
+
+
+async def start(session: Dict, custom_prompt: Optional[str], cache: Optional[str] = None) -> str:
+    """Generate the initial outline for a new session and record it as the first exchange."""
+    outline = await ai_tools.generate_plan(session["topic"], custom_prompt, session["supplemental"], cache)
+    _append(session["id"], [
+        {"role": "user", "content": f"Create an outline for an article about: {session['topic']}"},
+        {"role": "assistant", "content": outline},
+    ])
+    return outline
+
+
+async def take_turn(session_id: str, user_message: str, custom_prompt: Optional[str], cache: Optional[str] = None) -> str:
+    async with _lock(session_id):
+        session = get_session(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        outline = await ai_tools.continue_plan(
+            session["topic"], custom_prompt, conversation_for(session, user_message),
+            user_message, session["supplemental"], cache,
+        )
+        session = _append(session_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": outline},
+        ])
+    _schedule_summary(session)
+    return outline
+
+
+async def stream_turn(session_id: str, user_message: str, custom_prompt: Optional[str], cache: Optional[str] = None) -> AsyncIterator[str]:
+    async with _lock(session_id):
+        session = get_session(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        parts: List[str] = []
+        async for delta in ai_tools.stream_continue_plan(
+            session["topic"], custom_prompt, conversation_for(session, user_message),
+            user_message, session["supplemental"], cache,
+        ):
+            parts.append(delta)
+            yield delta
+        session = _append(session_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": "".join(parts).strip()},
+        ])
+    _schedule_summary(session)
@@ -1,44 +1,32 @@
-import json
-import os
 from typing import List, Dict, Optional
 from uuid import uuid4
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
-PROJECTS_FILE = os.path.join(DATA_DIR, 'projects.json')
+from backend.app.utils.storage import notify, open_store
 
-# Ensure data directory and file exist
-os.makedirs(DATA_DIR, exist_ok=True)
+FIELDS = ('title', 'description', 'custom_instructions', 'planning')
 
-def _reset_projects_file():
-    with open(PROJECTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump([], f, indent=2)
+# Malformed JSON is reset to an empty list rather than failing every request
+_store = open_store('projects', reset_if_corrupt=True)
 
-try:
-    if os.path.exists(PROJECTS_FILE):
-        with open(PROJECTS_FILE, 'r', encoding='utf-8') as f:
-            json.load(f)  # Try to parse the JSON
-except json.JSONDecodeError:
-    _reset_projects_file()  # Reset if JSON is malformed
-
-if not os.path.exists(PROJECTS_FILE):
-    _reset_projects_file()
+def list_projects() -> List[Dict]:
+    return _store.all()
 
-def _read_projects() -> List[Dict]:
-    with open(PROJECTS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def signature():
+    """Changes whenever any process writes the store."""
+    return _store.signature()
 
-def _write_projects(projects: List[Dict]):
-    with open(PROJECTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(projects, f, indent=2)
+def last_write():
+    """(signature before, signature after) of this process's latest write to the store."""
+    return _store.last_write
 
-def list_projects() -> List[Dict]:
-    return _read_projects()
+def list_projects_page(after_id: Optional[str], limit: Optional[int]) -> List[Dict]:
+    """Up to `limit` projects with id > `after_id`, in id order."""
+    return _store.page(after_id, limit)
 
 def get_project(project_id: str) -> Optional[Dict]:
-    return next((p for p in _read_projects() if p['id'] == project_id), None)
+    return _store.get(project_id)
 
 def create_project(data: Dict) -> Dict:
-    projects = _read_projects()
     project = {
         'id': str(uuid4()),
         'title': data.get('title', ''),
@@ -46,28 +34,18 @@ def create_project(data: Dict) -> Dict:
         'custom_instructions': data.get('custom_instructions', ''),
         'planning': data.get('planning', '')
     }
-    projects.append(project)
-    _write_projects(projects)
+    project = _store.insert(project)
+    notify('projects', 'upsert', project)
     return project
 
 def update_project(project_id: str, data: Dict) -> Optional[Dict]:
-    projects = _read_projects()
-    for p in projects:
-        if p['id'] == project_id:
-            p.update({
-                'title': data.get('title', p['title']),
-                'description': data.get('description', p['description']),
-                'custom_instructions': data.get('custom_instructions', p['custom_instructions']),
-                'planning': data.get('planning', p['planning'])
-            })
-            _write_projects(projects)
-            return p
-    return None
+    project = _store.update(project_id, {k: data[k] for k in FIELDS if k in data})
+    if project:
+        notify('projects', 'upsert', project)
+    return project
 
 def delete_project(project_id: str) -> bool:
-    projects = _read_projects()
-    new_projects = [p for p in projects if p['id'] != project_id]
-    if len(new_projects) == len(projects):
-        return False
-    _write_projects(new_projects)
-    return True 
\ No newline at end of file
+    deleted = _store.delete(project_id)
+    if deleted:
+        notify('projects', 'delete', {'id': project_id})
+    return deleted
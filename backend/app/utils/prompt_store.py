@@ -1,32 +1,38 @@
-import json
-import os
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional
 from uuid import uuid4
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
-PROMPTS_FILE = os.path.join(DATA_DIR, 'prompts.json')
+from backend.app.utils.storage import notify, open_store
 
-os.makedirs(DATA_DIR, exist_ok=True)
-if not os.path.exists(PROMPTS_FILE):
-    with open(PROMPTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump([], f)
+FIELDS = ('title', 'content', 'type', 'tags')
 
-def _read_prompts() -> List[Dict]:
-    with open(PROMPTS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def _write_prompts(prompts: List[Dict]):
-    with open(PROMPTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(prompts, f, indent=2)
+_store = open_store('prompts')
 
 def list_prompts() -> List[Dict]:
-    return _read_prompts()
+    return _store.all()
+
+def signature():
+    """Changes whenever any process writes the store."""
+    return _store.signature()
+
+def last_write():
+    """(signature before, signature after) of this process's latest write to the store."""
+    return _store.last_write
+
+def list_prompts_by_type(prompt_type: str) -> List[Dict]:
+    return _store.by_type(prompt_type)
+
+def list_prompts_by_tag(tag: str) -> List[Dict]:
+    return _store.by_tag(tag)
+
+def list_prompts_page(after_id: Optional[str], limit: Optional[int],
+                      prompt_type: Optional[str] = None, tags: Iterable[str] = ()) -> List[Dict]:
+    """Up to `limit` prompts with id > `after_id`, in id order."""
+    return _store.page(after_id, limit, prompt_type, tags)
 
 def get_prompt(prompt_id: str) -> Optional[Dict]:
-    return next((p for p in _read_prompts() if p['id'] == prompt_id), None)
+    return _store.get(prompt_id)
 
 def create_prompt(data: Dict) -> Dict:
-    prompts = _read_prompts()
     prompt = {
         'id': str(uuid4()),
         'title': data.get('title', ''),
@@ -34,28 +40,18 @@ def create_prompt(data: Dict) -> Dict:
         'type': data.get('type', 'generation'),
         'tags': data.get('tags', [])
     }
-    prompts.append(prompt)
-    _write_prompts(prompts)
+    prompt = _store.insert(prompt)
+    notify('prompts', 'upsert', prompt)
     return prompt
 
 def update_prompt(prompt_id: str, data: Dict) -> Optional[Dict]:
-    prompts = _read_prompts()
-    for p in prompts:
-        if p['id'] == prompt_id:
-            p.update({
-                'title': data.get('title', p['title']),
-                'content': data.get('content', p['content']),
-                'type': data.get('type', p['type']),
-                'tags': data.get('tags', p['tags'])
-            })
-            _write_prompts(prompts)
-            return p
-    return None
+    prompt = _store.update(prompt_id, {k: data[k] for k in FIELDS if k in data})
+    if prompt:
+        notify('prompts', 'upsert', prompt)
+    return prompt
 
 def delete_prompt(prompt_id: str) -> bool:
-    prompts = _read_prompts()
-    new_prompts = [p for p in prompts if p['id'] != prompt_id]
-    if len(new_prompts) == len(prompts):
-        return False
-    _write_prompts(new_prompts)
-    return True 
\ No newline at end of file
+    deleted = _store.delete(prompt_id)
+    if deleted:
+        notify('prompts', 'delete', {'id': prompt_id})
+    return deleted
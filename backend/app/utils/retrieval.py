@@ -0,0 +1,212 @@
+"""BM25 retrieval over supplementals and data/*.md knowledge files.
+
+Requests that set `top_k` get only the most relevant chunks injected as
+supplemental context instead of whole documents. Before each search the
+supplementals store's signature is checked, so writes from any worker are
+picked up and only added, edited or deleted records are re-chunked. Knowledge
+files are re-chunked when their mtime or size changes.
+"""
+import glob
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.app.utils import storage, supp_store
+from backend.app.utils.text import tokenize
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "150"))
+# Chunks joined the same way the frontend joins selected supplementals
+SEPARATOR = "\n---\n"
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_HEADING = re.compile(r'^#{1,6}\s')
+
+
+def chunk_text(text: str, max_words: int = RETRIEVAL_CHUNK_WORDS) -> List[str]:
+    """Pack paragraphs into chunks of about `max_words`. A heading always starts a new chunk."""
+    chunks: List[str] = []
+    buf: List[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal buf, size
+        if buf:
+            chunks.append("\n\n".join(buf))
+        buf, size = [], 0
+
+    for para in re.split(r'\n\s*\n', text):
+        para = para.strip()
+        if not para:
+            continue
+        words = len(para.split())
+        if _HEADING.match(para) or (buf and size + words > max_words):
+            flush()
+        if words > max_words:
+            # One huge paragraph: fall back to fixed word windows
+            tokens = para.split()
+            for i in range(0, len(tokens), max_words):
+                chunks.append(" ".join(tokens[i:i + max_words]))
+            continue
+        buf.append(para)
+        size += words
+    flush()
+    return chunks
+
+
+class BM25Index:
+    """Inverted index of chunks grouped by source document; documents can be replaced or removed."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._lengths: Dict[Tuple[str, int], int] = {}
+        self._texts: Dict[Tuple[str, int], str] = {}
+        self._docs: Dict[str, int] = {}  # doc id -> chunk count
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def add(self, doc_id: str, chunks: Iterable[str]) -> None:
+        with self._lock:
+            self._remove(doc_id)
+            count = 0
+            for n, text in enumerate(chunks):
+                key = (doc_id, n)
+                terms = Counter(tokenize(text))
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[key] = tf
+                self._lengths[key] = sum(terms.values())
+                self._total_length += self._lengths[key]
+                self._texts[key] = text
+                count += 1
+            self._docs[doc_id] = count
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        for n in range(self._docs.pop(doc_id, 0)):
+            key = (doc_id, n)
+            for term in set(tokenize(self._texts.pop(key))):
+                postings = self._postings[term]
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(key)
+
+    def search(self, query: str, k: int, doc_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Top `k` chunks for `query`, optionally limited to some documents."""
+        allowed = set(doc_ids) if doc_ids is not None else None
+        with self._lock:
+            n_chunks = len(self._lengths)
+            if not n_chunks:
+                return []
+            avg_length = self._total_length / n_chunks or 1
+            scores: Dict[Tuple[str, int], float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if allowed is not None and key[0] not in allowed:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[key] / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+            return [
+                {"source": key[0], "chunk": key[1], "score": round(score, 4), "text": self._texts[key]}
+                for key, score in best
+            ]
+
+
+_index = BM25Index()
+_build_lock = threading.Lock()
+_file_signatures: Dict[str, Tuple[float, int]] = {}
+# Supplementals are re-checked whenever the store changes, including writes
+# from other workers, which in-process store listeners never see
+_store_signature = None
+_supp_fingerprints: Dict[str, str] = {}
+
+
+def _knowledge_id(path: str) -> str:
+    return f"knowledge:{os.path.basename(path)}"
+
+
+def _refresh_supplementals() -> None:
+    """Re-chunk supplementals added or edited since the last search and drop deleted ones."""
+    global _store_signature
+    signature = supp_store.signature()
+    if signature is not None and signature == _store_signature:
+        return
+    upserts, removed = storage.changed_records(supp_store.list_items(), _supp_fingerprints)
+    for item in upserts:
+        _index.add(item["id"], chunk_text(item.get("content") or ""))
+    for item_id in removed:
+        _index.remove(item_id)
+    _store_signature = signature
+
+
+def _refresh_knowledge_files() -> None:
+    """Re-chunk data/*.md files that changed since they were last indexed."""
+    seen = set()
+    for path in glob.glob(os.path.join(DATA_DIR, '*.md')):
+        doc_id = _knowledge_id(path)
+        seen.add(doc_id)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        signature = (st.st_mtime, st.st_size)
+        if _file_signatures.get(doc_id) == signature:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            _index.add(doc_id, chunk_text(f.read()))
+        _file_signatures[doc_id] = signature
+    for doc_id in set(_file_signatures) - seen:
+        _index.remove(doc_id)
+        del _file_signatures[doc_id]
+
+
+def _ensure_index() -> None:
+    with _build_lock:
+        _refresh_supplementals()
+        _refresh_knowledge_files()
+
+
+def search(query: str, k: int, doc_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Top `k` chunks across supplementals (by id) and knowledge files (`knowledge:<file>.md`)."""
+    _ensure_index()
+    return _index.search(query, k, doc_ids)
+
+
+def document_query(markdown: str, max_words: int = 200) -> str:
+    """Retrieval query for a whole document: its headings plus its opening words."""
+    headings = [line for line in markdown.splitlines() if _HEADING.match(line)]
+    return "\n".join(headings + [" ".join(markdown.split()[:max_words])])
+
+
+def supplemental_context(query: str, supplemental: Optional[str], top_k: Optional[int], doc_ids: Optional[List[str]] = None) -> Optional[str]:
+    """Supplemental text to put in a prompt.
+
+    Without `top_k` the caller's text is used unchanged. With it, pasted
+    `supplemental` text is chunked and cut down to its `top_k` best chunks;
+    if nothing was pasted, the indexed library is searched instead.
+    """
+    if not top_k:
+        return supplemental
+    if supplemental:
+        chunks = chunk_text(supplemental)
+        adhoc = BM25Index()
+        adhoc.add("request", chunks)
+        # No overlap with the query at all: keep the opening chunks rather than nothing
+        hits = adhoc.search(query, top_k) or [{"text": c} for c in chunks[:top_k]]
+    else:
+        hits = search(query, top_k, doc_ids)
+    return SEPARATOR.join(h["text"] for h in hits) or None
@@ -0,0 +1,216 @@
+"""In-process full-text index over prompts, supplementals and projects.
+
+Built from the stores on first search, then kept current by store listeners
+so CRUD calls update single records instead of triggering a rebuild. Writes
+from other workers are caught by comparing each store's signature before a
+search. Query terms match whole words or word prefixes; every term must match.
+"""
+import bisect
+import math
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.app.utils import project_store, prompt_store, storage, supp_store
+from backend.app.utils.text import tokenize
+
+# kind -> (store table, fields searched as body text)
+KINDS = {
+    'prompt': ('prompts', ('content',)),
+    'supplemental': ('supplementals', ('content',)),
+    'project': ('projects', ('description', 'custom_instructions', 'planning')),
+}
+# Matches in titles and tags count for more than body matches
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+# A prefix match scores lower than the exact word
+PREFIX_WEIGHT = 0.7
+# Cap on how many indexed words one prefix may expand to
+MAX_PREFIX_EXPANSION = 50
+SNIPPET_CHARS = 160
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+Key = Tuple[str, str]  # (kind, record id)
+
+
+def _document(kind: str, record: Dict) -> Tuple[Counter, str]:
+    """Field-weighted term counts and the body text used for snippets."""
+    body = "\n".join(record.get(f) or "" for f in KINDS[kind][1])
+    terms = Counter(tokenize(body))
+    for term in tokenize(record.get('title') or ""):
+        terms[term] += TITLE_WEIGHT
+    for term in tokenize(" ".join(record.get('tags') or [])):
+        terms[term] += TAG_WEIGHT
+    return terms, body
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[Key, int]] = {}
+        self._vocab: List[str] = []  # sorted, for prefix lookups
+        self._lengths: Dict[Key, int] = {}
+        self._terms: Dict[Key, Tuple[str, ...]] = {}
+        self._meta: Dict[Key, Dict] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, kind: str, record: Dict) -> None:
+        key = (kind, record['id'])
+        terms, body = _document(kind, record)
+        with self._lock:
+            self._remove(key)
+            for term, tf in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._vocab, term)
+                postings[key] = tf
+            self._terms[key] = tuple(terms)
+            self._lengths[key] = sum(terms.values())
+            self._total_length += self._lengths[key]
+            self._meta[key] = {
+                'title': record.get('title') or "",
+                'tags': list(record.get('tags') or []),
+                'body': body,
+            }
+
+    def remove(self, kind: str, record_id: str) -> None:
+        with self._lock:
+            self._remove((kind, record_id))
+
+    def _remove(self, key: Key) -> None:
+        for term in self._terms.pop(key, ()):
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+        if key in self._lengths:
+            self._total_length -= self._lengths.pop(key)
+            del self._meta[key]
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Indexed words matching `token`, exactly or as a prefix, with their weights."""
+        matches = []
+        start = bisect.bisect_left(self._vocab, token)
+        for term in self._vocab[start:start + MAX_PREFIX_EXPANSION]:
+            if not term.startswith(token):
+                break
+            matches.append((term, 1.0 if term == token else PREFIX_WEIGHT))
+        return matches
+
+    def search(self, query: str, kind: Optional[str] = None, tags: Iterable[str] = (), limit: int = 20) -> List[Dict]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        wanted_tags = {t.lower() for t in tags}
+        if not tokens:
+            return []
+        with self._lock:
+            n_docs = len(self._lengths)
+            avg_length = self._total_length / n_docs if n_docs else 1
+            scores: Dict[Key, float] = {}
+            for i, token in enumerate(tokens):
+                token_scores: Dict[Key, float] = {}
+                for term, weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[key] / avg_length)
+                        s = weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                        token_scores[key] = max(token_scores.get(key, 0.0), s)
+                # Every query term has to match
+                if i == 0:
+                    scores = token_scores
+                else:
+                    scores = {k: v + token_scores[k] for k, v in scores.items() if k in token_scores}
+                if not scores:
+                    return []
+            results = []
+            for key, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True):
+                if kind and key[0] != kind:
+                    continue
+                meta = self._meta[key]
+                if wanted_tags and not wanted_tags <= {t.lower() for t in meta['tags']}:
+                    continue
+                results.append({
+                    'kind': key[0],
+                    'id': key[1],
+                    'title': meta['title'],
+                    'tags': meta['tags'],
+                    'score': round(score, 4),
+                    'snippet': _snippet(meta['body'], tokens),
+                })
+                if len(results) >= limit:
+                    break
+            return results
+
+
+def _snippet(body: str, tokens: List[str]) -> str:
+    """A window of the body around the first query match."""
+    lowered = body.lower()
+    hits = [pos for pos in (lowered.find(t) for t in tokens) if pos >= 0]
+    start = max(0, min(hits) - SNIPPET_CHARS // 4) if hits else 0
+    snippet = " ".join(body[start:start + SNIPPET_CHARS].split())
+    return ("…" if start else "") + snippet + ("…" if start + SNIPPET_CHARS < len(body) else "")
+
+
+_index = SearchIndex()
+_sync_lock = threading.Lock()
+
+# kind -> (list records, store signature, this process's last write)
+_SOURCES = {
+    'prompt': (prompt_store.list_prompts, prompt_store.signature, prompt_store.last_write),
+    'supplemental': (supp_store.list_items, supp_store.signature, supp_store.last_write),
+    'project': (project_store.list_projects, project_store.signature, project_store.last_write),
+}
+_signatures: Dict[str, object] = {}
+_fingerprints: Dict[str, Dict[str, str]] = {kind: {} for kind in KINDS}
+
+
+def _listener(kind: str):
+    def on_change(event: str, record: Dict) -> None:
+        with _sync_lock:
+            if kind not in _signatures:
+                return  # picked up by the first sync
+            if event == "delete":
+                _index.remove(kind, record['id'])
+                _fingerprints[kind].pop(record['id'], None)
+            else:
+                _index.upsert(kind, record)
+                _fingerprints[kind][record['id']] = storage.fingerprint(record)
+            # If nothing else changed the store since the last sync, this write is
+            # fully applied and the next search needn't scan; otherwise it will
+            before, after = _SOURCES[kind][2]() or (None, None)
+            if before is not None and before == _signatures[kind]:
+                _signatures[kind] = after
+    return on_change
+
+
+for _kind, (_table, _) in KINDS.items():
+    storage.subscribe(_table, _listener(_kind))
+
+
+def _sync() -> None:
+    """Catch up with writes made by other workers, which this process's listeners never see.
+
+    Each store's signature is compared with the one last synced; only when it
+    changed for a reason other than a write from this process are the store's
+    records listed, and then only those whose fingerprint changed are re-indexed.
+    """
+    with _sync_lock:
+        for kind, (list_records, signature, _) in _SOURCES.items():
+            current = signature()
+            if current is not None and current == _signatures.get(kind):
+                continue
+            upserts, removed = storage.changed_records(list_records(), _fingerprints[kind])
+            for record in upserts:
+                _index.upsert(kind, record)
+            for record_id in removed:
+                _index.remove(kind, record_id)
+            _signatures[kind] = current
+
+
+def search(query: str, kind: Optional[str] = None, tags: Iterable[str] = (), limit: int = 20) -> List[Dict]:
+    _sync()
+    return _index.search(query, kind, tags, limit)
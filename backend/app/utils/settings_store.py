@@ -1,7 +1,9 @@
-import json, os
+import os
 from typing import Dict
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+from backend.app.utils.json_store import JsonFile
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
 SETTINGS_FILE = os.path.join(DATA_DIR, 'settings.json')
 
 DEFAULT_SETTINGS = {
@@ -9,24 +11,13 @@ DEFAULT_SETTINGS = {
     "supplement_system": "You are a skilled technical writer. You refine user-provided supplemental information (reference text) by fixing grammar, simplifying where possible, and making the content concise while preserving meaning. Always return ONLY the improved text with no extra commentary."
 }
 
-os.makedirs(DATA_DIR, exist_ok=True)
-if not os.path.exists(SETTINGS_FILE):
-    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(DEFAULT_SETTINGS, f, indent=2)
-
-def _read() -> Dict:
-    with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def _write(data: Dict):
-    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+_file = JsonFile(SETTINGS_FILE, DEFAULT_SETTINGS)
 
 def get_settings() -> Dict:
-    return _read()
+    return dict(_file.read())
 
 def update_settings(data: Dict) -> Dict:
-    settings = _read()
-    settings.update(data)
-    _write(settings)
-    return settings 
\ No newline at end of file
+    with _file.transaction() as settings:
+        settings.update(data)
+        updated = dict(settings)
+    return updated
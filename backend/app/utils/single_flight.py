@@ -0,0 +1,166 @@
+"""Coalesce identical in-flight LLM requests onto one upstream call.
+
+Inside a worker, callers with the same request key share one `Flight`. The
+upstream call runs as a task that buffers its deltas, so a late joiner
+replays what has already arrived and then follows live. If every caller
+goes away, the call is cancelled.
+
+Across workers, the leader for a key holds an `fcntl` lock file while it
+calls upstream. Another worker that finds the lock waits for it to be
+released, then reads the answer from the shared disk cache. It does not
+see live deltas.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # no cross-worker coalescing on platforms without fcntl
+    fcntl = None
+
+from backend.app.utils import llm_cache, metrics
+
+LOCK_DIR = os.path.join(llm_cache.CACHE_DIR, 'inflight')
+LOCK_POLL_INTERVAL = float(os.getenv("LLM_INFLIGHT_POLL", "0.1"))
+# Stop waiting on another worker after this long and call upstream anyway
+LOCK_WAIT_TIMEOUT = float(os.getenv("LLM_INFLIGHT_WAIT", os.getenv("LLM_TIMEOUT", "300")))
+
+
+class Flight:
+    """One upstream call and the deltas it has produced so far."""
+
+    def __init__(self):
+        self.deltas: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.followers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # Wake current waiters; later ones wait on a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def push(self, delta: str) -> None:
+        self.deltas.append(delta)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Every delta from the start, then live ones until the call finishes."""
+        self.followers += 1
+        i = 0
+        try:
+            while True:
+                while i < len(self.deltas):
+                    yield self.deltas[i]
+                    i += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.done and self.task:
+                self.task.cancel()
+
+    async def result(self) -> str:
+        return "".join([d async for d in self.follow()]).strip()
+
+
+_flights: Dict[str, Flight] = {}
+
+
+def join(key: str, produce: Callable[[], AsyncIterator[str]]) -> Flight:
+    """The in-flight call for `key`, started with `produce()` if there is none."""
+    flight = _flights.get(key)
+    if flight is not None:
+        metrics.LLM_COALESCED.inc(scope="local")
+        return flight
+    flight = _flights[key] = Flight()
+
+    async def run() -> None:
+        gen = produce()
+        try:
+            async for delta in gen:
+                flight.push(delta)
+            flight.finish()
+        except asyncio.CancelledError as e:
+            flight.finish(e)
+            raise
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            if _flights.get(key) is flight:
+                del _flights[key]
+            await gen.aclose()
+
+    flight.task = asyncio.create_task(run())
+    return flight
+
+
+@asynccontextmanager
+async def across_workers(key: str, lookup: Callable[[], Optional[str]]) -> AsyncIterator[Optional[str]]:
+    """Hold the cross-worker lock for `key` while the body calls upstream.
+
+    Yields None when this worker should make the call. If another worker held
+    the lock, yields `lookup()` once that worker is done; that is its cached
+    answer, or None if it failed.
+    """
+    if fcntl is None:
+        yield None
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    path = os.path.join(LOCK_DIR, f"{key}.lock")
+    fd = None
+    try:
+        waited = False
+        deadline = time.monotonic() + LOCK_WAIT_TIMEOUT
+        locked = False
+        while time.monotonic() < deadline:
+            if fd is None:
+                fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                waited = True
+                # Poll rather than block so the event loop keeps serving
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                continue
+            # The previous leader unlinks the file on its way out. If ours was
+            # unlinked while we waited, a newcomer may hold a lock on a fresh file
+            # at the same path: start over on that one rather than lead in parallel.
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(fd).st_ino:
+                locked = True
+                break
+            os.close(fd)
+            fd = None
+        cached = lookup() if waited else None
+        if cached is not None:
+            metrics.LLM_COALESCED.inc(scope="cross_worker")
+        try:
+            yield cached
+        finally:
+            if locked:
+                # Unlink while still holding the lock; waiters on this inode re-check and move on
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        if fd is not None:
+            os.close(fd)
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from backend.app.utils.metrics import timed_store
+
+
+class SqliteStore:
+    """Record store with the same interface as `JsonStore`, backed by one SQLite table.
+
+    Each record is kept as a JSON blob next to indexed `id`, `type` and
+    `created_at` columns, with tags in a side table, so point reads and
+    writes are O(log n) instead of rewriting the whole library. Insertion
+    order is the table's rowid order.
+    """
+
+    def __init__(self, db_path: str, table: str):
+        self.db_path = db_path
+        self.table = table
+        self.store_name = table
+        self._local = threading.local()
+        # (signature before, signature after) of this process's latest write
+        self.last_write: Optional[tuple] = None
+        self._conn().executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id TEXT PRIMARY KEY,
+                type TEXT,
+                created_at TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {table}_type_idx ON {table}(type);
+            CREATE INDEX IF NOT EXISTS {table}_created_at_idx ON {table}(created_at);
+            CREATE TABLE IF NOT EXISTS {table}_tags (
+                tag TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (tag, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS {table}_tags_id_idx ON {table}_tags(id);
+        """)
+
+    # ------------------------------------------------------------ connection
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, and sync routes
+        # run on the threadpool, so keep one connection per thread.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        before = self.signature()
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self.last_write = (before, self.signature())
+
+    def signature(self) -> tuple:
+        """Changes on every commit from any process: commits grow the -wal file, checkpoints rewrite the db."""
+        stats = []
+        for path in (self.db_path, f"{self.db_path}-wal"):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                stats.append(None)
+                continue
+            stats.append((st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    @staticmethod
+    def _rows(cursor: Iterable) -> List[Dict]:
+        return [json.loads(row[0]) for row in cursor]
+
+    # ----------------------------------------------------------------- reads
+
+    @timed_store
+    def all(self) -> List[Dict]:
+        return self._rows(self._conn().execute(f"SELECT data FROM {self.table} ORDER BY rowid"))
+
+    @timed_store
+    def get(self, record_id: str) -> Optional[Dict]:
+        row = self._conn().execute(f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @timed_store
+    def by_type(self, type_: str) -> List[Dict]:
+        return self._rows(self._conn().execute(
+            f"SELECT data FROM {self.table} WHERE type = ? ORDER BY rowid", (type_,)
+        ))
+
+    @timed_store
+    def by_tag(self, tag: str) -> List[Dict]:
+        return self._rows(self._conn().execute(
+            f"SELECT r.data FROM {self.table}_tags t JOIN {self.table} r ON r.id = t.id "
+            f"WHERE t.tag = ? ORDER BY r.rowid",
+            (tag,),
+        ))
+
+    @timed_store
+    def page(self, after_id: Optional[str] = None, limit: Optional[int] = None,
+             type_: Optional[str] = None, tags: Iterable[str] = ()) -> List[Dict]:
+        """Up to `limit` records with id > `after_id`, in id order, optionally of one type and carrying every tag."""
+        where, params = [], []
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+        if type_ is not None:
+            where.append("type = ?")
+            params.append(type_)
+        for tag in dict.fromkeys(tags):
+            where.append(f"id IN (SELECT id FROM {self.table}_tags WHERE tag = ?)")
+            params.append(tag)
+        sql = f"SELECT data FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._rows(self._conn().execute(sql, params))
+
+    # ---------------------------------------------------------------- writes
+
+    def _put(self, conn: sqlite3.Connection, record: Dict) -> None:
+        conn.execute(
+            f"INSERT INTO {self.table} (id, type, created_at, data) VALUES (?, ?, ?, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET type = excluded.type, "
+            f"created_at = excluded.created_at, data = excluded.data",
+            (record['id'], record.get('type'), record.get('created_at'), json.dumps(record)),
+        )
+        conn.execute(f"DELETE FROM {self.table}_tags WHERE id = ?", (record['id'],))
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {self.table}_tags (tag, id) VALUES (?, ?)",
+            [(tag, record['id']) for tag in record.get('tags') or []],
+        )
+
+    @timed_store
+    def insert(self, record: Dict) -> Dict:
+        with self._tx() as conn:
+            self._put(conn, record)
+        return dict(record)
+
+    @timed_store
+    def insert_many(self, records: Iterable[Dict]) -> int:
+        count = 0
+        with self._tx() as conn:
+            for record in records:
+                self._put(conn, record)
+                count += 1
+        return count
+
+    @timed_store
+    def update(self, record_id: str, changes: Dict) -> Optional[Dict]:
+        with self._tx() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            record.update(changes)
+            self._put(conn, record)
+        return record
+
+    @timed_store
+    def delete(self, record_id: str) -> bool:
+        with self._tx() as conn:
+            cur = conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (record_id,))
+            conn.execute(f"DELETE FROM {self.table}_tags WHERE id = ?", (record_id,))
+        return cur.rowcount > 0
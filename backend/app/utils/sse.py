@@ -0,0 +1,30 @@
+import json
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+
+async def _events(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    # Send a comment straight away so proxies and the browser see the first
+    # byte before the model has produced anything.
+    yield ": stream-open\n\n"
+    try:
+        async for chunk in chunks:
+            yield f"data: {json.dumps({'delta': chunk})}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+def sse_response(chunks: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of text deltas as a Server-Sent Events response.
+
+    Each delta is sent as `data: {"delta": "..."}`; the stream ends with an
+    `event: done` (or `event: error`) message. Nothing is buffered server-side.
+    """
+    return StreamingResponse(
+        _events(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
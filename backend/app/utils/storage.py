@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from backend.app.utils.json_store import JsonStore
+from backend.app.utils.metrics import logger
+from backend.app.utils.sqlite_store import SqliteStore
+
+DATA_DIR = os.getenv("RUGS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
+DB_FILE = os.path.join(DATA_DIR, 'rugs.db')
+
+# "json" (default) keeps the flat files in data/; "sqlite" uses data/rugs.db.
+# Run `python main.py migrate-stores` once before switching to sqlite.
+STORE_BACKEND = os.getenv("RUGS_STORE_BACKEND", "json").lower()
+
+# table name -> JSON file it replaces
+STORES = {
+    'projects': os.path.join(DATA_DIR, 'projects.json'),
+    'prompts': os.path.join(DATA_DIR, 'prompts.json'),
+    'supplementals': os.path.join(DATA_DIR, 'supplementals.json'),
+}
+
+# table -> callbacks run after each create/update/delete, used to keep indexes current
+_listeners: Dict[str, List[Callable[[str, Dict], None]]] = {}
+
+
+def subscribe(table: str, listener: Callable[[str, Dict], None]) -> None:
+    """Call `listener(event, record)` after writes to `table`; event is "upsert" or "delete"."""
+    _listeners.setdefault(table, []).append(listener)
+
+
+def notify(table: str, event: str, record: Dict) -> None:
+    """Run `table`'s listeners. The write has already happened, so a failing index is logged, not raised."""
+    for listener in _listeners.get(table, ()):
+        try:
+            listener(event, record)
+        except Exception:
+            logger.exception("%s listener failed on %s of %s", table, event, record.get('id'))
+
+
+def fingerprint(record: Dict) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def changed_records(records: Iterable[Dict], known: Dict[str, str]) -> Tuple[List[Dict], List[str]]:
+    """Records that are new or changed since `known` (id -> fingerprint) and ids that are gone.
+
+    `known` is updated in place. Listeners only see writes made in this process;
+    indexes call this when a store's signature changes to catch the rest.
+    """
+    upserts, seen = [], set()
+    for record in records:
+        seen.add(record['id'])
+        digest = fingerprint(record)
+        if known.get(record['id']) != digest:
+            known[record['id']] = digest
+            upserts.append(record)
+    removed = [record_id for record_id in known if record_id not in seen]
+    for record_id in removed:
+        del known[record_id]
+    return upserts, removed
+
+
+def open_store(table: str, reset_if_corrupt: bool = False):
+    """Return the configured record store for `table`."""
+    if STORE_BACKEND == "sqlite":
+        os.makedirs(DATA_DIR, exist_ok=True)
+        return SqliteStore(DB_FILE, table)
+    if STORE_BACKEND != "json":
+        raise ValueError(f"Unknown RUGS_STORE_BACKEND: {STORE_BACKEND!r}")
+    return JsonStore(STORES[table], reset_if_corrupt=reset_if_corrupt)
+
+
+def migrate_json_to_sqlite(db_path: str = DB_FILE) -> Dict[str, int]:
+    """Import every JSON store into SQLite. Safe to re-run: rows are upserted by id."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    counts = {}
+    for table, json_path in STORES.items():
+        records = []
+        if os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        counts[table] = SqliteStore(db_path, table).insert_many(records)
+    return counts
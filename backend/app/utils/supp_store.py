@@ -1,33 +1,35 @@
-import json
-import os
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional
 from uuid import uuid4
 from datetime import datetime
 
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../data')
-SUPP_FILE = os.path.join(DATA_DIR, 'supplementals.json')
+from backend.app.utils.storage import notify, open_store
 
-os.makedirs(DATA_DIR, exist_ok=True)
-if not os.path.exists(SUPP_FILE):
-    with open(SUPP_FILE, 'w', encoding='utf-8') as f:
-        json.dump([], f)
+FIELDS = ('title', 'content', 'tags')
 
-def _read() -> List[Dict]:
-    with open(SUPP_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def _write(data: List[Dict]):
-    with open(SUPP_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+_store = open_store('supplementals')
 
 def list_items() -> List[Dict]:
-    return _read()
+    return _store.all()
+
+def signature():
+    """Changes whenever any process writes the store."""
+    return _store.signature()
+
+def last_write():
+    """(signature before, signature after) of this process's latest write to the store."""
+    return _store.last_write
+
+def list_items_by_tag(tag: str) -> List[Dict]:
+    return _store.by_tag(tag)
+
+def list_items_page(after_id: Optional[str], limit: Optional[int], tags: Iterable[str] = ()) -> List[Dict]:
+    """Up to `limit` items with id > `after_id`, in id order."""
+    return _store.page(after_id, limit, tags=tags)
 
 def get_item(item_id: str) -> Optional[Dict]:
-    return next((i for i in _read() if i['id'] == item_id), None)
+    return _store.get(item_id)
 
 def create_item(data: Dict) -> Dict:
-    items = _read()
     item = {
         'id': str(uuid4()),
         'title': data.get('title', ''),
@@ -35,27 +37,18 @@ def create_item(data: Dict) -> Dict:
         'tags': data.get('tags', []),
         'created_at': datetime.utcnow().isoformat()
     }
-    items.append(item)
-    _write(items)
+    item = _store.insert(item)
+    notify('supplementals', 'upsert', item)
     return item
 
 def update_item(item_id: str, data: Dict) -> Optional[Dict]:
-    items = _read()
-    for itm in items:
-        if itm['id'] == item_id:
-            itm.update({
-                'title': data.get('title', itm['title']),
-                'content': data.get('content', itm['content']),
-                'tags': data.get('tags', itm['tags'])
-            })
-            _write(items)
-            return itm
-    return None
+    item = _store.update(item_id, {k: data[k] for k in FIELDS if k in data})
+    if item:
+        notify('supplementals', 'upsert', item)
+    return item
 
 def delete_item(item_id: str) -> bool:
-    items = _read()
-    new_items = [i for i in items if i['id'] != item_id]
-    if len(new_items) == len(items):
-        return False
-    _write(new_items)
-    return True 
\ No newline at end of file
+    deleted = _store.delete(item_id)
+    if deleted:
+        notify('supplementals', 'delete', {'id': item_id})
+    return deleted
@@ -0,0 +1,142 @@
+"""Local token accounting so oversize requests are trimmed or rejected before they're sent."""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a chars/4 estimate
+    tiktoken = None
+
+# Context window and maximum completion size per model
+MODEL_CONTEXT = {
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+MODEL_MAX_OUTPUT = {
+    "gpt-4": 4096,
+    "gpt-4-turbo": 4096,
+    "gpt-4o": 16384,
+    "gpt-4o-mini": 16384,
+    "gpt-3.5-turbo": 4096,
+}
+DEFAULT_CONTEXT = 8192
+DEFAULT_MAX_OUTPUT = 4096
+# Never send a request that leaves less room than this for the answer
+MIN_OUTPUT_TOKENS = int(os.getenv("MIN_OUTPUT_TOKENS", "512"))
+
+# Per-message framing overhead in the chat format
+_MESSAGE_OVERHEAD = 4
+_REPLY_PRIMER = 3
+
+
+class ContextBudgetError(ValueError):
+    """The fixed part of a request (system prompt, supplemental, latest message) can't fit the model."""
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _count(model: str, text: str) -> int:
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+# (model, sha1 of text) -> count. Keyed on a digest so the memo doesn't pin
+# thousands of full articles in memory.
+_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "4096"))
+_counts: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+_counts_lock = threading.Lock()
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Token count for `text`; results are memoized, so stored prompts are counted once."""
+    text = text or ""
+    key = (model, hashlib.sha1(text.encode('utf-8')).digest())
+    with _counts_lock:
+        count = _counts.get(key)
+        if count is not None:
+            _counts.move_to_end(key)
+            return count
+    count = _count(model, text)
+    with _counts_lock:
+        _counts[key] = count
+        if len(_counts) > _COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return count
+
+
+def message_tokens(messages: List[Dict[str, str]], model: str = "gpt-4") -> int:
+    return sum(count_tokens(m.get("content", ""), model) + _MESSAGE_OVERHEAD for m in messages) + _REPLY_PRIMER
+
+
+def fit(
+    model: str,
+    messages: List[Dict[str, str]],
+    max_tokens: Optional[int] = None,
+) -> Tuple[List[Dict[str, str]], int]:
+    """Trim the request to the model's context window and cap the completion size.
+
+    The leading system prompt(s) and the latest user message (with anything
+    after it, such as a trailing supplemental message) are always kept; the
+    oldest turns in between are dropped first and replaced with a short note. Returns the (possibly trimmed) messages and the `max_tokens` to send.
+    """
+    context = MODEL_CONTEXT.get(model, DEFAULT_CONTEXT)
+    wanted = min(max_tokens or MODEL_MAX_OUTPUT.get(model, DEFAULT_MAX_OUTPUT), MODEL_MAX_OUTPUT.get(model, DEFAULT_MAX_OUTPUT))
+    floor = min(wanted, MIN_OUTPUT_TOKENS)
+
+    used = message_tokens(messages, model)
+    if used + floor > context and len(messages) > 2:
+        head = 0
+        while head < len(messages) - 1 and messages[head]["role"] == "system":
+            head += 1
+        # Keep from the latest user message on: it's the turn being answered
+        last_user = next((i for i in range(len(messages) - 1, head - 1, -1) if messages[i]["role"] == "user"), len(messages) - 1)
+        middle, tail = list(messages[head:last_user]), messages[last_user:]
+        dropped = 0
+        while middle and used + floor > context:
+            # System messages in the middle (e.g. supplemental info) are kept
+            idx = next((i for i, m in enumerate(middle) if m["role"] != "system"), None)
+            if idx is None:
+                break
+            used -= count_tokens(middle.pop(idx).get("content", ""), model) + _MESSAGE_OVERHEAD
+            dropped += 1
+        if dropped:
+            note = {"role": "system", "content": f"[{dropped} earlier conversation turns omitted to fit the context window]"}
+            messages = messages[:head] + [note] + middle + tail
+            used = message_tokens(messages, model)
+
+    if used + floor > context:
+        raise ContextBudgetError(
+            f"Request needs ~{used} prompt tokens but {model} allows {context} including the reply; "
+            "shorten the prompt, supplemental information or content."
+        )
+    return messages, min(wanted, context - used)
+
+
+def warm(texts: List[str], model: str = "gpt-4") -> int:
+    """Pre-compute token counts (fills the memo cache). Returns the total."""
+    return sum(count_tokens(t, model) for t in texts)
+
+
+def warm_stored_prompts() -> int:
+    """Count stored prompts, supplementals and prompts/*.txt ahead of the first request."""
+    from backend.app.utils import prompt_store, supp_store
+    from utils.prompt_loader import load_prompt, registry
+
+    texts = [p.get("content", "") for p in prompt_store.list_prompts()]
+    texts += [i.get("content", "") for i in supp_store.list_items()]
+    texts += [load_prompt(name) for name in registry.names()]
+    return warm(texts)
@@ -0,0 +1,152 @@
+"""Job worker: runs queued generate / critique / plan jobs outside the API process.
+
+Start one or more with `python main.py worker --concurrency 4`. Jobs are
+claimed from data/jobs.db, so the API can restart freely and a crashed
+worker's jobs are picked up again once their heartbeat goes stale.
+"""
+import asyncio
+import os
+import signal
+import socket
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from backend.app.utils import ai_tools, critique_engine, dedup, history, job_queue, prompt_store, retrieval
+from utils import audit
+
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5.0"))
+
+
+def _custom_prompt(prompt_id: str | None) -> str | None:
+    if not prompt_id:
+        return None
+    p = prompt_store.get_prompt(prompt_id)
+    if not p:
+        raise ValueError("Prompt not found")
+    return p["content"]
+
+
+def _stream_for(job: Dict[str, Any]) -> Tuple[AsyncIterator[str], str]:
+    """The job's stream and result key, with the routes' duplicate checks and history recording."""
+    p = job['payload']
+    if job['kind'] == 'generate' and p.get('block_duplicates') and p.get('outline'):
+        duplicates = dedup.outline_duplicates(p['topic'], p['outline'])
+        if duplicates:
+            raise ValueError("Outline nearly duplicates planned topics: " + ", ".join(d['title'] for d in duplicates))
+    stream, key = _source(job)
+    if job['kind'] == 'plan':
+        stream = dedup.indexed_outline(p['topic'], stream)
+    elif p.get('project_id') and job['kind'] == 'generate':
+        stream = history.logged(stream, p['project_id'], "generation")
+    elif p.get('project_id') and job['kind'] == 'critique':
+        stream = history.logged(stream, p['project_id'], "critique", content=p['markdown'])
+    return stream, key
+
+
+def _source(job: Dict[str, Any]) -> Tuple[AsyncIterator[str], str]:
+    """Pick the streaming ai_tools call for a job and the key its result is returned under."""
+    p = job['payload']
+    custom_prompt = _custom_prompt(p.get('prompt_id'))
+    query = retrieval.document_query(p['markdown']) if job['kind'] == 'critique' else f"{p['topic']}\n{p.get('outline') or ''}"
+    supplemental = retrieval.supplemental_context(query, p.get('supplemental'), p.get('top_k'), p.get('supplemental_ids'))
+    if job['kind'] == 'generate' and p.get('outline'):
+        return ai_tools.stream_article_from_outline(p['topic'], p['outline'], p.get('instructions'), custom_prompt, supplemental, p.get('cache'), p.get('target_words')), 'article'
+    if job['kind'] == 'generate':
+        return ai_tools.stream_article(p['topic'], p.get('instructions'), custom_prompt, supplemental, p.get('cache')), 'article'
+    findings = None
+    if job['kind'] == 'critique' and p.get('audit'):
+        report = audit.audit_markdown(p['markdown'], p.get('page_type'), p.get('keyword'))
+        findings = audit.render_findings(report)
+        if not audit.needs_critique(report):
+            return _once(findings), 'critique'
+    if job['kind'] == 'critique' and p.get('incremental'):
+        return _incremental_critique(p['markdown'], custom_prompt, supplemental, p.get('cache'), findings), 'critique'
+    if job['kind'] == 'critique' and (p.get('chunked') or (p.get('chunked') is None and critique_engine.should_chunk(p['markdown']))):
+        return critique_engine.stream_document(p['markdown'], custom_prompt, supplemental, p.get('cache'), audit_findings=findings), 'critique'
+    if job['kind'] == 'critique':
+        return ai_tools.stream_critique(p['markdown'], custom_prompt, supplemental, p.get('cache'), findings), 'critique'
+    if job['kind'] == 'plan':
+        return ai_tools.stream_plan(p['topic'], custom_prompt, supplemental, p.get('cache')), 'outline'
+    raise ValueError(f"Unknown job kind: {job['kind']}")
+
+
+async def _once(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _incremental_critique(markdown: str, custom_prompt: str | None, supplemental: str | None, cache: str | None, audit_findings: str | None) -> AsyncIterator[str]:
+    report = await critique_engine.critique_incremental(markdown, custom_prompt, supplemental, cache, audit_findings=audit_findings)
+    yield critique_engine.render_report(report)
+
+
+async def run_job(job: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, int]]:
+    # Streaming lets us report how much output has arrived while the job runs
+    progress = {"chars": 0}
+    parts: list[str] = []
+
+    async def beat() -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await asyncio.to_thread(job_queue.heartbeat, job['id'], job['worker'], dict(progress))
+
+    stream, key = _stream_for(job)
+    beater = asyncio.create_task(beat())
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            progress["chars"] += len(delta)
+    finally:
+        beater.cancel()
+    return {key: "".join(parts).strip()}, progress
+
+
+async def _slot(worker: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        job = await asyncio.to_thread(job_queue.claim_next, worker)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            result, progress = await run_job(job)
+        except Exception as e:
+            await asyncio.to_thread(job_queue.fail, job['id'], worker, str(e))
+        else:
+            await asyncio.to_thread(job_queue.finish, job['id'], worker, result, progress)
+
+
+async def _reaper(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        await asyncio.to_thread(job_queue.requeue_stale)
+        try:
+            await asyncio.wait_for(stop.wait(), job_queue.STALE_AFTER / 2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def serve(concurrency: int) -> None:
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            # First signal drains: running jobs finish, no new ones are claimed
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    ai_tools.init_client()
+    print(f"Worker {worker} running {concurrency} slots")
+    try:
+        await asyncio.gather(_reaper(stop), *(_slot(worker, stop) for _ in range(concurrency)))
+    finally:
+        job_queue.release(worker)
+        await ai_tools.close_client()
+
+
+def run(concurrency: int = 4) -> None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    asyncio.run(serve(concurrency))
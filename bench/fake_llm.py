@@ -0,0 +1,146 @@
+"""OpenAI-compatible stub for benchmarks: `/v1/chat/completions` without a real model.
+
+Configured through environment variables so it can be launched by uvicorn:
+
+  FAKE_LLM_MODE         synthetic (default) | record | replay
+  FAKE_LLM_LATENCY      seconds before the first token (default 0.5)
+  FAKE_LLM_TOKEN_DELAY  seconds between streamed tokens (default 0.005)
+  FAKE_LLM_TOKENS       tokens per synthetic completion (default 400)
+  FAKE_LLM_TAPE         JSONL file of recorded responses (record / replay)
+  FAKE_LLM_UPSTREAM     real API base URL for record mode (default https://api.openai.com/v1)
+  FAKE_LLM_UPSTREAM_KEY API key used for the upstream in record mode
+
+In record mode every request is forwarded upstream (non-streaming) and the
+answer is appended to the tape; replay serves taped answers, with the
+configured latency and token pacing, and falls back to synthetic text for
+requests that were never recorded.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MODE = os.getenv("FAKE_LLM_MODE", "synthetic")
+LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.005"))
+TOKENS = int(os.getenv("FAKE_LLM_TOKENS", "400"))
+TAPE = os.getenv("FAKE_LLM_TAPE", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tape.jsonl'))
+UPSTREAM = os.getenv("FAKE_LLM_UPSTREAM", "https://api.openai.com/v1")
+UPSTREAM_KEY = os.getenv("FAKE_LLM_UPSTREAM_KEY", "")
+
+_tape: Dict[str, str] = {}
+_tape_lock = asyncio.Lock()
+
+_WORDS = ("rug", "wool", "knot", "Persian", "antique", "weave", "dye", "silk", "pattern", "border")
+
+
+def _key(body: Dict) -> str:
+    relevant = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+
+def _load_tape() -> None:
+    if os.path.exists(TAPE):
+        with open(TAPE, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                _tape[entry["key"]] = entry["content"]
+
+
+def _synthetic(n: int) -> str:
+    return " ".join(_WORDS[i % len(_WORDS)] for i in range(n))
+
+
+def _tokens(text: str):
+    # Roughly token-sized pieces, whitespace kept so the joined stream equals the text
+    return re.findall(r'\s*\S+', text) or [text]
+
+
+def _usage(body: Dict, content: str) -> Dict:
+    prompt = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+    completion = len(_tokens(content))
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+async def _record(body: Dict, key: str) -> str:
+    import httpx
+
+    upstream_body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+    async with httpx.AsyncClient(timeout=600) as client:
+        resp = await client.post(
+            f"{UPSTREAM}/chat/completions",
+            json=upstream_body,
+            headers={"Authorization": f"Bearer {UPSTREAM_KEY}"},
+        )
+        resp.raise_for_status()
+    content = resp.json()["choices"][0]["message"]["content"]
+    async with _tape_lock:
+        _tape[key] = content
+        with open(TAPE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"key": key, "model": body.get("model"), "content": content}) + "\n")
+    return content
+
+
+async def _stream(body: Dict, content: str) -> AsyncIterator[str]:
+    cid, created, model = f"chatcmpl-{uuid4().hex}", int(time.time()), body.get("model")
+
+    def chunk(delta: Dict, finish=None, usage=None) -> str:
+        payload = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if usage is None else []}
+        if usage is not None:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for token in _tokens(content):
+        if TOKEN_DELAY:
+            await asyncio.sleep(TOKEN_DELAY)
+        yield chunk({"content": token})
+    yield chunk({}, finish="stop")
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield chunk({}, usage=_usage(body, content))
+    yield "data: [DONE]\n\n"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _load_tape()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    key = _key(body)
+    if MODE == "record":
+        content = await _record(body, key)
+    else:
+        await asyncio.sleep(LATENCY)
+        content = _tape.get(key) if MODE == "replay" else None
+        if content is None:
+            n = min(TOKENS, body.get("max_tokens") or TOKENS)
+            content = _synthetic(n)
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, content), media_type="text/event-stream")
+    if MODE != "record" and TOKEN_DELAY:
+        # Non-streamed answers still take as long as generating every token would
+        await asyncio.sleep(TOKEN_DELAY * len(_tokens(content)))
+    return JSONResponse({
+        "id": f"chatcmpl-{uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": _usage(body, content),
+    })
@@ -0,0 +1,274 @@
+"""Offline load test: the FastAPI app against the fake LLM, concurrent load on every router.
+
+    python -m bench.run run --requests 200 --concurrency 20 --out bench/results/$(git rev-parse --short HEAD).json
+    python -m bench.run compare bench/results/old.json bench/results/new.json
+
+Nothing touches the real data/ directory or OpenAI: the app runs with a
+temporary RUGS_DATA_DIR seeded from data/, and OPENAI_BASE_URL points at
+bench/fake_llm.py (use --llm-mode replay with a tape recorded in record mode
+to benchmark against real responses).
+"""
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import typer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+app = typer.Typer()
+
+
+# ----------------------------- SCENARIOS -------------------------------
+
+def scenarios(ids: Dict[str, str], use_cache: bool) -> List[Dict]:
+    """One entry per endpoint. LLM endpoints bypass the response cache unless --use-cache."""
+    cache = None if use_cache else "bypass"
+    topic = {"topic": "Antique Persian Rugs", "cache": cache}
+    markdown = "# Persian Rugs\n\n## History\n\nPersian rugs are handwoven.\n\n## Care\n\nVacuum gently.\n"
+    return [
+        {"name": "POST /generate", "method": "POST", "path": "/generate", "json": topic},
+        {"name": "POST /generate?stream", "method": "POST", "path": "/generate?stream=true", "json": topic, "stream": True},
+        {"name": "POST /generate top_k", "method": "POST", "path": "/generate", "json": {**topic, "top_k": 4}},
+        {"name": "POST /critique", "method": "POST", "path": "/critique", "json": {"markdown": markdown, "cache": cache}},
+        # Section findings are reused after the first request, so this measures the repeat-critique path
+        {"name": "POST /critique incremental", "method": "POST", "path": "/critique", "json": {"markdown": markdown, "incremental": True}},
+        {"name": "POST /audit", "method": "POST", "path": "/audit", "json": {"markdown": markdown}},
+        {"name": "POST /keywords", "method": "POST", "path": "/keywords", "json": {"text": topic["topic"]}},
+        {"name": "POST /links", "method": "POST", "path": "/links", "json": {"markdown": markdown}},
+        {"name": "POST /duplicates/check", "method": "POST", "path": "/duplicates/check", "json": {"text": markdown}},
+        {"name": "GET /duplicates", "method": "GET", "path": "/duplicates"},
+        {"name": "POST /planner/initial", "method": "POST", "path": "/planner/initial", "json": topic},
+        {"name": "POST /planner/continue", "method": "POST", "path": "/planner/continue",
+         "json": {**topic, "messages": [{"role": "user", "content": "Add a section on dyes"}], "user_message": "Add a section on dyes"}},
+        {"name": "POST /planner/sessions/{id}/messages", "method": "POST", "path": f"/planner/sessions/{ids['session']}/messages",
+         "json": {"user_message": "Shorten the intro", "cache": cache}},
+        {"name": "POST /assistant/refine", "method": "POST", "path": "/assistant/refine", "json": {"mode": "prompt", "text": "Write about rugs"}},
+        {"name": "GET /projects/", "method": "GET", "path": "/projects/"},
+        {"name": "GET /projects/{id}", "method": "GET", "path": f"/projects/{ids['project']}"},
+        {"name": "POST /projects/{id}/history", "method": "POST", "path": f"/projects/{ids['project']}/history",
+         "json": {"kind": "edit", "content": markdown}},
+        {"name": "GET /projects/{id}/history/{n}", "method": "GET", "path": f"/projects/{ids['project']}/history/1"},
+        {"name": "GET /projects/{id}/history/{n}/diff/{m}", "method": "GET", "path": f"/projects/{ids['project']}/history/1/diff/2"},
+        {"name": "PUT /projects/{id}", "method": "PUT", "path": f"/projects/{ids['project']}", "json": {"planning": "bench"}},
+        {"name": "GET /prompts/", "method": "GET", "path": "/prompts/"},
+        {"name": "GET /prompts/?fields=title&limit=50", "method": "GET", "path": "/prompts/?fields=title&limit=50"},
+        {"name": "GET /prompts/{id}", "method": "GET", "path": f"/prompts/{ids['prompt']}"},
+        {"name": "GET /supplementals/", "method": "GET", "path": "/supplementals/"},
+        {"name": "GET /search", "method": "GET", "path": "/search?q=pers"},
+        {"name": "GET /settings/", "method": "GET", "path": "/settings/"},
+        {"name": "GET /cache/stats", "method": "GET", "path": "/cache/stats"},
+        {"name": "POST /jobs", "method": "POST", "path": "/jobs/", "json": {"kind": "plan", "payload": topic}},
+        {"name": "GET /jobs/{id}", "method": "GET", "path": f"/jobs/{ids['job']}"},
+        {"name": "GET /models/health", "method": "GET", "path": "/models/health"},
+        {"name": "GET /metrics", "method": "GET", "path": "/metrics"},
+    ]
+
+
+async def setup(client: httpx.AsyncClient) -> Dict[str, str]:
+    """Create the records that parameterised scenarios point at."""
+    project = (await client.post("/projects/", json={"title": "bench"})).json()
+    for content in ("# Bench\n\nFirst draft.\n", "# Bench\n\nSecond draft.\n"):
+        await client.post(f"/projects/{project['id']}/history", json={"kind": "edit", "content": content})
+    prompt = (await client.post("/prompts/", json={"title": "bench", "content": "Write about {topic}."})).json()
+    session = (await client.post("/planner/sessions", json={"topic": "bench"})).json()
+    job = (await client.post("/jobs/", json={"kind": "plan", "payload": {"topic": "bench"}})).json()
+    return {"project": project["id"], "prompt": prompt["id"], "session": session["session_id"], "job": job["id"]}
+
+
+# ----------------------------- LOAD ------------------------------------
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(client: httpx.AsyncClient, scenario: Dict, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    ttfb: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if scenario.get("stream"):
+                    async with client.stream(scenario["method"], scenario["path"], json=scenario.get("json")) as resp:
+                        first = None
+                        async for line in resp.aiter_lines():
+                            if first is None and line.startswith("data:"):
+                                first = time.perf_counter() - start
+                        if resp.status_code >= 400:
+                            errors += 1
+                            return
+                        if first is not None:
+                            ttfb.append(first)
+                else:
+                    resp = await client.request(scenario["method"], scenario["path"], json=scenario.get("json"))
+                    if resp.status_code >= 400:
+                        errors += 1
+                        return
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - wall
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+    }
+    if scenario.get("stream"):
+        result["ttfb_p50_ms"] = _ms(percentile(ttfb, 50))
+    return result
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+# ----------------------------- SERVERS ---------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", *args, "--log-level", "warning"], cwd=ROOT, env=env)
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _print_table(results: Dict[str, Dict]) -> None:
+    header = f"{'endpoint':<42}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<42}{r['throughput_rps']:>9}{_fmt(r['p50_ms']):>9}{_fmt(r['p95_ms']):>9}{_fmt(r['p99_ms']):>9}{r['errors']:>6}")
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+# ----------------------------- COMMANDS --------------------------------
+
+@app.command()
+def run(
+    requests: int = typer.Option(100, help="Requests per endpoint"),
+    concurrency: int = typer.Option(20, help="Requests in flight per endpoint"),
+    workers: int = typer.Option(1, help="uvicorn workers for the app"),
+    llm_latency: float = typer.Option(0.5, help="Fake LLM time to first token (s)"),
+    llm_token_delay: float = typer.Option(0.005, help="Fake LLM delay per token (s)"),
+    llm_tokens: int = typer.Option(400, help="Tokens per synthetic completion"),
+    llm_mode: str = typer.Option("synthetic", help="synthetic | record | replay"),
+    tape: str = typer.Option(None, help="JSONL tape for record / replay"),
+    use_cache: bool = typer.Option(False, help="Let LLM endpoints hit the response cache"),
+    only: str = typer.Option(None, help="Comma-separated substrings; run matching endpoints only"),
+    out: str = typer.Option(None, help="Write results as JSON here for later comparison"),
+):
+    """Benchmark every router against the local fake LLM."""
+    data_dir = tempfile.mkdtemp(prefix="rugs-bench-")
+    for name in os.listdir(os.path.join(ROOT, 'data')):
+        if name.endswith(('.json', '.md')):
+            shutil.copy(os.path.join(ROOT, 'data', name), data_dir)
+
+    llm_port, app_port = _free_port(), _free_port()
+    base_env = {**os.environ, "PYTHONPATH": ROOT}
+    llm_env = {**base_env, "FAKE_LLM_MODE": llm_mode, "FAKE_LLM_LATENCY": str(llm_latency),
+               "FAKE_LLM_TOKEN_DELAY": str(llm_token_delay), "FAKE_LLM_TOKENS": str(llm_tokens)}
+    if tape:
+        llm_env["FAKE_LLM_TAPE"] = os.path.abspath(tape)
+    app_env = {**base_env, "RUGS_DATA_DIR": data_dir, "OPENAI_API_KEY": "bench",
+               "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1"}
+
+    procs = [
+        _start(["bench.fake_llm:app", "--port", str(llm_port)], llm_env),
+        _start(["backend.app.main:app", "--port", str(app_port), "--workers", str(workers)], app_env),
+    ]
+
+    async def main() -> Dict[str, Dict]:
+        await _wait_ready(f"http://127.0.0.1:{llm_port}/docs")
+        await _wait_ready(f"http://127.0.0.1:{app_port}/docs")
+        limits = httpx.Limits(max_connections=concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=600) as client:
+            ids = await setup(client)
+            results = {}
+            for scenario in scenarios(ids, use_cache):
+                if only and not any(o.strip() in scenario["name"] for o in only.split(",")):
+                    continue
+                results[scenario["name"]] = await drive(client, scenario, requests, concurrency)
+            return results
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    _print_table(results)
+    if out:
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump({
+                "config": {"requests": requests, "concurrency": concurrency, "workers": workers,
+                           "llm_latency": llm_latency, "llm_token_delay": llm_token_delay,
+                           "llm_tokens": llm_tokens, "llm_mode": llm_mode, "use_cache": use_cache},
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {out}")
+
+
+@app.command()
+def compare(baseline: str, candidate: str):
+    """Show p50/p95/p99 and throughput changes between two result files."""
+    with open(baseline, 'r', encoding='utf-8') as f:
+        old = json.load(f)["results"]
+    with open(candidate, 'r', encoding='utf-8') as f:
+        new = json.load(f)["results"]
+    print(f"{'endpoint':<42}{'rps':>16}{'p50':>16}{'p95':>16}{'p99':>16}")
+    for name in new:
+        if name not in old:
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            a, b = old[name][key], new[name][key]
+            change = f"{(b - a) / a * 100:+.0f}%" if a and b is not None else "n/a"
+            cells.append(f"{_fmt(b)} ({change})")
+        print(f"{name:<42}" + "".join(f"{c:>16}" for c in cells))
+
+
+if __name__ == "__main__":
+    app()
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import typer
 from scripts.generate import generate_article
 from scripts.critique_content import critique_content
@@ -8,9 +10,144 @@ app = typer.Typer()
 def generate(topic: str = typer.Option(..., help="Topic for the article")):
     generate_article(topic)
 
+@app.command("generate-batch")
+def generate_batch(
+    topics_file: str = typer.Option(..., help="Text file with one topic per line"),
+    manifest: str = typer.Option(None, help="JSONL manifest to write/resume (default: <topics_file>.manifest.jsonl)"),
+    concurrency: int = typer.Option(8, help="Maximum generations in flight"),
+):
+    """Generate an article per topic; re-run with the same manifest to resume."""
+    from backend.app.utils import ai_tools, batch
+    from scripts.generate import save_article
+
+    with open(topics_file, 'r', encoding='utf-8') as f:
+        topics = [line.strip() for line in f if line.strip()]
+    manifest = manifest or f"{os.path.splitext(topics_file)[0]}.manifest.jsonl"
+
+    def save(entry):
+        # Keep the manifest small: articles go to content/, the manifest records the path
+        entry["path"] = save_article(entry["topic"], entry.pop("article"))
+        return entry
+
+    async def run():
+        try:
+            return await batch.run_batch(topics, manifest, concurrency, on_result=save)
+        finally:
+            await ai_tools.close_client()
+
+    summary = asyncio.run(run())
+    print(f"{summary['done']} done, {summary['failed']} failed, {summary['skipped']} already done -> {manifest}")
+
+@app.command()
+def critique(
+    file_path: str = typer.Option(..., help="Path to the file to critique"),
+    chunked: bool = typer.Option(False, help="Critique by heading chunks in parallel (for long documents)"),
+    incremental: bool = typer.Option(False, help="Only re-critique sections changed since the last critique"),
+):
+    critique_content(file_path, chunked, incremental)
+
+@app.command()
+def audit(
+    directory: str = typer.Argument("content", help="Directory of markdown pages to audit"),
+    page_type: str = typer.Option(None, help="Page type for word-count targets when front matter has none"),
+    keyword: str = typer.Option(None, help="Primary keyword when front matter has none"),
+    workers: int = typer.Option(None, help="Processes to use (default: all cores)"),
+    verbose: bool = typer.Option(False, help="List every finding, not just the counts"),
+):
+    """Run the local SEO audit over every .md file in DIRECTORY. Exits 1 if any page has errors."""
+    from utils.audit import audit_directory
+
+    reports = audit_directory(directory, page_type, keyword, workers)
+    for r in reports:
+        print(f"{r['score']:>3}  {r['errors']}E {r['warnings']}W  {r['path']}")
+        if verbose:
+            for f in r["findings"]:
+                print(f"       [{f['severity']}] {f['check']}: {f['message']}")
+    failed = sum(1 for r in reports if r["errors"])
+    print(f"{len(reports)} pages audited, {failed} with errors")
+    if failed:
+        raise typer.Exit(1)
+
 @app.command()
-def critique(file_path: str = typer.Option(..., help="Path to the file to critique")):
-    critique_content(file_path)
+def keywords(
+    text: str = typer.Argument(..., help="Article title, or a path to a markdown file"),
+    k: int = typer.Option(20, help="How many keywords to return"),
+    rerank: bool = typer.Option(False, help="Reorder the local suggestions with the LLM"),
+    rebuild: bool = typer.Option(False, help="Re-sync the corpus model with content/, prompts and supplementals first"),
+):
+    """Suggest keywords locally with TF-IDF over the content corpus."""
+    from backend.app.utils import ai_tools, keywords as keyword_engine
+
+    if rebuild:
+        print(f"Corpus model: {keyword_engine.rebuild()} documents")
+    if os.path.isfile(text):
+        with open(text, 'r', encoding='utf-8') as f:
+            text = f.read()
+    suggestions = [r["keyword"] for r in keyword_engine.extract(text, k)]
+    if rerank:
+        async def run():
+            try:
+                return await ai_tools.rerank_keywords(text[:200], suggestions)
+            finally:
+                await ai_tools.close_client()
+        suggestions = asyncio.run(run())
+    for keyword in suggestions:
+        print(keyword)
+
+@app.command()
+def dedup(
+    path: str = typer.Argument(None, help="Markdown file to check; omit to report every near-duplicate pair in content/"),
+    kind: str = typer.Option("article", help="article or outline"),
+    add: bool = typer.Option(False, help="Also index the file so later checks see it"),
+):
+    """Find near-duplicate articles or outlines with MinHash/LSH. Exits 1 if any are found."""
+    from backend.app.utils import dedup as dedup_index
+
+    if kind == "article":
+        dedup_index.sync_articles()
+    if path is None:
+        found = dedup_index.index(kind).pairs()
+        for p in found:
+            print(f"{p['similarity']:.2f}  {p['a']['title']}  <->  {p['b']['title']}")
+        print(f"{len(found)} near-duplicate pairs")
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        doc_id = dedup_index.article_id(path) if kind == "article" else dedup_index.topic_id(os.path.splitext(os.path.basename(path))[0])
+        idx = dedup_index.index(kind)
+        found = idx.query(text, exclude=doc_id)
+        for m in found:
+            print(f"{m['similarity']:.2f}  {m['title']}")
+        if add:
+            idx.add(doc_id, text, os.path.basename(path))
+        print(f"{len(found)} near-duplicates")
+    if found:
+        raise typer.Exit(1)
+
+@app.command("compact-history")
+def compact_history(project_id: str = typer.Argument(None, help="Project to compact (default: every project)")):
+    """Rewrite project history logs with fresh snapshots; histories of deleted projects are removed."""
+    from backend.app.utils import history
+
+    results = {project_id: history.compact(project_id)} if project_id else history.compact_all()
+    for pid, r in results.items():
+        if r.get("removed"):
+            print(f"{pid}: removed (project deleted)")
+        else:
+            print(f"{pid}: {r['revisions']} revisions, {r['bytes_before']} -> {r['bytes_after']} bytes")
+
+@app.command()
+def worker(concurrency: int = typer.Option(4, help="Jobs to run at once in this process")):
+    """Run queued /jobs in this process until interrupted."""
+    from backend.app.worker import run
+    run(concurrency)
+
+@app.command("migrate-stores")
+def migrate_stores():
+    """Import data/*.json into data/rugs.db for RUGS_STORE_BACKEND=sqlite."""
+    from backend.app.utils.storage import migrate_json_to_sqlite
+    for table, count in migrate_json_to_sqlite().items():
+        print(f"{table}: {count} records")
 
 if __name__ == "__main__":
     app()
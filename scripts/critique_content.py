@@ -1,10 +1,11 @@
+import asyncio
 import typer
 import openai
 from rich import print
 from utils.prompt_loader import load_prompt
 
 
-def critique_content(file_path: str):
+def critique_content(file_path: str, chunked: bool = False, incremental: bool = False):
     # Load system prompt
     system_prompt = load_prompt('critique')
 
@@ -12,6 +13,10 @@ def critique_content(file_path: str):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
 
+    if chunked or incremental:
+        print(f"[bold green]Critique Result:[/bold green]\n{_critique_chunked(content, incremental)}")
+        return
+
     # Compose the prompt for critique
     user_prompt = f"Please critique the following markdown content for SEO, clarity, and quality.\n\n{content}"
 
@@ -28,3 +33,19 @@ def critique_content(file_path: str):
     # Print the critique result
     print(f"[bold green]Critique Result:[/bold green]\n{critique}")
     # Will add quality checks + suggestions here
+
+
+def _critique_chunked(content: str, incremental: bool = False) -> str:
+    # Long documents: critique heading-aligned chunks concurrently via the backend engine.
+    # Incremental runs only send sections changed since the last critique.
+    from backend.app.utils import ai_tools, critique_engine
+
+    async def run():
+        try:
+            if incremental:
+                return await critique_engine.critique_incremental(content)
+            return await critique_engine.critique_document(content)
+        finally:
+            await ai_tools.close_client()
+
+    return critique_engine.render_report(asyncio.run(run()))
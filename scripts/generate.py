@@ -22,6 +22,11 @@ def generate_article(topic: str):
     )
     article = response.choices[0].message.content.strip()
 
+    output_path = save_article(topic, article)
+    print(f"Article saved to {output_path}")
+
+
+def save_article(topic: str, article: str) -> str:
     # Slugify topic for filename
     topic_slug = slugify(topic)
     output_dir = 'content'
@@ -31,5 +36,14 @@ def generate_article(topic: str):
     # Save the article
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(article)
-    print(f"Article saved to {output_path}")
+
+    # Count it in the keyword engine's corpus statistics
+    from backend.app.utils import keywords
+    keywords.add_article(output_path, article)
+
+    # Warn about existing articles this one would compete with in search
+    from backend.app.utils import dedup
+    for match in dedup.add_article(output_path, article):
+        print(f"Warning: near-duplicate of {match['title']} (similarity {match['similarity']})")
+    return output_path
 
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+critique_engine = pytest.importorskip("backend.app.utils.critique_engine")
+from backend.app.utils import ai_tools, llm_cache  # noqa: E402
+
+DOC = (
+    "Intro paragraph.\n\n"
+    "## Materials\n\nWool and silk.\n\n### Silk\n\nSilk is delicate.\n\n"
+    "## Care\n\nVacuum weekly.\n\n"
+    "## Buying\n\nCheck the knots.\n"
+)
+
+
+def test_critique_sections_keep_h3_inside_h2():
+    sections = critique_engine.critique_sections(DOC)
+    assert [s["heading"] for s in sections] == [None, "Materials", "Care", "Buying"]
+    assert "Silk is delicate." in sections[1]["text"]
+
+
+def test_section_hash_ignores_trailing_whitespace_and_blank_runs():
+    a = critique_engine.section_hash("## Care\n\nVacuum weekly.\n")
+    assert critique_engine.section_hash("## Care  \n\n\n\nVacuum weekly.   \n\n") == a
+    assert critique_engine.section_hash("## Care\n\nVacuum daily.\n") != a
+
+
+@pytest.fixture
+def stubbed(tmp_path, monkeypatch):
+    calls = []
+
+    async def critique_chunk(text, *args, **kwargs):
+        calls.append(text)
+        return f"findings for {text.splitlines()[0]}"
+
+    async def summarize_critique(*args, **kwargs):
+        return "summary"
+
+    monkeypatch.setattr(ai_tools, "critique_chunk", critique_chunk)
+    monkeypatch.setattr(ai_tools, "summarize_critique", summarize_critique)
+    monkeypatch.setattr(llm_cache, "cache", llm_cache.LLMCache(str(tmp_path), 3600, 16, 1 << 20))
+    return calls
+
+
+def test_incremental_reuses_unchanged_sections(stubbed):
+    first = asyncio.run(critique_engine.critique_incremental(DOC))
+    assert (first["fresh_sections"], first["reused_sections"]) == (4, 0)
+
+    stubbed.clear()
+    second = asyncio.run(critique_engine.critique_incremental(DOC.replace("Vacuum weekly.", "Vacuum twice a week.")))
+    assert (second["fresh_sections"], second["reused_sections"]) == (1, 3)
+    assert len(stubbed) == 1 and stubbed[0].startswith("## Care")
+    assert [s["fresh"] for s in second["sections"]] == [False, False, True, False]
+    assert "### Care (new)" in critique_engine.render_report(second)
+
+
+def test_incremental_bypass_critiques_everything(stubbed):
+    asyncio.run(critique_engine.critique_incremental(DOC))
+    report = asyncio.run(critique_engine.critique_incremental(DOC, cache="bypass"))
+    assert report["fresh_sections"] == 4
+
+
+def test_a_failed_chunk_cancels_the_others(monkeypatch):
+    cancelled = []
+
+    async def critique_chunk(text, index, *args, **kwargs):
+        if index == 1:
+            raise RuntimeError("boom")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+
+    monkeypatch.setattr(ai_tools, "critique_chunk", critique_chunk)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await critique_engine.critique_document(DOC, max_chunk_tokens=8)
+        await asyncio.sleep(0)
+        # Checked before asyncio.run's own shutdown would cancel leftovers
+        assert cancelled
+
+    asyncio.run(run())
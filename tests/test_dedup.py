@@ -0,0 +1,59 @@
+import pytest
+
+from backend.app.utils import dedup
+
+ARTICLE = (
+    "Persian rugs are hand knotted from wool or silk and take months to weave. "
+    "Each region has its own motifs, from the medallions of Tabriz to the florals of Kashan. "
+    "Knot density, dye quality and condition decide what a rug is worth today."
+)
+
+
+@pytest.fixture(autouse=True)
+def tmp_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_DIR", str(tmp_path))
+    monkeypatch.setattr(dedup, "_indexes", {})
+
+
+def test_near_duplicate_is_found_and_unrelated_text_is_not():
+    assert dedup.check_and_add("article", "a", ARTICLE) == []
+    edited = ARTICLE.replace("take months", "can take many months")
+    (match,) = dedup.check_and_add("article", "b", edited)
+    assert match["id"] == "a" and match["similarity"] >= dedup.DEDUP_THRESHOLD
+    assert dedup.index("article").query("Jute rugs are woven from plant fibre and suit busy hallways.") == []
+
+
+def test_threshold_is_applied():
+    idx = dedup.index("article")
+    idx.add("a", ARTICLE)
+    edited = ARTICLE.replace("take months", "can take many months")
+    (match,) = idx.query(edited, threshold=0.0)
+    assert 0.5 < match["similarity"] < 1.0
+    assert idx.query(edited, threshold=match["similarity"]) == [match]
+    assert idx.query(edited, threshold=match["similarity"] + 0.01) == []
+    assert idx.query(ARTICLE, threshold=1.0)[0]["similarity"] == 1.0
+
+
+def test_pairs_report_each_pair_once():
+    idx = dedup.index("article")
+    idx.add("a", ARTICLE)
+    idx.add("b", ARTICLE + " Buy from a dealer you trust.")
+    idx.add("c", "Jute rugs are woven from plant fibre and suit busy hallways.")
+    (pair,) = idx.pairs()
+    assert {pair["a"]["id"], pair["b"]["id"]} == {"a", "b"}
+
+
+def test_replanning_a_topic_replaces_its_outline():
+    outline = "## History\n## Materials\n## Care and cleaning\n## Buying tips"
+    dedup.add_outline("Persian Rugs", outline)
+    assert dedup.add_outline("persian rugs!", outline) == []
+    assert list(dedup.index("outline").read()) == [dedup.topic_id("Persian Rugs")]
+
+
+def test_text_without_words_is_never_indexed_or_matched():
+    assert dedup.check_and_add("outline", "t1", "") == []
+    assert dedup.check_and_add("outline", "t2", "  --- ") == []
+    assert dedup.index("outline").read() == {}
+    dedup.index("outline").add("t3", "rug care guide for wool rugs")
+    dedup.index("outline").add("t3", "")
+    assert dedup.index("outline").read() == {}
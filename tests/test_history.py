@@ -0,0 +1,68 @@
+import pytest
+
+from backend.app.utils import history
+
+
+@pytest.fixture(autouse=True)
+def tmp_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(history, "SNAPSHOT_EVERY", 4)
+    monkeypatch.setattr(history, "_latest", {})
+    return tmp_path
+
+
+def _versions(n):
+    lines = [f"Paragraph {i} about rugs." for i in range(40)]
+    versions = []
+    for r in range(n):
+        lines[r % len(lines)] = f"Paragraph {r % len(lines)} edited in revision {r}."
+        if r % 3 == 0:
+            lines.append(f"New paragraph {r}.")
+        versions.append("\n".join(lines) + "\n")
+    return versions
+
+
+def test_round_trip_across_snapshot_boundaries():
+    versions = _versions(11)
+    for content in versions:
+        history.append("p1", "edit", content)
+    revs = history.revisions("p1")
+    assert [r["revision"] for r in revs] == list(range(1, 12))
+    assert [r["revision"] for r in revs if r["snapshot"]] == [1, 5, 9]
+    for r, content in enumerate(versions, 1):
+        assert history.get_revision("p1", r)["content"] == content
+    assert history.get_revision("p1")["revision"] == 11
+
+
+def test_compaction_preserves_every_revision():
+    versions = _versions(9)
+    for content in versions:
+        history.append("p1", "generation", content, note="critique text")
+    result = history.compact("p1")
+    assert result["revisions"] == 9
+    for r, content in enumerate(versions, 1):
+        rev = history.get_revision("p1", r)
+        assert (rev["content"], rev["kind"], rev["note"]) == (content, "generation", "critique text")
+    history.append("p1", "edit", "after compaction\n")
+    assert history.get_revision("p1", 9)["content"] == versions[-1]
+    assert history.get_revision("p1", 10)["content"] == "after compaction\n"
+
+
+def test_torn_index_entry_is_discarded(tmp_history):
+    history.append("p1", "edit", "one\n")
+    with open(tmp_history / "p1.idx", "ab") as f:
+        f.write(b"\x00" * 5)  # crash partway through writing the second entry
+    assert len(history.revisions("p1")) == 1
+    history.append("p1", "edit", "two\n")
+    assert [history.get_revision("p1", r)["content"] for r in (1, 2)] == ["one\n", "two\n"]
+
+
+def test_diff_and_errors():
+    history.append("p1", "edit", "a\nb\n")
+    history.append("p1", "edit", "a\nc\n")
+    d = history.diff("p1", 1, 2)
+    assert (d["added"], d["removed"]) == (1, 1)
+    with pytest.raises(history.HistoryError):
+        history.get_revision("p1", 3)
+    with pytest.raises(history.HistoryError):
+        history.append("../p1", "edit", "x")
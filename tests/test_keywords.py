@@ -0,0 +1,52 @@
+import pytest
+
+from backend.app.utils import keywords
+
+CORPUS = {
+    f"content:{i}.md": f"Persian rugs guide {i}. Wool rugs for the living room. Area rug sizes explained."
+    for i in range(10)
+}
+CORPUS["content:silk.md"] = "Silk rugs shimmer. Cleaning silk rugs needs care."
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    monkeypatch.setattr(keywords, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(keywords, "KEYWORDS_DB", str(tmp_path / "keywords.db"))
+    monkeypatch.setattr(keywords, "_schema_ready", False)
+    monkeypatch.setattr(keywords, "_corpus", lambda: dict(CORPUS))
+    return keywords
+
+
+def _df(term):
+    with keywords._connect() as conn:
+        row = conn.execute("SELECT n FROM df WHERE term = ?", (term,)).fetchone()
+    return row[0] if row else 0
+
+
+def test_candidates_do_not_span_stopwords_or_punctuation():
+    counts = keywords.candidates("Cleaning the silk rugs. Silk rugs, wool")
+    assert counts["silk rugs"] == 2
+    assert "cleaning silk" not in counts
+    assert "rugs wool" not in counts
+
+
+def test_rare_terms_outrank_common_ones(model):
+    ranked = [r["keyword"] for r in model.extract("silk rugs and persian rugs", 10, related=False)]
+    assert ranked.index("silk rugs") < ranked.index("persian rugs")
+
+
+def test_update_document_only_changes_its_own_counts(model):
+    model.rebuild()
+    assert _df("silk rugs") == 1
+    model.update_document("content:silk.md", "Jute rugs are rough.")
+    assert _df("silk rugs") == 0 and _df("jute rugs") == 1
+    assert _df("persian rugs") == 10
+    model.update_document("content:silk.md", None)
+    assert _df("jute rugs") == 0
+
+
+def test_short_input_gets_related_corpus_phrases(model):
+    sources = {r["keyword"]: r["source"] for r in model.extract("persian rugs", 10)}
+    assert sources["persian rugs"] == "text"
+    assert sources["area rug sizes"] == "corpus"
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("scipy")
+link_index = pytest.importorskip("backend.app.utils.link_index")
+
+PAGES = {
+    "rugs.md": ("pillar", "Rugs", "Everything about wool rugs, silk rugs and rug care."),
+    "wool-rugs.md": ("collection", "Wool rugs", "Shop wool rugs: durable wool rugs for every room."),
+    "wool-care.md": ("blog", "Caring for wool rugs", "Vacuum wool rugs weekly and blot wool spills."),
+}
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    for name, (page_type, title, body) in PAGES.items():
+        (tmp_path / name).write_text(f"---\ntitle: {title}\ntype: {page_type}\n---\n{body}\n", encoding="utf-8")
+    idx = link_index.LinkIndex(str(tmp_path))
+    monkeypatch.setattr(link_index, "_index", idx)
+    return tmp_path
+
+
+def _links(markdown, **kwargs):
+    return [link["page"] for link in link_index.suggest_links(markdown, **kwargs)["sections"][0]["links"]]
+
+
+def test_links_stay_within_one_tier(index):
+    # Redrafting the pillar: it may link down to collections but not two tiers down to blog posts
+    assert _links("## Wool\nwool rugs care", page_type="pillar", exclude=["rugs.md"]) == ["wool-rugs.md"]
+    # A collection links up, down and sideways
+    assert set(_links("## Wool\nwool rugs care", page_type="collection")) == set(PAGES)
+
+
+def test_direction_and_target_type_override(index):
+    result = link_index.suggest_links("## Wool\nwool rugs", page_type="blog", target_types=["pillar"])
+    (link,) = result["sections"][0]["links"]
+    assert (link["page"], link["direction"]) == ("rugs.md", "up")
+
+
+def test_edited_and_deleted_pages_are_picked_up(index):
+    assert "wool-rugs.md" in _links("## Wool\nwool rugs", page_type="blog")
+    (index / "wool-rugs.md").unlink()
+    (index / "jute-rugs.md").write_text("---\ntype: collection\n---\nJute rugs and wool rugs.\n", encoding="utf-8")
+    link_index._index._checked = 0.0  # skip the refresh interval
+    assert set(_links("## Wool\nwool rugs", page_type="blog")) == {"jute-rugs.md", "wool-care.md"}
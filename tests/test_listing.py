@@ -0,0 +1,45 @@
+import pytest
+
+listing = pytest.importorskip("backend.app.utils.listing")
+from backend.app.utils.json_store import JsonStore  # noqa: E402
+from backend.app.utils.sqlite_store import SqliteStore  # noqa: E402
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        s = JsonStore(str(tmp_path / "prompts.json"))
+    else:
+        s = SqliteStore(str(tmp_path / "rugs.db"), "prompts")
+    # Inserted out of id order: pages follow id order, not insertion order
+    for i, rid in enumerate(["c", "a", "e", "b", "d"]):
+        s.insert({"id": rid, "type": "generation" if i % 2 else "critique", "tags": ["x"] if rid in "ace" else []})
+    return s
+
+
+def _walk(fetch, limit):
+    ids, cursor = [], None
+    while True:
+        page, cursor = listing.paginate(fetch, cursor, limit)
+        ids += [r["id"] for r in page]
+        if cursor is None:
+            return ids
+
+
+def test_pages_follow_id_order(store):
+    assert _walk(store.page, 2) == ["a", "b", "c", "d", "e"]
+    assert _walk(store.page, 5) == ["a", "b", "c", "d", "e"]
+    assert _walk(store.page, None) == ["a", "b", "c", "d", "e"]
+
+
+def test_filters_are_applied_before_the_limit(store):
+    assert _walk(lambda after, n: store.page(after, n, tags=["x"]), 1) == ["a", "c", "e"]
+    assert _walk(lambda after, n: store.page(after, n, type_="generation"), 1) == ["a", "b"]
+
+
+def test_cursor_survives_deleting_its_record(store):
+    page, cursor = listing.paginate(store.page, None, 2)
+    assert [r["id"] for r in page] == ["a", "b"]
+    store.delete("b")
+    page, _ = listing.paginate(store.page, cursor, 2)
+    assert [r["id"] for r in page] == ["c", "d"]
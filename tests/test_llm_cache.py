@@ -0,0 +1,36 @@
+import os
+import time
+
+from backend.app.utils import llm_cache
+
+
+def _cache(tmp_path, ttl=3600, disk_bytes=1 << 20):
+    return llm_cache.LLMCache(str(tmp_path), ttl, 16, disk_bytes)
+
+
+def test_expired_read_releases_its_disk_usage(tmp_path):
+    cache = _cache(tmp_path, ttl=-1)  # every entry is already expired
+    cache.set("ab" + "0" * 62, "value")
+    assert cache._usage() > 0
+    cache._memory.clear()
+    assert cache.get("ab" + "0" * 62) is None
+    assert cache._usage() == 0
+
+
+def test_eviction_keeps_recently_read_entries_by_their_stored_expiry(tmp_path):
+    cache = _cache(tmp_path, ttl=3600)
+    cache.set("ab" + "1" * 62, "old but fresh")
+    path = cache._path("ab" + "1" * 62)
+    # Written long ago by mtime, yet its stored expiry is still in the future
+    past = time.time() - 2 * 3600
+    os.utime(path, (past, past))
+    cache._evict_disk()
+    assert os.path.exists(path)
+
+    stale = "cd" + "2" * 62
+    cache.set(stale, "stale")
+    with open(cache._path(stale), "w", encoding="utf-8") as f:
+        f.write('{"expires_at": 1, "value": "stale"}')
+    cache._evict_disk()
+    assert not os.path.exists(cache._path(stale))
+    assert os.path.exists(path)
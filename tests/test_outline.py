@@ -0,0 +1,65 @@
+import pytest
+
+from backend.app.utils import outline
+
+
+@pytest.mark.parametrize("text, words", [
+    ("History (~500 words)", 500),
+    ("Care [400-600 words]", 500),
+    ("Top 10 Rugs (about 300 words)", 300),
+    ("Choosing a size - 300 words", 300),
+    ("500–700 words", 600),
+    ("- Target: 1,200 words.", 1200),
+    ("Word count: 600", 600),
+    ("Top 10 Rugs", None),
+    ("2024 Buying Guide", None),
+    ("10 Words Every Rug Buyer Should Know", None),
+])
+def test_word_budget(text, words):
+    assert outline._word_budget(text) == words
+
+
+def test_parse_outline_reads_budgets_from_headings_and_notes():
+    title, sections = outline.parse_outline(
+        "# Persian Rugs: 2024 Guide\n"
+        "## Top 10 Rugs (~800 words)\n"
+        "- cover the 10 best-known weaves\n"
+        "### Tabriz\n"
+        "## Caring for wool\n"
+        "- about 2 coats of protector\n"
+        "- Budget: 400 words\n"
+    )
+    assert title == "Persian Rugs: 2024 Guide"
+    assert [s["heading"] for s in sections] == ["Top 10 Rugs", "Caring for wool"]
+    assert sections[0]["words"] == 800
+    assert [c["heading"] for c in sections[0]["children"]] == ["Tabriz"]
+    assert sections[1]["words"] == 400
+
+
+def _words(units):
+    return [(u["heading"], u["words"]) for u in units]
+
+
+def test_h2_budget_is_split_across_unbudgeted_h3s():
+    _, units = outline.plan_sections(
+        "## Persian Rugs (~1200 words)\n- where they come from\n### Tabriz\n### Kashan\n### Isfahan\n## Care\n",
+        target_words=3000,
+    )
+    assert _words(units) == [
+        ("Persian Rugs", outline.MIN_SECTION_WORDS), ("Tabriz", 350), ("Kashan", 350), ("Isfahan", 350),
+        ("Care", 1800),
+    ]
+    assert sum(u["words"] for u in units if u["heading"] != "Care") == 1200
+
+
+def test_h2_budget_keeps_explicit_h3_budgets():
+    _, units = outline.plan_sections("## Persian Rugs (~1000 words)\n### Tabriz (~600 words)\n### Kashan\n")
+    assert _words(units) == [("Persian Rugs", 0), ("Tabriz", 600), ("Kashan", 400)]
+
+
+def test_h2_without_budget_gets_short_lead_in_only_with_notes():
+    _, units = outline.plan_sections("## Persian Rugs\n### Tabriz\n## Care\n- vacuum weekly\n### Stains\n")
+    assert _words(units) == [
+        ("Persian Rugs", 0), ("Tabriz", outline.DEFAULT_SECTION_WORDS),
+        ("Care", outline.MIN_SECTION_WORDS), ("Stains", outline.DEFAULT_SECTION_WORDS),
+    ]
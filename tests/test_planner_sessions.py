@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+import pytest
+
+planner_sessions = pytest.importorskip("backend.app.utils.planner_sessions")
+from backend.app.utils import ai_tools  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def sessions_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(planner_sessions, "SESSIONS_DIR", str(tmp_path))
+    monkeypatch.setattr(planner_sessions, "_files", {})
+    monkeypatch.setattr(planner_sessions, "_locks", {})
+    return tmp_path
+
+
+def _session_path(session):
+    return planner_sessions._path(session["id"])
+
+
+def test_append_never_recreates_a_deleted_session():
+    session = planner_sessions.create_session("Persian rugs", None, None)
+    os.remove(_session_path(session))  # deleted by another worker
+    with pytest.raises(planner_sessions.SessionNotFound):
+        planner_sessions._append(session["id"], [{"role": "user", "content": "hi"}])
+    assert not os.path.exists(_session_path(session))
+    assert session["id"] not in planner_sessions._files
+
+
+def test_delete_during_turn(monkeypatch):
+    session = planner_sessions.create_session("Persian rugs", None, None)
+
+    async def continue_plan(*args, **kwargs):
+        os.remove(_session_path(session))  # another worker deletes it while the LLM call runs
+        return "outline"
+
+    monkeypatch.setattr(ai_tools, "continue_plan", continue_plan)
+    with pytest.raises(planner_sessions.SessionNotFound):
+        asyncio.run(planner_sessions.take_turn(session["id"], "more detail", None))
+    assert not os.path.exists(_session_path(session))
+    assert session["id"] not in planner_sessions._files
+    assert session["id"] not in planner_sessions._locks
+
+
+def test_turns_are_recorded_and_delete_forgets_state(monkeypatch):
+    session = planner_sessions.create_session("Persian rugs", None, None)
+
+    async def continue_plan(*args, **kwargs):
+        return "outline v2"
+
+    monkeypatch.setattr(ai_tools, "continue_plan", continue_plan)
+    assert asyncio.run(planner_sessions.take_turn(session["id"], "more detail", None)) == "outline v2"
+    assert [t["content"] for t in planner_sessions.get_session(session["id"])["history"]] == ["more detail", "outline v2"]
+    assert planner_sessions.delete_session(session["id"])
+    assert planner_sessions.get_session(session["id"]) is None
+    assert not planner_sessions._files and not planner_sessions._locks
@@ -0,0 +1,303 @@
+"""Deterministic SEO audit of markdown pages.
+
+Runs locally in milliseconds, so it can gate the (slow, paid) LLM critique:
+pages that pass every check skip it, and the others hand their findings to
+the critique so it doesn't spend tokens re-discovering them.
+"""
+import glob
+import math
+import os
+import re
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils.prompt_loader import load_prompt
+
+# Used if the content pyramid can't be read from prompts/system_prompt.txt
+DEFAULT_WORD_TARGETS = {
+    "pillar": (6000, 8000),
+    "collection": (3000, 5000),
+    "blog": (2500, 4000),
+    "guide": (3500, 6000),
+    "faq": (1500, 2500),
+}
+DEFAULT_PAGE_TYPE = "blog"
+
+KEYWORD_DENSITY = (0.005, 0.025)
+READABILITY_GRADE = (8, 10)  # Quality Checklist item 7
+MIN_SENTENCE_STDEV = 3.0
+MAX_PARAGRAPH_WORDS = 150
+TITLE_MAX_CHARS = 60
+DESCRIPTION_CHARS = (120, 160)
+REQUIRED_FRONT_MATTER = ("title", "description")
+# Quality Checklist item 10
+CLICHES = ("revolutionary", "seamless", "game-changer", "game changer", "unlock", "elevate", "delve",
+           "in today's fast-paced world", "look no further", "a testament to")
+
+# Audit score at or above which the LLM critique is skipped, if there are no errors
+AUDIT_GATE_SCORE = int(os.getenv("AUDIT_GATE_SCORE", "90"))
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_PYRAMID_LINE = re.compile(r'^\s*\d\)\s*(.+?):\s*([\d ]+?)\s*[–-]\s*([\d ]+)')
+_WORD = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z]+)?")
+_SENTENCE_END = re.compile(r'[.!?]+(?:\s|$)')
+_VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+
+_targets: Optional[Dict[str, Tuple[int, int]]] = None
+
+
+def word_targets() -> Dict[str, Tuple[int, int]]:
+    """Word-count range per page type, parsed from the content pyramid in the system prompt."""
+    global _targets
+    if _targets is None:
+        targets = {}
+        try:
+            text = load_prompt('system_prompt')
+        except OSError:
+            text = ""
+        for line in text.splitlines():
+            m = _PYRAMID_LINE.match(line)
+            if not m:
+                continue
+            name = m.group(1).lower()
+            low, high = (int(re.sub(r'\D', '', g)) for g in m.group(2, 3))
+            for page_type in DEFAULT_WORD_TARGETS:
+                if page_type in name:
+                    targets[page_type] = (low, high)
+                    break
+        _targets = {**DEFAULT_WORD_TARGETS, **targets}
+    return _targets
+
+
+def split_front_matter(markdown: str) -> Tuple[Optional[Dict], str]:
+    """(front matter, body). Handles the flat `key: value` / list subset of YAML CMS exports use."""
+    if not markdown.startswith("---"):
+        return None, markdown
+    end = markdown.find("\n---", 3)
+    if end < 0:
+        return None, markdown
+    meta: Dict = {}
+    key = None
+    for line in markdown[3:end].splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        item = re.match(r'^\s*-\s+(.*)$', line)
+        if item and key:
+            if not isinstance(meta.get(key), list):
+                meta[key] = []
+            meta[key].append(item.group(1).strip().strip('"\''))
+            continue
+        m = re.match(r'^([\w-]+)\s*:\s*(.*)$', line)
+        if not m:
+            continue
+        key, value = m.group(1).lower(), m.group(2).strip()
+        if value.startswith("[") and value.endswith("]"):
+            meta[key] = [v.strip().strip('"\'') for v in value[1:-1].split(",") if v.strip()]
+        else:
+            meta[key] = value.strip('"\'')
+    body = markdown[end + 4:]
+    return meta, body[body.find("\n") + 1:] if "\n" in body else ""
+
+
+def _strip_markdown(body: str) -> str:
+    """Prose only: drops code blocks, headings, link targets and emphasis markers."""
+    body = re.sub(r'```.*?```', ' ', body, flags=re.S)
+    lines = [l for l in body.splitlines() if not _HEADING.match(l)]
+    text = "\n".join(lines)
+    text = re.sub(r'!?\[([^\]]*)\]\([^)]*\)', r'\1', text)
+    return re.sub(r'[*_`>|#]', ' ', text)
+
+
+def _syllables(word: str) -> int:
+    word = word.lower()
+    count = len(_VOWEL_GROUPS.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee")) and count > 1:
+        count -= 1
+    return max(1, count)
+
+
+def readability(text: str) -> Dict[str, float]:
+    sentences = [s for s in _SENTENCE_END.split(text) if _WORD.search(s)]
+    words = _WORD.findall(text)
+    if not sentences or not words:
+        return {"flesch_reading_ease": 0.0, "grade_level": 0.0, "sentence_length_stdev": 0.0}
+    syllables = sum(_syllables(w) for w in words)
+    words_per_sentence = len(words) / len(sentences)
+    syllables_per_word = syllables / len(words)
+    lengths = [len(_WORD.findall(s)) for s in sentences]
+    return {
+        "flesch_reading_ease": round(206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word, 1),
+        "grade_level": round(0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59, 1),
+        "sentence_length_stdev": round(statistics.pstdev(lengths), 1) if len(lengths) > 1 else 0.0,
+    }
+
+
+def _count_phrase(text: str, phrase: str) -> int:
+    return len(re.findall(r'(?<![\w])' + re.escape(phrase) + r'(?![\w])', text))
+
+
+def audit_markdown(markdown: str, page_type: Optional[str] = None, keyword: Optional[str] = None) -> Dict:
+    """Run every check on one page. Returns metrics, findings and a 0-100 score."""
+    findings: List[Dict] = []
+
+    def add(check: str, severity: str, message: str) -> None:
+        findings.append({"check": check, "severity": severity, "message": message})
+
+    meta, body = split_front_matter(markdown)
+
+    # Front matter
+    if meta is None:
+        add("front_matter", "error", "Missing YAML front matter.")
+        meta = {}
+    else:
+        for field in REQUIRED_FRONT_MATTER:
+            if not meta.get(field):
+                add("front_matter", "error", f"Front matter has no `{field}`.")
+        title, description = meta.get("title") or "", meta.get("description") or ""
+        if len(title) > TITLE_MAX_CHARS:
+            add("front_matter", "warning", f"Title is {len(title)} characters; keep it under {TITLE_MAX_CHARS}.")
+        if description and not DESCRIPTION_CHARS[0] <= len(description) <= DESCRIPTION_CHARS[1]:
+            add("front_matter", "warning", f"Meta description is {len(description)} characters; aim for {DESCRIPTION_CHARS[0]}-{DESCRIPTION_CHARS[1]}.")
+
+    page_type = (page_type or meta.get("type") or meta.get("page_type") or DEFAULT_PAGE_TYPE).lower()
+    targets = word_targets()
+    if page_type not in targets:
+        add("word_count", "warning", f"Unknown page type '{page_type}'; using {DEFAULT_PAGE_TYPE} targets.")
+        page_type = DEFAULT_PAGE_TYPE
+
+    prose = _strip_markdown(body)
+    words = _WORD.findall(prose)
+    word_count = len(words)
+
+    # Word count against the content pyramid
+    low, high = targets[page_type]
+    if word_count < low:
+        add("word_count", "error", f"{word_count} words; {page_type} pages need {low}-{high}.")
+    elif word_count > high * 1.25:
+        add("word_count", "warning", f"{word_count} words; well over the {low}-{high} target for {page_type} pages.")
+
+    # Heading hierarchy
+    headings: List[Tuple[int, str]] = []
+    in_code = False
+    for line in body.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+            continue
+        m = None if in_code else _HEADING.match(line)
+        if m:
+            headings.append((len(m.group(1)), m.group(2)))
+    h1s = [text for level, text in headings if level == 1]
+    if len(h1s) != 1 and not (not h1s and meta.get("title")):
+        add("headings", "error", f"Expected one H1, found {len(h1s)}.")
+    if not any(level == 2 for level, _ in headings):
+        add("headings", "error", "No H2 sections.")
+    previous = 1
+    for level, text in headings:
+        if not text:
+            add("headings", "warning", "Empty heading.")
+        if level > previous + 1:
+            add("headings", "warning", f"'{text}' jumps from H{previous} to H{level}.")
+        previous = level
+
+    # Keyword placement and density
+    keyword = keyword or meta.get("keyword") or meta.get("primary_keyword")
+    if not keyword and isinstance(meta.get("keywords"), list) and meta["keywords"]:
+        keyword = meta["keywords"][0]
+    density = None
+    if keyword:
+        phrase = keyword.lower()
+        lowered = prose.lower()
+        occurrences = _count_phrase(lowered, phrase)
+        density = occurrences * len(phrase.split()) / word_count if word_count else 0.0
+        if density < KEYWORD_DENSITY[0]:
+            add("keywords", "warning", f"'{keyword}' density {density:.2%} is below {KEYWORD_DENSITY[0]:.1%}.")
+        elif density > KEYWORD_DENSITY[1]:
+            add("keywords", "error", f"'{keyword}' density {density:.2%} looks like stuffing (over {KEYWORD_DENSITY[1]:.1%}).")
+        title_text = " ".join(h1s) or meta.get("title") or ""
+        if phrase not in title_text.lower():
+            add("keywords", "warning", f"'{keyword}' is not in the title/H1.")
+        if not _count_phrase(" ".join(words[:100]).lower(), phrase):
+            add("keywords", "warning", f"'{keyword}' is not in the first 100 words.")
+        if not any(phrase in text.lower() for level, text in headings if level == 2):
+            add("keywords", "warning", f"'{keyword}' is in no H2.")
+    else:
+        add("keywords", "warning", "No primary keyword (pass one or set `keyword` in front matter).")
+
+    # Readability
+    scores = readability(prose)
+    grade = scores["grade_level"]
+    if word_count and not READABILITY_GRADE[0] <= grade <= READABILITY_GRADE[1]:
+        add("readability", "warning", f"Grade level {grade}; target {READABILITY_GRADE[0]}-{READABILITY_GRADE[1]}.")
+    if word_count and scores["sentence_length_stdev"] < MIN_SENTENCE_STDEV:
+        add("readability", "warning", "Sentence lengths are very uniform; vary them.")
+    long_paragraphs = sum(1 for p in re.split(r'\n\s*\n', prose) if len(_WORD.findall(p)) > MAX_PARAGRAPH_WORDS)
+    if long_paragraphs:
+        add("readability", "warning", f"{long_paragraphs} paragraph(s) over {MAX_PARAGRAPH_WORDS} words.")
+
+    # FAQ section
+    has_faq = any(re.search(r'\bfaqs?\b|frequently asked', text, re.I) for _, text in headings)
+    questions = sum(1 for _, text in headings if text.endswith("?"))
+    if not has_faq:
+        add("faq", "error" if page_type == "faq" else "warning", "No FAQ section (needed for FAQ schema).")
+    elif questions < 3:
+        add("faq", "warning", f"FAQ has {questions} question heading(s); add at least 3.")
+
+    # AI clichés
+    lowered = prose.lower()
+    found = [c for c in CLICHES if _count_phrase(lowered, c)]
+    if found:
+        add("cliches", "warning", f"Cliché wording: {', '.join(found)}.")
+
+    errors = sum(1 for f in findings if f["severity"] == "error")
+    warnings = len(findings) - errors
+    return {
+        "page_type": page_type,
+        "keyword": keyword,
+        "metrics": {
+            "word_count": word_count,
+            "word_target": [low, high],
+            "headings": len(headings),
+            "keyword_density": round(density, 4) if density is not None else None,
+            "faq_questions": questions,
+            **scores,
+        },
+        "findings": findings,
+        "errors": errors,
+        "warnings": warnings,
+        "score": max(0, 100 - 15 * errors - 5 * warnings),
+    }
+
+
+def needs_critique(report: Dict) -> bool:
+    """Whether the LLM critique is worth running on an audited page."""
+    return report["errors"] > 0 or report["score"] < AUDIT_GATE_SCORE
+
+
+def render_findings(report: Dict) -> str:
+    lines = [f"Automated audit: score {report['score']}/100 ({report['page_type']} page, {report['metrics']['word_count']} words)."]
+    lines += [f"- [{f['severity']}] {f['check']}: {f['message']}" for f in report["findings"]]
+    return "\n".join(lines)
+
+
+def audit_file(path: str, page_type: Optional[str] = None, keyword: Optional[str] = None) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        report = audit_markdown(f.read(), page_type, keyword)
+    report["path"] = path
+    return report
+
+
+def _audit_path(args: Tuple[str, Optional[str], Optional[str]]) -> Dict:
+    return audit_file(*args)
+
+
+def audit_directory(directory: str, page_type: Optional[str] = None, keyword: Optional[str] = None, workers: Optional[int] = None) -> List[Dict]:
+    """Audit every .md file under `directory`, spread across processes for large trees."""
+    paths = sorted(glob.glob(os.path.join(directory, '**', '*.md'), recursive=True))
+    jobs = [(p, page_type, keyword) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    # A pool costs more to start than a handful of pages take to audit
+    if workers == 1 or len(jobs) < 2 * workers:
+        return [_audit_path(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_audit_path, jobs, chunksize=max(1, math.ceil(len(jobs) / (workers * 4)))))
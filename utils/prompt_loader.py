@@ -1,4 +1,93 @@
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Resolved from this file, not the CWD, so the backend can start from anywhere
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'prompts')
+
+# How often a cached prompt re-checks its file's mtime (seconds)
+RELOAD_CHECK_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "1.0"))
+
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+class PromptTemplate:
+    """Prompt text with `{name}` placeholders, split once so rendering is a single join.
+
+    Placeholders without a value are left as written, so prompts that contain
+    literal braces (JSON examples, etc.) render unchanged.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._parts: List[str] = []
+        self._fields: List[Tuple[int, str]] = []  # (index into _parts, placeholder name)
+        pos = 0
+        for m in _PLACEHOLDER.finditer(text):
+            self._parts.append(text[pos:m.start()])
+            self._fields.append((len(self._parts), m.group(1)))
+            self._parts.append(m.group(0))
+            pos = m.end()
+        self._parts.append(text[pos:])
+        self.placeholders = frozenset(name for _, name in self._fields)
+
+    def render(self, **values) -> str:
+        if not self._fields:
+            return self.text
+        parts = list(self._parts)
+        for i, name in self._fields:
+            value = values.get(name)
+            if value is not None:
+                parts[i] = str(value)
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """In-memory prompts/*.txt, reloaded only when a file's mtime changes."""
+
+    def __init__(self, prompts_dir: str):
+        self.prompts_dir = prompts_dir
+        self._lock = threading.Lock()
+        # name -> (mtime_ns, last_checked, template)
+        self._entries: Dict[str, Tuple[int, float, PromptTemplate]] = {}
+
+    def get(self, name: str) -> PromptTemplate:
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry and now - entry[1] < RELOAD_CHECK_INTERVAL:
+            return entry[2]
+        path = os.path.join(self.prompts_dir, f'{name}.txt')
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry[0] == mtime:
+                template = entry[2]
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    template = PromptTemplate(f.read())
+            self._entries[name] = (mtime, now, template)
+        return template
+
+    def names(self) -> List[str]:
+        return sorted(f[:-4] for f in os.listdir(self.prompts_dir) if f.endswith('.txt'))
+
+
+registry = PromptRegistry(PROMPTS_DIR)
+
+
 def load_prompt(name: str) -> str:
-    path = f'prompts/{name}.txt'
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read() 
\ No newline at end of file
+    return registry.get(name).text
+
+
+def render_prompt(name: str, **values) -> str:
+    """Load a stored prompt and fill its placeholders (topic, supplemental, instructions, ...)."""
+    return registry.get(name).render(**values)
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> PromptTemplate:
+    """Compiled template for ad-hoc prompt text, e.g. custom prompts from the prompt library."""
+    return PromptTemplate(text)